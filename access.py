@@ -0,0 +1,172 @@
+"""
+Accesos rápidos: links de policies/accesos.txt y reglas para sugerirlos.
+
+El archivo se lee una vez y se recarga cuando cambia su mtime. Las reglas se
+declaran como datos (título del link + palabras clave) y se compilan junto con
+el mapa en una sola regex de lookahead: una pasada sobre la consulta
+normalizada devuelve todas las palabras clave presentes, y cada regla se
+resuelve con operaciones de conjuntos.
+"""
+import hashlib, os, re, threading, time
+from utils import _n, read_txt, slugify
+
+def _is_url(line: str) -> bool:
+    return line.startswith("http://") or line.startswith("https://") or line.startswith("chrome-extension://")
+
+def parse_accesos(text: str) -> dict:
+    """
+    Formato de accesos.txt:
+      TÍTULO EN UNA LÍNEA
+          URL EN LA SIGUIENTE LÍNEA
+    (Hay líneas en blanco entre pares; pueden venir con tabs o "Título <tab> URL")
+    Devuelve: { slug: {"label": titulo, "url": url} }
+    """
+    mapping = {}
+    title_buffer = None
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+        if "\t" in line and "http" in line:
+            parts = [p.strip() for p in line.split("\t") if p.strip()]
+            if len(parts) >= 2 and _is_url(parts[1]):
+                mapping[slugify(parts[0])] = {"label": parts[0], "url": parts[1]}
+                title_buffer = None
+                continue
+        if _is_url(line):
+            if title_buffer:  # url sin título previo: se ignora
+                mapping[slugify(title_buffer)] = {"label": title_buffer, "url": line}
+                title_buffer = None
+        else:
+            title_buffer = line
+    return mapping
+
+class _Rule:
+    __slots__ = ("slug", "label", "any", "domains", "only_domains", "group", "narrow")
+
+    def __init__(self, slug: str, label: str, spec: dict):
+        self.slug, self.label = slug, label
+        self.any = frozenset(_n(w) for w in spec.get("any", ()))
+        self.domains = frozenset(spec.get("domains", ()))
+        self.only_domains = frozenset(spec.get("only_domains", ()))
+        self.group = spec.get("group")
+        self.narrow = _n(spec["narrow"]) if spec.get("narrow") else None
+
+class _Compiled:
+    __slots__ = ("map", "rules", "rx", "implied", "mtime", "etag", "loaded_at")
+
+    def __init__(self, mapping: dict, specs: list[dict], mtime):
+        self.map = mapping
+        self.mtime = mtime
+        self.loaded_at = time.time()
+        self.etag = hashlib.sha1(repr(sorted((k, v["url"]) for k, v in mapping.items())).encode()).hexdigest()[:12]
+        # solo las reglas cuyo link existe en accesos.txt
+        self.rules = []
+        for spec in specs:
+            slug = slugify(spec["title"])
+            if slug in mapping:
+                self.rules.append(_Rule(slug, mapping[slug]["label"], spec))
+        kws = {w for r in self.rules for w in r.any} | {r.narrow for r in self.rules if r.narrow}
+        if kws:
+            alts = "|".join(re.escape(w) for w in sorted(kws, key=len, reverse=True))
+            self.rx = re.compile(f"(?=({alts}))")
+        else:
+            self.rx = None
+        # en cada posición la regex reporta solo la palabra más larga; las que son prefijo también están presentes
+        self.implied = {w: frozenset(k for k in kws if w.startswith(k)) for w in kws}
+
+class AccessLinks:
+    """
+    specs: lista ORDENADA de reglas (el orden es el de las sugerencias):
+        {"title": "Correo Zimbra",          # título tal cual en accesos.txt
+         "any": ["correo", ...],            # subcadenas que la disparan
+         "domains": ["BIOMETRIKA"],         # opcional: el dominio también la dispara
+         "only_domains": ["NOMINA", ...],   # opcional: solo aplica en estos dominios
+         "group": "horarios", "narrow": "norte"}
+      Las reglas de un mismo grupo se sugieren todas, salvo que la consulta
+      mencione el `narrow` de alguna: entonces solo esas.
+    A diferencia de la cadena de ifs anterior, un grupo no depende de lo sugerido
+    antes ("correo horario" trae también los horarios); el bloque que se muestra
+    (primer link o el par norte/sur) es el mismo, ver tests/test_access.py.
+    """
+    def __init__(self, path: str, specs: list[dict], check_interval: float = 2.0, mapping: dict | None = None):
+        """mapping: mapa ya parseado del archivo actual (snapshot de conocimiento); si no, se lee `path`."""
+        self.path = path
+        self.specs = specs
+        self.check_interval = check_interval
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._checked = 0.0
+        self._snap = self._load(mapping)
+
+    def _mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self, mapping: dict | None = None) -> _Compiled:
+        mtime = self._mtime()
+        if mapping is None:
+            mapping = parse_accesos(read_txt(self.path)) if mtime else {}
+        return _Compiled(mapping, self.specs, mtime)
+
+    def reload(self, force: bool = False) -> bool:
+        with self._lock:
+            self._checked = time.monotonic()
+            if not force and self._mtime() == self._snap.mtime:
+                return False
+            self._snap = self._load()
+            self.reloads += 1
+        return True
+
+    def _fresh(self) -> _Compiled:
+        if time.monotonic() - self._checked >= self.check_interval:
+            self.reload()
+        return self._snap
+
+    # ---- lectura ----
+    @property
+    def map(self) -> dict:
+        return self._fresh().map
+
+    def get(self, slug: str) -> dict | None:
+        return self._fresh().map.get(slug)
+
+    def choose(self, question: str, domain: str) -> list[tuple[str, str]]:
+        """Lista de (slug, label) a sugerir, sin duplicados y en el orden de las reglas."""
+        snap = self._fresh()
+        found = set()
+        if snap.rx is not None:
+            for m in snap.rx.finditer(_n(question)):
+                found |= snap.implied[m.group(1)]
+        out, seen, groups = [], set(), set()
+        for r in snap.rules:
+            if r.only_domains and domain not in r.only_domains:
+                continue
+            if not (r.any & found or domain in r.domains):
+                continue
+            if r.group is None:
+                picked = [r]
+            elif r.group in groups:
+                continue
+            else:
+                groups.add(r.group)
+                members = [x for x in snap.rules if x.group == r.group]
+                picked = [x for x in members if x.narrow in found] or members
+            for x in picked:
+                if x.slug not in seen:
+                    seen.add(x.slug)
+                    out.append((x.slug, x.label))
+        return out
+
+    def info(self) -> dict:
+        snap = self._snap
+        return {
+            "size": len(snap.map),
+            "sample": list(snap.map)[:6],
+            "rules": [r.slug for r in snap.rules],
+            "etag": snap.etag,
+            "loaded_at": int(snap.loaded_at),
+            "reloads": self.reloads,
+        }
@@ -0,0 +1,198 @@
+"""
+Control de admisión para la etapa del modelo (lo único caro del pipeline).
+
+Solo se consulta cuando resolve_fast() ya decidió que la pregunta va a la IA:
+reglas fijas, uniformes, banco de preguntas, caché y /go/ nunca pasan por acá.
+
+rate     token bucket por sid y uno global (preguntas al modelo por segundo)
+slots    tope de llamadas al modelo en vuelo por worker, con una cola corta FIFO
+         (tamaño y espera máximos); el cupo que se libera pasa directo al
+         primero de la cola
+
+Lo que no entra se rechaza con AdmissionRejected(reason) y el caller responde
+con el fallback en vez de esperar. rate/sid_rate/max_concurrency en 0 desactivan
+ese tope; queue_size 0 rechaza al instante sin cola. Sirve tanto para hilos
+(acquire) como para el event loop (acquire_async), con los mismos contadores.
+"""
+import asyncio, threading, time
+from collections import Counter, OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+class TokenBucket:
+    """`rate` fichas por segundo hasta `burst`; sin lock propio (lo pone Admission)."""
+    __slots__ = ("rate", "burst", "tokens", "stamp")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.stamp = now
+
+    def take(self, now: float) -> bool:
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+class _Waiter:
+    __slots__ = ("granted", "wake")
+
+    def __init__(self, wake):
+        self.granted = False
+        self.wake = wake
+
+def _set_result(fut):
+    if not fut.done():
+        fut.set_result(True)
+
+class Admission:
+    def __init__(self, max_concurrency: int = 24, queue_size: int = 24, queue_timeout: float = 1.0,
+                 rate: float = 0, burst: float = 20, sid_rate: float = 0.5, sid_burst: float = 4,
+                 max_sids: int = 10000):
+        self.max_concurrency = max_concurrency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.sid_rate = sid_rate
+        self.sid_burst = sid_burst
+        self.max_sids = max_sids
+        self._lock = threading.Lock()
+        self._global = TokenBucket(rate, burst, time.monotonic()) if rate > 0 else None
+        self._sids = OrderedDict()  # sid -> TokenBucket, LRU acotado
+        self._waiters = deque()
+        self.in_flight = 0
+        self.admitted = 0
+        self.queued = 0        # admitidas después de esperar en la cola
+        self.peak_queue = 0
+        self.rejected = Counter()
+
+    # ---- tasa ----
+    def check_rate(self, sid: str = ""):
+        """Consume una ficha del sid (si hay) y una global; sin fichas -> AdmissionRejected."""
+        with self._lock:
+            now = time.monotonic()
+            if sid and self.sid_rate > 0:
+                b = self._sids.get(sid)
+                if b is None:
+                    b = self._sids[sid] = TokenBucket(self.sid_rate, self.sid_burst, now)
+                    if len(self._sids) > self.max_sids:
+                        self._sids.popitem(last=False)
+                else:
+                    self._sids.move_to_end(sid)
+                if not b.take(now):
+                    raise self._reject("rate_sid")
+            if self._global is not None and not self._global.take(now):
+                raise self._reject("rate_global")
+
+    # ---- cupos ----
+    def _take_now(self) -> bool:
+        """Con el lock: cupo libre y nadie esperando antes."""
+        if not self.max_concurrency or (self.in_flight < self.max_concurrency and not self._waiters):
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+        return False
+
+    def _enqueue(self, wake) -> _Waiter:
+        if len(self._waiters) >= self.queue_size:
+            raise self._reject("queue_full")
+        w = _Waiter(wake)
+        self._waiters.append(w)
+        self.peak_queue = max(self.peak_queue, len(self._waiters))
+        return w
+
+    def _settle(self, w: _Waiter) -> bool:
+        """Con el lock, al despertar: True si el cupo ya le fue cedido; si no, sale de la cola."""
+        if w.granted:
+            self.admitted += 1
+            self.queued += 1
+            return True
+        self._waiters.remove(w)
+        return False
+
+    def acquire(self, timeout: float | None = None):
+        """Toma un cupo esperando en la cola a lo sumo `timeout` (por defecto queue_timeout)."""
+        with self._lock:
+            if self._take_now():
+                return
+            ev = threading.Event()
+            w = self._enqueue(ev.set)
+        ev.wait(self.queue_timeout if timeout is None else max(0.0, timeout))
+        with self._lock:
+            if not self._settle(w):
+                raise self._reject("queue_timeout")
+
+    async def acquire_async(self, timeout: float | None = None):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._take_now():
+                return
+            fut = loop.create_future()
+            w = self._enqueue(lambda: loop.call_soon_threadsafe(_set_result, fut))
+        try:
+            await asyncio.wait_for(fut, self.queue_timeout if timeout is None else max(0.0, timeout))
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            with self._lock:
+                granted = self._settle(w)
+            if isinstance(e, asyncio.CancelledError):
+                if granted:
+                    self.release()
+                raise
+            if not granted:
+                raise self._reject("queue_timeout")
+            return
+        with self._lock:
+            self._settle(w)
+
+    def release(self):
+        with self._lock:
+            if self._waiters:
+                w = self._waiters.popleft()
+                w.granted = True  # el cupo pasa tal cual: in_flight no cambia
+                w.wake()
+            else:
+                self.in_flight -= 1
+
+    @contextmanager
+    def slot(self, timeout: float | None = None):
+        self.acquire(timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def aslot(self, timeout: float | None = None):
+        await self.acquire_async(timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def _reject(self, reason: str) -> AdmissionRejected:
+        self.rejected[reason] += 1
+        return AdmissionRejected(reason)
+
+    def info(self) -> dict:
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "queue_size": self.queue_size,
+                "queue_timeout": self.queue_timeout,
+                "rate": self._global.rate if self._global else 0,
+                "sid_rate": self.sid_rate,
+                "sid_burst": self.sid_burst,
+                "in_flight": self.in_flight,
+                "queue_depth": len(self._waiters),
+                "peak_queue": self.peak_queue,
+                "tracked_sids": len(self._sids),
+                "admitted": self.admitted,
+                "queued": self.queued,
+                "rejected": dict(self.rejected),
+            }
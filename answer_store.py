@@ -0,0 +1,87 @@
+"""
+Almacén persistente de respuestas pregeneradas (lo llena warmup.py).
+
+Clave: (pregunta normalizada, dominio). Cada respuesta guarda la versión (hash)
+de cada fuente que entró a su prompt, p. ej. {"vacaciones": "3f1c…",
+"banco": "9a0e…", "prompt": "51d2…"}: se sirve solo si todas coinciden con las
+actuales, así un cambio en una política invalida únicamente las respuestas que
+se generaron con ella. Archivo SQLite en modo WAL: el warm-up escribe mientras
+los workers leen.
+"""
+import json, os, sqlite3, threading, time
+
+class AnswerStore:
+    """Una conexión por hilo y por proceso, como SqliteSessionStore."""
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._inherited = []  # conexiones heredadas de un fork: no se usan ni se cierran
+        self._conn().executescript("""
+            CREATE TABLE IF NOT EXISTS answers (
+                qn TEXT NOT NULL,
+                domain TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                sources TEXT NOT NULL,
+                question TEXT NOT NULL DEFAULT '',
+                origin TEXT NOT NULL DEFAULT '',
+                created_at REAL NOT NULL,
+                PRIMARY KEY (qn, domain)
+            );
+        """)
+        self.hits = self.misses = self.stale = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            if conn is not None:
+                self._inherited.append(conn)  # cerrarla en el hijo tocaría los locks y el WAL del padre
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    @staticmethod
+    def fresh(sources: dict, versions: dict) -> bool:
+        return all(versions.get(k) == v for k, v in sources.items())
+
+    def get(self, qn: str, domain: str, versions: dict) -> str | None:
+        """Respuesta guardada si todas sus fuentes siguen en la versión de `versions`."""
+        row = self._conn().execute(
+            "SELECT answer, sources FROM answers WHERE qn = ? AND domain = ?", (qn, domain)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        if not self.fresh(json.loads(row[1]), versions):
+            self.stale += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def put(self, qn: str, domain: str, answer: str, sources: dict, question: str = "", origin: str = ""):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO answers(qn, domain, answer, sources, question, origin, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (qn, domain, answer, json.dumps(sources, sort_keys=True), question, origin, time.time()),
+        )
+
+    def purge(self, versions: dict) -> int:
+        """Borra las respuestas con alguna fuente desactualizada; devuelve cuántas."""
+        conn = self._conn()
+        stale = [(qn, dom) for qn, dom, src in conn.execute("SELECT qn, domain, sources FROM answers")
+                 if not self.fresh(json.loads(src), versions)]
+        conn.executemany("DELETE FROM answers WHERE qn = ? AND domain = ?", stale)
+        return len(stale)
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+    def info(self) -> dict:
+        return {
+            "path": self.path,
+            "entries": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+        }
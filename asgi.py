@@ -0,0 +1,225 @@
+"""
+Entrada ASGI para servir sin bloquear workers en la llamada a OpenAI:
+
+    gunicorn -w 2 -k uvicorn.workers.UvicornWorker asgi:app
+
+/responder y /responder/stream se atienden en el event loop con AsyncOpenAI
+sobre un httpx.AsyncClient compartido (pool de conexiones), así cientos de
+preguntas pueden esperar al modelo en paralelo dentro de un mismo worker.
+El resto de rutas (/, /go, /diag, /ping) se delega a la app Flask vía asgiref.
+`main:app` (WSGI, workers sync) sigue funcionando igual.
+Las etapas síncronas del pipeline (resolve_fast, remember) corren en el pool de
+hilos del loop con asyncio.to_thread.
+El SDK de OpenAI se importa en un hilo en el primer uso (o en el warm-up que
+arranca con el lifespan del worker), sin frenar el arranque ni el event loop.
+"""
+import asyncio, json, os, time
+from asgiref.wsgi import WsgiToAsgi
+
+import main
+from admission import AdmissionRejected
+from breaker import CircuitOpenError
+from utils import sanitize
+
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "200"))
+
+_wsgi = WsgiToAsgi(main.app)
+_aclient = None
+_aclient_lock = asyncio.Lock()
+
+async def get_async_client():
+    """AsyncOpenAI compartido por worker; se crea en el primer uso."""
+    global _aclient
+    if _aclient is not None:
+        return _aclient
+    async with _aclient_lock:
+        if _aclient is None:
+            key = (os.getenv("OPENAI_API_KEY") or "").strip()
+            if not key:
+                return None
+            with main.STARTUP.lazy_step("openai_async_client"):
+                openai, httpx = await asyncio.to_thread(main.openai_sdk)
+                http_client = httpx.AsyncClient(
+                    transport=httpx.AsyncHTTPTransport(retries=1),
+                    timeout=main.LLM_BUDGET,
+                    trust_env=False,
+                    limits=httpx.Limits(
+                        max_connections=LLM_MAX_CONNECTIONS,
+                        max_keepalive_connections=min(LLM_MAX_CONNECTIONS, 50),
+                    ),
+                )
+                _aclient = openai.AsyncOpenAI(api_key=key, http_client=http_client, max_retries=main.LLM_MAX_RETRIES)
+    return _aclient
+
+async def llm_answer(pregunta: str, domain: str, sys_prompt: str, timeout: float,
+                     history: list[dict] | None = None) -> tuple[str, dict]:
+    """Con tope duro: wait_for corta aunque la respuesta llegue a cuentagotas."""
+    aclient = await get_async_client()
+    with main.METRICS.timer("stage_seconds", stage="llm"):
+        cmpl = await asyncio.wait_for(
+            aclient.chat.completions.create(**main.llm_request(pregunta, domain, sys_prompt, history, timeout=timeout)),
+            timeout,
+        )
+    return main.postprocess_answer(cmpl.choices[0].message.content), main.record_usage(cmpl.usage)
+
+async def llm_stream(pregunta: str, domain: str, sys_prompt: str, started: float, usage: dict,
+                     history: list[dict] | None = None):
+    aclient = await get_async_client()
+    t0 = time.perf_counter()
+    stream = await aclient.chat.completions.create(
+        **main.llm_request(pregunta, domain, sys_prompt, history, stream=True, timeout=main.remaining_budget(started),
+                           stream_options={"include_usage": True})
+    )
+    async for chunk in stream:
+        if main.remaining_budget(started) <= 0:
+            await stream.close()
+            raise TimeoutError("llm_stream: presupuesto agotado")
+        if getattr(chunk, "usage", None):
+            usage.update(main.record_usage(chunk.usage))
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+    main.METRICS.observe("stage_seconds", time.perf_counter() - t0, stage="llm")
+
+# ---------------- HTTP helpers ----------------
+async def read_json(receive) -> dict:
+    body = b""
+    while True:
+        msg = await receive()
+        body += msg.get("body", b"")
+        if not msg.get("more_body"):
+            break
+    try:
+        data = json.loads(body or b"{}")
+        return data if isinstance(data, dict) else {}
+    except ValueError:
+        return {}
+
+async def send_json(send, data: dict, status: int = 200):
+    body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json; charset=utf-8"),
+                    (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+# ---------------- Rutas async ----------------
+# resolve_fast y remember son síncronos (SQLite/Redis del almacén de respuestas y de
+# sesiones, fuzzy y clasificador en CPU): van a un hilo para no frenar el event loop
+async def finish(sid: str, pregunta: str, result: dict, started: float) -> dict:
+    return main.answered(await asyncio.to_thread(main.remember, sid, pregunta, result), started)
+
+async def responder(scope, receive, send):
+    started = time.monotonic()
+    data = await read_json(receive)
+    with main.METRICS.timer("stage_seconds", stage="sanitize"):
+        pregunta = sanitize(data.get("mensaje", ""))
+    sid = (data.get("sid") or "").strip()
+    if not pregunta:
+        return await send_json(send, main.answered({"respuesta": "Por favor, escribe un mensaje.", "path": "empty"}, started))
+
+    done, job = await asyncio.to_thread(main.resolve_fast, pregunta, sid)
+    if done:
+        return await send_json(send, await finish(sid, pregunta, done, started))
+    if await get_async_client() is None or main.BREAKER.is_open():
+        result = main.fallback(job)
+        return await send_json(send, await finish(sid, pregunta, result, started))
+    try:
+        main.ADMISSION.check_rate(sid)
+    except AdmissionRejected:
+        return await send_json(send, await finish(sid, pregunta, main.shed(job), started))
+
+    async def call():  # solo el líder del singleflight ocupa un cupo
+        async with main.ADMISSION.aslot(main.queue_timeout(started)):
+            return await main.BREAKER.acall(lambda: llm_answer(pregunta, job["domain"], job["sys_prompt"],
+                                                               max(main.remaining_budget(started), 0.1), job["history"]))
+    try:
+        answer, usage = await main.ASYNC_SINGLEFLIGHT.do(
+            main.llm_key(job), call, timeout=min(main.SINGLEFLIGHT_TIMEOUT, main.remaining_budget(started)),
+        )
+        result = main.finish_llm(job, answer, usage)
+    except AdmissionRejected:
+        result = main.shed(job)
+    except Exception:
+        result = main.fallback(job, "exception")
+    await send_json(send, await finish(sid, pregunta, result, started))
+
+async def responder_stream(scope, receive, send):
+    started = time.monotonic()
+    data = await read_json(receive)
+    pregunta = sanitize(data.get("mensaje", ""))
+    sid = (data.get("sid") or "").strip()
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"text/event-stream; charset=utf-8"),
+                    (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no")],
+    })
+
+    async def emit(event, payload, last=False):
+        await send({"type": "http.response.body",
+                    "body": main.sse(event, payload).encode("utf-8"),
+                    "more_body": not last})
+
+    if not pregunta:
+        return await emit("done", main.answered({"respuesta": "Por favor, escribe un mensaje.", "path": "empty"}, started), last=True)
+    done, job = await asyncio.to_thread(main.resolve_fast, pregunta, sid)
+    if done:
+        return await emit("done", await finish(sid, pregunta, done, started), last=True)
+    if await get_async_client() is None or main.BREAKER.is_open():
+        result = main.fallback(job)
+        return await emit("done", await finish(sid, pregunta, result, started), last=True)
+    try:
+        main.ADMISSION.check_rate(sid)
+        await main.ADMISSION.acquire_async(main.queue_timeout(started))
+    except AdmissionRejected:
+        return await emit("done", await finish(sid, pregunta, main.shed(job), started), last=True)
+    parts, usage, grant = [], {}, None
+    try:  # el cupo se ocupa mientras dura el stream
+        grant = main.BREAKER.admit()
+        if grant is None:
+            raise CircuitOpenError(main.BREAKER.name)
+        async for t in llm_stream(pregunta, job["domain"], job["sys_prompt"], started, usage, job["history"]):
+            parts.append(t)
+            await emit("delta", {"t": t})
+        main.BREAKER.record_success()
+        result = main.finish_llm(job, main.postprocess_answer("".join(parts)), usage)
+    except CircuitOpenError:
+        result = main.fallback(job)
+    except Exception:
+        main.BREAKER.record_failure()
+        result = main.fallback(job, "exception")
+    except BaseException:  # CancelledError: el cliente se desconectó, sin veredicto
+        main.BREAKER.abandon(grant)
+        raise
+    finally:
+        main.ADMISSION.release()
+    await emit("done", await finish(sid, pregunta, result, started), last=True)
+
+ROUTES = {
+    ("POST", "/responder"): responder,
+    ("POST", "/responder/stream"): responder_stream,
+}
+
+async def lifespan(receive, send):
+    while True:
+        msg = await receive()
+        if msg["type"] == "lifespan.startup":
+            if main.LLM_WARMUP:
+                asyncio.get_running_loop().create_task(get_async_client())
+            await send({"type": "lifespan.startup.complete"})
+        elif msg["type"] == "lifespan.shutdown":
+            if _aclient is not None:
+                await _aclient.close()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+    handler = ROUTES.get((scope.get("method"), scope.get("path"))) if scope["type"] == "http" else None
+    if handler:
+        return await handler(scope, receive, send)
+    return await _wsgi(scope, receive, send)
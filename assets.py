@@ -0,0 +1,86 @@
+"""
+UI precompilada: cada archivo se lee, versiona y comprime UNA vez al arrancar.
+
+- ETag fuerte por variante (identity/gzip/br) y 304 con If-None-Match.
+- Variantes gzip y brotli (el paquete `brotli` va en requirements.txt; sin él,
+  solo gzip) elegidas según Accept-Encoding, con Vary: Accept-Encoding.
+- Los assets (CSS/JS) se publican con el hash en el nombre y caché de un año;
+  la página se revalida en cada carga (no-cache) y casi siempre termina en 304.
+"""
+import gzip, hashlib, os
+from flask import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+LONG_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+class Asset:
+    __slots__ = ("name", "content_type", "cache_control", "variants", "digest")
+
+    def __init__(self, name: str, body: bytes, content_type: str, cache_control: str):
+        self.name = name
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.digest = hashlib.sha1(body).hexdigest()[:12]
+        # encoding -> (bytes, etag); solo se guardan las variantes que ahorran bytes
+        self.variants = {"identity": (body, f'"{self.digest}"')}
+        gz = gzip.compress(body, compresslevel=9, mtime=0)
+        if len(gz) < len(body):
+            self.variants["gzip"] = (gz, f'"{self.digest}-gz"')
+        if brotli is not None:
+            br = brotli.compress(body, quality=11)
+            if len(br) < len(body):
+                self.variants["br"] = (br, f'"{self.digest}-br"')
+
+    def pick(self, accept_encodings) -> str:
+        for enc in ("br", "gzip"):
+            if enc in self.variants and accept_encodings[enc] > 0:
+                return enc
+        return "identity"
+
+    def response(self, request) -> Response:
+        enc = self.pick(request.accept_encodings)
+        body, etag = self.variants[enc]
+        headers = {"ETag": etag, "Cache-Control": self.cache_control, "Vary": "Accept-Encoding"}
+        if request.if_none_match.contains_weak(etag.strip('"')):
+            return Response(status=304, headers=headers)
+        if enc != "identity":
+            headers["Content-Encoding"] = enc
+        return Response(body, status=200, content_type=self.content_type, headers=headers)
+
+    def info(self) -> dict:
+        return {"digest": self.digest, "bytes": {enc: len(v[0]) for enc, v in self.variants.items()}}
+
+class AssetBundle:
+    """Archivos de `base` servidos como /<prefix>/<nombre>.<hash>.<ext>."""
+    TYPES = {".css": "text/css; charset=utf-8", ".js": "text/javascript; charset=utf-8",
+             ".html": "text/html; charset=utf-8"}
+
+    def __init__(self, base: str, prefix: str = "/assets"):
+        self.base = base
+        self.prefix = prefix
+        self.assets = {}   # nombre versionado -> Asset
+        self.urls = {}     # nombre original -> url versionada
+
+    def add_file(self, filename: str) -> str:
+        with open(os.path.join(self.base, filename), "rb") as f:
+            body = f.read()
+        stem, ext = os.path.splitext(filename)
+        asset = Asset(filename, body, self.TYPES.get(ext, "application/octet-stream"), LONG_CACHE)
+        versioned = f"{stem}.{asset.digest}{ext}"
+        self.assets[versioned] = asset
+        self.urls[filename] = f"{self.prefix}/{versioned}"
+        return self.urls[filename]
+
+    def page(self, html: str) -> Asset:
+        return Asset("index.html", html.encode("utf-8"), self.TYPES[".html"], REVALIDATE)
+
+    def get(self, versioned: str) -> Asset | None:
+        return self.assets.get(versioned)
+
+    def info(self) -> dict:
+        return {"brotli": brotli is not None, **{a.name: a.info() for a in self.assets.values()}}
@@ -0,0 +1,146 @@
+"""
+Microbenchmarks de las funciones puras que corren en cada request.
+
+    python bench/microbench.py                         # corre y guarda bench/last.json
+    python bench/microbench.py --out bench/base.json   # guarda una línea base
+    python bench/microbench.py --compare bench/base.json [--threshold 15]
+    python bench/microbench.py --compare bench/base.json --against bench/last.json
+
+Por función reporta ns/op (mediana de --repeat corridas sobre todo el corpus de
+bench/queries.txt) y asignación de memoria por op (bytes asignados y pico
+transitorio, medidos con tracemalloc en una pasada aparte para no inflar los
+tiempos). En modo --compare sale con código 1 si alguna función empeoró más
+que --threshold %.
+"""
+import argparse, json, os, platform, statistics, sys, time, tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # main.py lee policies/ con rutas relativas
+
+import main  # noqa: E402
+
+def load_queries(path: str) -> list[str]:
+    with open(path, encoding="utf-8") as f:
+        return [l.strip() for l in f if l.strip() and not l.startswith("#")]
+
+def cases(queries: list[str]) -> dict:
+    """nombre -> fn(q) a medir. Las que no dependen de la consulta la ignoran."""
+    uniform_inputs = ["ola", "Aura skin", "metrored", "administrativo", "comercial", "asesor comercial", "optometra", "xyz"]
+    return {
+        "_n":                            lambda q: main._n(q),
+        "sanitize":                      lambda q: main.sanitize(q),
+        "route_domain":                  lambda q: main.route_domain(q),
+        "fuzzy_any":                     lambda q: main.fuzzy_any(q, ["atraso", "llegue tarde", "retraso", "minutos tarde"]),
+        "detect_intent_fixed":           lambda q: main.detect_intent_fixed(q),
+        "matcher.match":                 lambda q: main.MATCHER.match(q),
+        "flow.step":                     lambda q, _u=uniform_inputs: main.FLOWS.flows["uniformes"].step("cargo", _u[len(q) % len(_u)], main.link_by_title),
+        "speller.correct":               lambda q: main.SPELLER.correct(q),
+        "choose_access_slug":            lambda q: main.choose_access_slug(q, "NOMINA"),
+        "qa_bank.match":                 lambda q: main.QA_BANK.match(q),
+        "load_access_map_from_your_txt": lambda q: main.load_access_map_from_your_txt(),
+    }
+
+def time_case(fn, queries, repeat: int, min_time: float) -> float:
+    # calibración: cuántas pasadas del corpus caben en min_time
+    loops = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            for q in queries:
+                fn(q)
+        dt = time.perf_counter() - t0
+        if dt >= min_time:
+            break
+        loops *= 2
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter_ns()
+        for _ in range(loops):
+            for q in queries:
+                fn(q)
+        runs.append((time.perf_counter_ns() - t0) / (loops * len(queries)))
+    return statistics.median(runs)
+
+def alloc_case(fn, queries) -> tuple[float, float]:
+    """(bytes asignados por op, pico transitorio medio por op)."""
+    tracemalloc.start()
+    total = peak = 0
+    for q in queries:
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        snap0 = tracemalloc.take_snapshot()
+        fn(q)
+        snap1 = tracemalloc.take_snapshot()
+        _, p = tracemalloc.get_traced_memory()
+        total += sum(s.size_diff for s in snap1.compare_to(snap0, "filename") if s.size_diff > 0)
+        peak += max(0, p - before)
+    tracemalloc.stop()
+    return total / len(queries), peak / len(queries)
+
+def run(args) -> dict:
+    queries = load_queries(args.queries)
+    results = {}
+    for name, fn in cases(queries).items():
+        if args.only and name not in args.only:
+            continue
+        for q in queries[:3]:
+            fn(q)  # warm-up
+        ns = time_case(fn, queries, args.repeat, args.min_time)
+        alloc_bytes, peak_bytes = alloc_case(fn, queries)
+        results[name] = {"ns_per_op": round(ns, 1), "alloc_bytes_per_op": round(alloc_bytes, 1),
+                         "peak_bytes_per_op": round(peak_bytes, 1)}
+        print(f"{name:<32} {ns:>12,.0f} ns/op {alloc_bytes:>10,.0f} B/op {peak_bytes:>10,.0f} B peak", flush=True)
+    return {
+        "meta": {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "queries": len(queries),
+            "corpus_version": main.CORPUS.version,
+        },
+        "results": results,
+    }
+
+def compare(base: dict, cur: dict, threshold: float) -> int:
+    print(f"\n{'función':<32} {'base ns':>12} {'actual ns':>12} {'Δ%':>8}")
+    regressions = 0
+    for name, r in cur["results"].items():
+        b = base["results"].get(name)
+        if not b:
+            print(f"{name:<32} {'-':>12} {r['ns_per_op']:>12,.0f} {'nuevo':>8}")
+            continue
+        delta = (r["ns_per_op"] - b["ns_per_op"]) / b["ns_per_op"] * 100 if b["ns_per_op"] else 0.0
+        flag = "  <-- REGRESIÓN" if delta > threshold else ""
+        regressions += bool(flag)
+        print(f"{name:<32} {b['ns_per_op']:>12,.0f} {r['ns_per_op']:>12,.0f} {delta:>+7.1f}%{flag}")
+    print(f"\n{regressions} regresión(es) sobre {threshold:.0f}%")
+    return 1 if regressions else 0
+
+def main_cli():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--queries", default=os.path.join(ROOT, "bench", "queries.txt"))
+    ap.add_argument("--out", default=os.path.join(ROOT, "bench", "last.json"))
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--min-time", type=float, default=0.2, help="segundos mínimos por corrida")
+    ap.add_argument("--only", nargs="*", help="medir solo estas funciones")
+    ap.add_argument("--compare", metavar="BASE.json", help="comparar contra una corrida previa")
+    ap.add_argument("--against", metavar="CUR.json", help="con --compare: usar este JSON en vez de correr")
+    ap.add_argument("--threshold", type=float, default=15.0, help="%% de empeoramiento que cuenta como regresión")
+    args = ap.parse_args()
+
+    if args.against:
+        with open(args.against) as f:
+            cur = json.load(f)
+    else:
+        cur = run(args)
+        with open(args.out, "w") as f:
+            json.dump(cur, f, indent=2)
+        print(f"\nresultados en {args.out}")
+    if args.compare:
+        with open(args.compare) as f:
+            base = json.load(f)
+        sys.exit(compare(base, cur, args.threshold))
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,94 @@
+"""
+Tiempo de arranque en frío de la app, por paso (import e inicialización).
+
+    python bench/startup.py                          # 7 arranques, guarda bench/startup-last.json
+    python bench/startup.py --out bench/startup-base.json
+    python bench/startup.py --compare bench/startup-base.json [--threshold 20]
+    python bench/startup.py --env KB_SNAPSHOT= --env DOMAIN_CLASSIFIER=0
+
+Cada corrida es un proceso nuevo que importa main (como un worker de gunicorn)
+y devuelve STARTUP.report(); además se mide el proceso completo (intérprete
+incluido) y la creación diferida del cliente OpenAI (ensure_client, con una key
+falsa: no hace requests). Se reporta la mediana por paso. En modo --compare
+sale con código 1 si el total o algún paso de más de 5 ms empeoró más que
+--threshold %.
+"""
+import argparse, json, os, platform, statistics, subprocess, sys, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = (
+    "import json, sys, time\n"
+    "import main\n"
+    "t = time.perf_counter(); main.ensure_client(); lazy = (time.perf_counter() - t) * 1000\n"
+    "r = main.STARTUP.report(); r['ensure_client_ms'] = round(lazy, 1)\n"
+    "sys.stdout.write(json.dumps(r))\n"
+)
+
+def one_run(env: dict) -> dict:
+    t = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    wall = (time.perf_counter() - t) * 1000
+    r = json.loads(out.stdout.strip().splitlines()[-1])
+    return {"process_ms": wall, "ready_ms": r["ready_ms"], "ensure_client_ms": r["ensure_client_ms"],
+            **{f"step:{k}": v for k, v in r["steps"].items()}}
+
+def run(args) -> dict:
+    env = {**os.environ, "OPENAI_API_KEY": "fake", "LLM_WARMUP": "0", "PYTHONDONTWRITEBYTECODE": "1"}
+    for kv in args.env:
+        k, _, v = kv.partition("=")
+        env[k] = v
+    one_run(env)  # primera corrida: compila .pyc y calienta el page cache
+    runs = [one_run(env) for _ in range(args.runs)]
+    results = {k: round(statistics.median(r[k] for r in runs if k in r), 1) for k in runs[0]}
+    print(f"{'paso':<36} {'ms (mediana)':>14}")
+    for k, v in results.items():
+        print(f"{k:<36} {v:>14,.1f}")
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "runs": args.runs,
+        "env": args.env,
+        "results": results,
+    }
+
+def compare(base: dict, cur: dict, threshold: float) -> int:
+    print(f"\n{'paso':<36} {'base ms':>10} {'actual ms':>10} {'Δ%':>8}")
+    regressions = 0
+    for name, v in cur["results"].items():
+        b = base["results"].get(name)
+        if b is None:
+            print(f"{name:<36} {'-':>10} {v:>10,.1f} {'nuevo':>8}")
+            continue
+        delta = (v - b) / b * 100 if b else 0.0
+        counts = name in ("process_ms", "ready_ms") or max(v, b) >= 5
+        flag = "  <-- REGRESIÓN" if counts and delta > threshold else ""
+        regressions += bool(flag)
+        print(f"{name:<36} {b:>10,.1f} {v:>10,.1f} {delta:>+7.1f}%{flag}")
+    print(f"\n{regressions} regresión(es) sobre {threshold:.0f}%")
+    return 1 if regressions else 0
+
+def main_cli():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=7)
+    ap.add_argument("--env", action="append", default=[], metavar="K=V", help="variable de entorno para la app")
+    ap.add_argument("--out", default=os.path.join(ROOT, "bench", "startup-last.json"))
+    ap.add_argument("--compare", metavar="BASE.json", help="comparar contra una corrida previa")
+    ap.add_argument("--against", metavar="CUR.json", help="con --compare: usar este JSON en vez de correr")
+    ap.add_argument("--threshold", type=float, default=20.0, help="%% de empeoramiento que cuenta como regresión")
+    args = ap.parse_args()
+
+    if args.against:
+        with open(args.against) as f:
+            cur = json.load(f)
+    else:
+        cur = run(args)
+        with open(args.out, "w") as f:
+            json.dump(cur, f, indent=2)
+        print(f"\nguardado en {args.out}")
+    if args.compare:
+        with open(args.compare) as f:
+            sys.exit(compare(json.load(f), cur, args.threshold))
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,136 @@
+"""
+Circuit breaker para la llamada al modelo.
+
+closed     todo pasa; N fallos/timeouts consecutivos -> open
+open       se rechaza al instante (el caller usa fallback) durante reset_timeout
+half_open  pasa UNA llamada de prueba: éxito -> closed, fallo -> open
+
+Una llamada que se corta sin veredicto (cliente desconectado: GeneratorExit en el
+stream WSGI, CancelledError en el event loop) no cuenta como éxito ni como fallo,
+pero si era la prueba de half_open la libera (abandon); si no, el breaker quedaría
+en half_open para siempre sin dejar pasar otra.
+"""
+import threading, time
+
+class CircuitOpenError(Exception):
+    pass
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30, name: str = "openai"):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._opened_at = 0.0
+        self._probe = False
+        self.failures = 0      # consecutivos
+        self.trips = 0
+        self.rejected = 0
+        self.successes = 0
+        self.total_failures = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current()
+
+    def _current(self) -> str:
+        if self._state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = "half_open"
+            self._probe = False
+        return self._state
+
+    def is_open(self) -> bool:
+        """Chequeo previo barato: True (y cuenta el rechazo) si está abierto. No consume la prueba de half_open."""
+        with self._lock:
+            if self._current() == "open":
+                self.rejected += 1
+                return True
+            return False
+
+    def allow(self) -> bool:
+        """True si la llamada puede salir. En half_open solo deja pasar una prueba a la vez."""
+        return self.admit() is not None
+
+    def admit(self) -> str | None:
+        """Como allow(), pero dice qué concedió: "call" (cerrado), "probe" (la prueba de half_open) o None."""
+        with self._lock:
+            st = self._current()
+            if st == "closed":
+                return "call"
+            if st == "half_open" and not self._probe:
+                self._probe = True
+                return "probe"
+            self.rejected += 1
+            return None
+
+    def abandon(self, grant: str | None):
+        """La llamada concedida con `grant` terminó sin veredicto: si era la prueba, queda libre otra vez."""
+        if grant == "probe":
+            with self._lock:
+                if self._state == "half_open":
+                    self._probe = False
+
+    def record_success(self):
+        with self._lock:
+            self.successes += 1
+            self.failures = 0
+            self._state = "closed"
+            self._probe = False
+
+    def record_failure(self):
+        with self._lock:
+            self.total_failures += 1
+            self.failures += 1
+            if self._state == "half_open" or self.failures >= self.failure_threshold:
+                if self._state != "open":
+                    self.trips += 1
+                self._state = "open"
+                self._opened_at = time.monotonic()
+                self._probe = False
+
+    def call(self, fn):
+        grant = self.admit()
+        if grant is None:
+            raise CircuitOpenError(self.name)
+        try:
+            result = fn()
+        except Exception:
+            self.record_failure()
+            raise
+        except BaseException:
+            self.abandon(grant)
+            raise
+        self.record_success()
+        return result
+
+    async def acall(self, coro_fn):
+        grant = self.admit()
+        if grant is None:
+            raise CircuitOpenError(self.name)
+        try:
+            result = await coro_fn()
+        except Exception:
+            self.record_failure()
+            raise
+        except BaseException:  # CancelledError: cliente desconectado
+            self.abandon(grant)
+            raise
+        self.record_success()
+        return result
+
+    def info(self) -> dict:
+        with self._lock:
+            st = self._current()
+            return {
+                "state": st,
+                "consecutive_failures": self.failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_timeout": self.reset_timeout,
+                "open_for": round(max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at)), 1) if st == "open" else 0,
+                "trips": self.trips,
+                "rejected": self.rejected,
+                "successes": self.successes,
+                "failures": self.total_failures,
+            }
@@ -0,0 +1,103 @@
+"""
+Caché LRU + TTL para respuestas del modelo.
+
+Clave: (pregunta normalizada, dominio, versión del corpus). Al cambiar las
+políticas cambia la versión, así que las entradas viejas dejan de calzar; además
+se vacía explícitamente en la recarga del corpus.
+"""
+import threading, time
+from collections import OrderedDict
+from rapidfuzz import fuzz, process
+
+class ResponseCache:
+    """
+    max_entries: tope de entradas (LRU)
+    ttl:         segundos de vida de cada entrada
+    fuzzy_score: si > 0, una pregunta casi idéntica (fuzz.ratio >= fuzzy_score)
+                 del mismo dominio y versión también cuenta como acierto
+    """
+    def __init__(self, max_entries: int = 512, ttl: float = 3600, fuzzy_score: float = 0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.fuzzy_score = fuzzy_score
+        self._data = OrderedDict()   # key -> (expires_at, value)
+        self._by_scope = {}          # (domain, version) -> {qn: key}
+        self._lock = threading.Lock()
+        self.hits = self.fuzzy_hits = self.misses = 0
+        self.evictions = self.expirations = 0
+
+    @staticmethod
+    def key(qn: str, domain: str, version: str) -> tuple:
+        return (qn, domain, version)
+
+    def _drop(self, key):
+        self._data.pop(key, None)
+        scope = self._by_scope.get(key[1:])
+        if scope is not None:
+            scope.pop(key[0], None)
+            if not scope:
+                del self._by_scope[key[1:]]
+
+    def _live(self, key, now):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        if item[0] <= now:
+            self._drop(key)
+            self.expirations += 1
+            return None
+        self._data.move_to_end(key)
+        return item[1]
+
+    def get(self, qn: str, domain: str, version: str):
+        now = time.monotonic()
+        k = self.key(qn, domain, version)
+        with self._lock:
+            val = self._live(k, now)
+            if val is not None:
+                self.hits += 1
+                return val
+            if self.fuzzy_score > 0:
+                scope = self._by_scope.get((domain, version))
+                if scope:
+                    best = process.extractOne(qn, list(scope), scorer=fuzz.ratio,
+                                              processor=None, score_cutoff=self.fuzzy_score)
+                    if best:
+                        val = self._live(scope[best[0]], now)
+                        if val is not None:
+                            self.fuzzy_hits += 1
+                            return val
+            self.misses += 1
+            return None
+
+    def set(self, qn: str, domain: str, version: str, value):
+        k = self.key(qn, domain, version)
+        with self._lock:
+            if k in self._data:
+                self._data.move_to_end(k)
+            self._data[k] = (time.monotonic() + self.ttl, value)
+            self._by_scope.setdefault((domain, version), {})[qn] = k
+            while len(self._data) > self.max_entries:
+                old, _ = next(iter(self._data.items()))
+                self._drop(old)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._by_scope.clear()
+
+    def info(self) -> dict:
+        total = self.hits + self.fuzzy_hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "fuzzy_score": self.fuzzy_score,
+            "hits": self.hits,
+            "fuzzy_hits": self.fuzzy_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.fuzzy_hits) / total, 3) if total else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
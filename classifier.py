@@ -0,0 +1,225 @@
+"""
+Clasificador de dominio entrenado con el corpus de políticas.
+
+Vectores TF-IDF de n-gramas de caracteres (3-5, dentro de cada palabra) a
+partir de los términos de DOMAINS, los pasajes de policies/ y las secciones
+del banco de preguntas. Cada dominio queda como un centroide normalizado y una
+consulta se clasifica por similitud coseno contra todos a la vez. Con numpy
+los centroides son una matriz densa y un lote completo se puntúa en una sola
+operación vectorizada; sin numpy se usan listas invertidas n-grama ->
+[(dominio, peso)].
+
+El modelo se guarda como un artefacto compacto (JSON gzip) junto con la versión
+del corpus; al arrancar se carga si la versión coincide y si no se reentrena.
+
+Uso offline:  python classifier.py build [ruta]
+              python classifier.py "¿cuándo pagan la quincena?"
+"""
+import gzip, json, math, os
+from collections import Counter, namedtuple
+from retrieval import chunk_text, tokenize
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+Prediction = namedtuple("Prediction", "domain score margin")
+
+FORMAT = 2
+NGRAM = (3, 5)
+TERMS_WEIGHT = 0.5  # peso de los términos curados frente al texto de las políticas en cada centroide
+
+def ngrams(text: str, n_range: tuple = NGRAM) -> Counter:
+    """N-gramas de caracteres de cada palabra (normalizada, sin stopwords) con bordes ' '."""
+    lo, hi = n_range
+    out = Counter()
+    for tok in tokenize(text):
+        w = f" {tok} "
+        for n in range(lo, hi + 1):
+            for i in range(len(w) - n + 1):
+                out[w[i:i + n]] += 1
+    return out
+
+def _l2(vec: dict) -> dict:
+    norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+    return {k: v / norm for k, v in vec.items()}
+
+class DomainClassifier:
+    """
+    domains:  nombres en orden de prioridad ante empates
+    postings: n-grama -> (idf, ((dominio, peso del centroide), ...)); los centroides tienen norma 1
+    """
+    def __init__(self, domains: list[str], postings: dict, version: str = "", n_range: tuple = NGRAM):
+        self.domains = list(domains)
+        self.postings = postings
+        self.version = version
+        self.n_range = tuple(n_range)
+        self.vocab = {g: i for i, g in enumerate(postings)}  # n-grama -> columna de la matriz
+        if np is not None:
+            self.matrix = np.zeros((len(self.domains), len(postings)), dtype=np.float64)  # float64: mismo resultado que classify()
+            for col, (_, entries) in enumerate(postings.values()):
+                for d, w in entries:
+                    self.matrix[d, col] = w
+
+    # ---- entrenamiento ----
+    @classmethod
+    def train(cls, docs: list[tuple[str, str]], domain_terms: dict, version: str = "",
+              n_range: tuple = NGRAM, terms_weight: float = TERMS_WEIGHT) -> "DomainClassifier":
+        """docs: [(texto, dominio)] de las políticas; domain_terms: {DOMINIO: [términos]}."""
+        domains = list(domain_terms)
+        labeled = [(t, dom, True) for dom, terms in domain_terms.items() for t in terms]
+        labeled += [(t, dom, False) for t, dom in docs if dom in domain_terms]
+        grams = [ngrams(t, n_range) for t, _, _ in labeled]
+        df = Counter(g for c in grams for g in c)
+        n = len(labeled)
+        idf = {g: math.log((1 + n) / (1 + df[g])) + 1 for g in sorted(df)}
+        # centroide = mezcla de la media de los términos y la media de los pasajes
+        sums = {(dom, is_term): Counter() for dom in domains for is_term in (True, False)}
+        counts = Counter()
+        for (_, dom, is_term), c in zip(labeled, grams):
+            if not c:
+                continue
+            sums[(dom, is_term)].update(_l2({g: (1 + math.log(tf)) * idf[g] for g, tf in c.items()}))
+            counts[(dom, is_term)] += 1
+        entries = {g: [] for g in idf}
+        for d, dom in enumerate(domains):
+            parts = [(sums[(dom, k)], counts[(dom, k)], w) for k, w in ((True, terms_weight), (False, 1 - terms_weight))]
+            parts = [(s, c, w) for s, c, w in parts if c]
+            total = sum(w for _, _, w in parts) or 1.0
+            cen = Counter()
+            for s, c, w in parts:
+                for g, v in s.items():
+                    cen[g] += v / c * w / total
+            for g, w in _l2(cen).items():
+                entries[g].append((d, w))
+        postings = {g: (idf[g], tuple(e)) for g, e in entries.items()}
+        return cls(domains, postings, version=version, n_range=n_range)
+
+    @classmethod
+    def from_texts(cls, texts: dict, domain_terms: dict, version: str = "") -> "DomainClassifier":
+        """Pasajes de policies/ (dominio por archivo o por sección del banco) + términos de DOMAINS."""
+        docs = [(ch["section"] + "\n" + ch["text"], ch["domain"])
+                for source, text in texts.items() for ch in chunk_text(source, text) if ch["domain"]]
+        return cls.train(docs, domain_terms, version=version)
+
+    # ---- clasificación ----
+    def vector(self, text: str) -> dict:
+        """{n-grama: peso} TF-IDF normalizado, solo con n-gramas del vocabulario."""
+        vec = {}
+        for g, tf in ngrams(text, self.n_range).items():
+            e = self.postings.get(g)
+            if e is not None:
+                vec[g] = e[0] if tf == 1 else (1 + math.log(tf)) * e[0]
+        return _l2(vec)
+
+    def _predict(self, row) -> Prediction:
+        order = sorted(range(len(self.domains)), key=lambda d: (-row[d], d))
+        best = order[0]
+        second = row[order[1]] if len(order) > 1 else 0.0
+        return Prediction(self.domains[best], float(row[best]), float(row[best] - second))
+
+    def scores(self, text: str) -> list[float]:
+        """Coseno contra cada centroide (mismo orden que self.domains)."""
+        row = [0.0] * len(self.domains)
+        norm = 0.0
+        for g, tf in ngrams(text, self.n_range).items():
+            e = self.postings.get(g)
+            if e is None:
+                continue
+            x = e[0] if tf == 1 else (1 + math.log(tf)) * e[0]
+            norm += x * x
+            for d, cw in e[1]:
+                row[d] += x * cw
+        norm = math.sqrt(norm) or 1.0
+        return [r / norm for r in row]
+
+    def classify(self, text: str) -> Prediction:
+        return self._predict(self.scores(text))
+
+    def classify_many(self, texts: list[str]) -> list[Prediction]:
+        """Lote: todas las consultas en un solo gather + suma por segmentos (con numpy)."""
+        if np is None or not texts:
+            return [self.classify(t) for t in texts]
+        vecs = [self.vector(t) for t in texts]
+        cols = np.fromiter((self.vocab[g] for v in vecs for g in v), dtype=np.int64)
+        weights = np.fromiter((w for v in vecs for w in v.values()), dtype=np.float64)
+        lens = np.fromiter((len(v) for v in vecs), dtype=np.int64, count=len(vecs))
+        out = np.zeros((len(texts), len(self.domains)), dtype=np.float64)
+        nonempty = lens > 0
+        if cols.size:
+            starts = (np.cumsum(lens) - lens)[nonempty]
+            contrib = self.matrix[:, cols] * weights  # (dominios, n-gramas del lote)
+            out[nonempty] = np.add.reduceat(contrib, starts, axis=1).T
+        return [self._predict(row) for row in out.tolist()]
+
+    # ---- artefacto ----
+    def state(self) -> dict:
+        """Tipos básicos: se guarda como JSON (save) o tal cual con marshal en el snapshot de conocimiento."""
+        return {
+            "format": FORMAT,
+            "version": self.version,
+            "n_range": list(self.n_range),
+            "domains": self.domains,
+            "postings": self.postings,
+        }
+
+    @classmethod
+    def from_state(cls, data: dict) -> "DomainClassifier":
+        if data.get("format") != FORMAT:
+            raise ValueError(f"formato de modelo no soportado: {data.get('format')!r}")
+        postings = data["postings"]
+        if postings and isinstance(next(iter(postings.values())), list):  # desde JSON: listas en vez de tuplas
+            postings = {g: (idf, tuple(map(tuple, e))) for g, (idf, e) in postings.items()}
+        return cls(data["domains"], postings, version=data["version"], n_range=tuple(data["n_range"]))
+
+    def save(self, path: str):
+        tmp = f"{path}.{os.getpid()}.tmp"  # varios workers pueden guardarlo a la vez
+        with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=9) as f:
+            json.dump(self.state(), f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "DomainClassifier":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return cls.from_state(json.load(f))
+
+    def info(self) -> dict:
+        return {
+            "version": self.version,
+            "domains": len(self.domains),
+            "features": len(self.postings),
+            "backend": "numpy" if np is not None else "python",
+        }
+
+def load_or_train(path: str | None, texts: dict, domain_terms: dict, version: str) -> DomainClassifier:
+    """Artefacto de `path` si es de esta versión del corpus y de estos dominios; si no, entrena y lo guarda."""
+    if path:
+        try:
+            clf = DomainClassifier.load(path)
+            if clf.version == version and clf.domains == list(domain_terms):
+                return clf
+        except (OSError, ValueError, KeyError):
+            pass
+    clf = DomainClassifier.from_texts(texts, domain_terms, version=version)
+    if path:
+        try:
+            clf.save(path)
+        except OSError:
+            pass  # sistema de archivos de solo lectura: queda en memoria
+    return clf
+
+if __name__ == "__main__":
+    import sys
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import main
+    if sys.argv[1:2] == ["build"]:
+        path = sys.argv[2] if len(sys.argv) > 2 else main.DOMAIN_MODEL_PATH
+        clf = DomainClassifier.from_texts(main.CORPUS.texts(), main.DOMAINS, version=main.CORPUS.version)
+        clf.save(path)
+        print(f"{path}: {os.path.getsize(path)} bytes {json.dumps(clf.info())}")
+    else:
+        q = " ".join(sys.argv[1:]) or "¿cuándo pagan la quincena?"
+        clf = main.DOMAIN_CLASSIFIER or DomainClassifier.from_texts(main.CORPUS.texts(), main.DOMAINS)
+        print(clf.classify(q))
+        print(dict(zip(clf.domains, (round(s, 3) for s in clf.scores(q)))))
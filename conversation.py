@@ -0,0 +1,102 @@
+"""
+Memoria de conversación por sid, acotada.
+
+Cada sid guarda sus últimos intercambios (ring buffer de `max_turns`) y un
+resumen. Cuando los intercambios superan `turn_tokens`, los más antiguos se
+compactan en el resumen de forma incremental (resumen nuevo = resumen previo +
+intercambios viejos) y el resumen tiene su propio tope (`summary_tokens`): el
+contexto que se manda al modelo no crece con el largo del chat. Los sids viven
+en un SessionStore, con su TTL y su tope de sesiones.
+"""
+import hashlib, html, re
+from tokens import count_tokens
+
+_TAGS = re.compile(r"<[^>]+>")
+_SENTENCE = re.compile(r"(?<=[.!?])\s")
+
+def plain(text: str, max_chars: int = 400) -> str:
+    """HTML de la respuesta -> texto plano de una línea, cortado a max_chars."""
+    t = " ".join(html.unescape(_TAGS.sub(" ", text or "")).split())
+    return t if len(t) <= max_chars else t[: max_chars - 1].rstrip() + "…"
+
+def extractive_summary(summary: str, turns: list[dict], max_tokens: int) -> str:
+    """Resumen local (sin IA): una línea por intercambio; si no entra, se conservan las más recientes."""
+    lines = [l for l in (summary or "").splitlines() if l]
+    for t in turns:
+        first = _SENTENCE.split(t["a"], 1)[0]
+        lines.append(f"- Preguntó: {plain(t['q'], 160)} -> {plain(first, 200)}")
+    out, used = [], 0
+    for line in reversed(lines):
+        n = count_tokens(line)
+        if used + n > max_tokens:
+            break
+        out.append(line)
+        used += n
+    return "\n".join(reversed(out))
+
+class ConversationMemory:
+    """
+    store: SessionStore (valores {"summary": str, "turns": [{"q","a","d"}], "domain": str})
+    summarizer: fn(resumen_previo, intercambios, max_tokens) -> resumen
+    """
+    def __init__(self, store, max_turns: int = 4, turn_tokens: int = 400, summary_tokens: int = 200,
+                 answer_chars: int = 400, summarizer=extractive_summary):
+        self.store = store
+        self.max_turns = max_turns
+        self.turn_tokens = turn_tokens
+        self.summary_tokens = summary_tokens
+        self.answer_chars = answer_chars
+        self.summarizer = summarizer
+        self.compactions = 0
+
+    def get(self, sid: str) -> dict | None:
+        return self.store.get(sid) if sid else None
+
+    def add(self, sid: str, question: str, answer_html: str, domain: str):
+        if not sid:
+            return
+        mem = self.store.get(sid) or {"summary": "", "turns": []}
+        turns = mem["turns"]
+        turns.append({"q": question, "a": plain(answer_html, self.answer_chars), "d": domain})
+        old = []
+        while len(turns) > 1 and (len(turns) > self.max_turns or self._tokens(turns) > self.turn_tokens):
+            old.append(turns.pop(0))
+        if old:
+            mem["summary"] = self.summarizer(mem["summary"], old, self.summary_tokens)
+            self.compactions += 1
+        mem["domain"] = domain
+        self.store.set(sid, mem)
+
+    @staticmethod
+    def _tokens(turns: list[dict]) -> int:
+        return sum(count_tokens(t["q"]) + count_tokens(t["a"]) for t in turns)
+
+    @staticmethod
+    def messages(mem: dict | None) -> list[dict]:
+        """Contexto para chat.completions: resumen + últimos intercambios (van después del system prompt)."""
+        if not mem:
+            return []
+        out = []
+        if mem.get("summary"):
+            out.append({"role": "system", "content": f"[RESUMEN DE LA CONVERSACIÓN]\n{mem['summary']}"})
+        for t in mem.get("turns", []):
+            out.append({"role": "user", "content": t["q"]})
+            out.append({"role": "assistant", "content": t["a"]})
+        return out
+
+    @staticmethod
+    def fingerprint(mem: dict | None) -> str:
+        """Huella corta del contexto, para que caché y singleflight no mezclen conversaciones."""
+        if not mem:
+            return ""
+        raw = mem.get("summary", "") + "\0" + "\0".join(t["q"] + "\0" + t["a"] for t in mem.get("turns", []))
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:10]
+
+    def info(self) -> dict:
+        return {
+            "max_turns": self.max_turns,
+            "turn_tokens": self.turn_tokens,
+            "summary_tokens": self.summary_tokens,
+            "compactions": self.compactions,
+            "store": self.store.info(),
+        }
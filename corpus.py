@@ -0,0 +1,128 @@
+"""
+Corpus de políticas en memoria.
+
+Se lee una sola vez desde policies/ y se vuelve a cargar (swap atómico) cuando
+cambia el mtime de algún archivo. El system prompt terminado se cachea por
+dominio, así el request no hace I/O ni arma strings.
+"""
+import hashlib, logging, os, threading, time
+from utils import read_txt
+
+POLICY_FILES = {
+    "vacaciones": "politica_vacaciones.txt",
+    "permisos":   "politica_permisos.txt",
+    "compras":    "politica_compras.txt",
+    "comision":   "politica_comision.txt",
+    "banco":      "banco_preguntas.txt",
+}
+
+log = logging.getLogger(__name__)
+
+class _Snapshot:
+    __slots__ = ("texts", "version", "hashes", "mtimes", "prompts", "loaded_at")
+
+    def __init__(self, texts: dict, mtimes: tuple):
+        self.texts = texts
+        self.mtimes = mtimes
+        h = hashlib.sha1()
+        for k in sorted(texts):
+            h.update(k.encode()); h.update(b"\0"); h.update(texts[k].encode("utf-8")); h.update(b"\0")
+        self.version = h.hexdigest()[:12]
+        self.hashes = {k: hashlib.sha1(v.encode("utf-8")).hexdigest()[:12] for k, v in texts.items()}
+        self.prompts = {}
+        self.loaded_at = time.time()
+
+class PolicyCorpus:
+    """
+    Políticas + prompts por dominio, con recarga en caliente.
+      - check_interval: cada cuántos segundos se revisan los mtime (0 = en cada acceso)
+      - prompt_builder: fn(texts, domain) -> str
+    """
+    def __init__(self, base: str = "policies", prompt_builder=None, check_interval: float = 2.0):
+        self.base = base
+        self.prompt_builder = prompt_builder
+        self.check_interval = check_interval
+        self.reloads = 0
+        self.listener_errors = 0
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._checked = 0.0
+        self._snap = self._load()
+
+    # ---- carga ----
+    def _mtimes(self) -> tuple:
+        out = []
+        for name in POLICY_FILES.values():
+            try:
+                out.append(os.stat(os.path.join(self.base, name)).st_mtime_ns)
+            except OSError:
+                out.append(None)
+        return tuple(out)
+
+    def _load(self) -> _Snapshot:
+        mtimes = self._mtimes()
+        texts = {k: read_txt(os.path.join(self.base, f)) for k, f in POLICY_FILES.items()}
+        return _Snapshot(texts, mtimes)
+
+    def on_reload(self, fn):
+        """Registra fn(corpus) para reconstruir índices derivados tras una recarga."""
+        self._listeners.append(fn)
+        return fn
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Recarga si cambió algún mtime (o siempre con force). Devuelve True si hubo swap.
+        Un listener que falla no frena a los demás, pero queda en el log: su índice
+        derivado sigue con la versión anterior del corpus.
+        """
+        with self._lock:
+            self._checked = time.monotonic()
+            if not force and self._mtimes() == self._snap.mtimes:
+                return False
+            self._snap = self._load()
+            self.reloads += 1
+        for fn in self._listeners:
+            try:
+                fn(self)
+            except Exception:
+                self.listener_errors += 1
+                log.exception("listener de recarga %s falló (corpus %s)",
+                              getattr(fn, "__name__", fn), self._snap.version)
+        return True
+
+    def _fresh(self) -> _Snapshot:
+        if time.monotonic() - self._checked >= self.check_interval:
+            self.reload()
+        return self._snap
+
+    # ---- lectura ----
+    def texts(self) -> dict:
+        return self._fresh().texts
+
+    @property
+    def version(self) -> str:
+        return self._fresh().version
+
+    @property
+    def hashes(self) -> dict:
+        """Versión de cada archivo por separado: {"vacaciones": "3f1c…", ...}."""
+        return self._fresh().hashes
+
+    def prompt(self, domain: str) -> str:
+        snap = self._fresh()
+        p = snap.prompts.get(domain)
+        if p is None:
+            p = self.prompt_builder(snap.texts, domain)
+            snap.prompts[domain] = p
+        return p
+
+    def info(self) -> dict:
+        snap = self._snap
+        return {
+            "version": snap.version,
+            "loaded_at": int(snap.loaded_at),
+            "reloads": self.reloads,
+            "listener_errors": self.listener_errors,
+            "cached_prompts": sorted(snap.prompts),
+            "sizes": {k: len(v) for k, v in snap.texts.items()},
+        }
@@ -0,0 +1,166 @@
+"""
+Motor de flujos guiados (asistentes con menús de chips) definidos como datos.
+
+Cada archivo flows/<nombre>.json es un grafo de estados:
+
+    {
+      "name": "uniformes",
+      "path": "uniform",                 camino en la respuesta y en métricas (default "flow")
+      "triggers": ["uniforme"],          subcadenas (minúsculas, sin tildes) que inician el flujo
+      "fuzzy": 88,                       umbral de partial_ratio cuando no hay coincidencia exacta
+      "options": {"OLA": ["ola"], ...},  valor -> sinónimos; el orden es la prioridad del fuzzy
+      "menus": {"marca": {"hint": "¿Dime en dónde trabajas?", "chips": ["OLA", ...]}},
+      "start": "marca",
+      "intro": {"menus": ["marca"]},     respuesta al iniciar
+      "any": {"OLA": {...}},             transiciones válidas en cualquier estado
+      "states": {"marca": {"on": {"valor": {...}}, "else": {...}}, ...}
+    }
+
+Una transición es {"goto": estado, "text": "...", "link": título de accesos.txt,
+"menus": [...]} (todo opcional; sin goto se queda en el estado) y responde
+  text<br>link  +  <br><br>  +  menús unidos por <br>
+
+Al cargar se arma todo lo que no depende del request: diccionario exacto
+sinónimo normalizado -> valor, candidatos de fuzzy por estado (solo los valores
+que ese estado acepta) y el HTML de menús y respuestas (escapado una vez); lo
+único que se resuelve en el request es el enlace, porque accesos.txt se recarga
+en caliente. El estado de cada sid ({"flow", "state"}) vive en el SessionStore.
+"""
+import glob, html, json, os
+from rapidfuzz import fuzz
+from utils import _n
+
+def render_chip(label: str, value: str) -> str:
+    return f'<a class="chip" data-chip="{html.escape(value)}"><span>👉</span> {html.escape(label)}</a>'
+
+def render_menu(hint: str, chips: list) -> str:
+    """chips: ["valor", ...] o [["etiqueta", "valor"], ...]"""
+    pairs = [(c, c) if isinstance(c, str) else tuple(c) for c in chips]
+    body = " ".join(render_chip(label, value) for label, value in pairs)
+    return f'<div class="box"><div class="hint">{html.escape(hint)}</div><div class="chips">{body}</div></div>'
+
+class _Reply:
+    """Respuesta prerenderada: head + enlace (si hay) + tail."""
+    __slots__ = ("goto", "head", "link", "tail")
+
+    def __init__(self, spec: dict, menus: dict, where: str):
+        for m in spec.get("menus", []):
+            if m not in menus:
+                raise ValueError(f"{where}: menú desconocido {m!r}")
+        self.goto = spec.get("goto")
+        self.link = spec.get("link")
+        body = "<br>".join(menus[m] for m in spec.get("menus", []))
+        text = spec.get("text", "")
+        sep = "<br><br>" if body else ""
+        if self.link:
+            self.head, self.tail = (text + "<br>" if text else ""), sep + body
+        else:
+            self.head, self.tail = (text + sep + body if text else body), ""
+
+    def render(self, link_fn) -> str:
+        return self.head + link_fn(self.link) + self.tail if self.link else self.head
+
+class _State:
+    __slots__ = ("name", "on", "miss", "fuzzy")
+
+    def __init__(self, name: str, on: dict, miss: _Reply, fuzzy: list):
+        self.name = name
+        self.on = on        # valor -> _Reply
+        self.miss = miss
+        self.fuzzy = fuzzy  # [(sinónimo normalizado, valor)] en orden de prioridad
+
+class Flow:
+    def __init__(self, spec: dict):
+        self.name = spec["name"]
+        self.path = spec.get("path", "flow")
+        self.triggers = tuple(_n(t) for t in spec.get("triggers", []))
+        self.threshold = float(spec.get("fuzzy", 88))
+        menus = {name: render_menu(m["hint"], m["chips"]) for name, m in spec.get("menus", {}).items()}
+        options = spec.get("options", {})
+        self.exact = {}
+        synonyms = []
+        for value, syns in options.items():
+            for s in (value, *syns):
+                k = _n(s)
+                self.exact.setdefault(k, value)
+                if (k, value) not in synonyms:
+                    synonyms.append((k, value))
+        anywhere = {v: _Reply(t, menus, f"{self.name}.any.{v}") for v, t in spec.get("any", {}).items()}
+        self.states = {}
+        for name, st in spec["states"].items():
+            if "else" not in st:
+                raise ValueError(f"{self.name}.{name}: falta 'else'")
+            on = {**anywhere, **{v: _Reply(t, menus, f"{self.name}.{name}.{v}") for v, t in st.get("on", {}).items()}}
+            for v in on:
+                if v not in options:
+                    raise ValueError(f"{self.name}.{name}: valor sin opción {v!r}")
+            self.states[name] = _State(name, on, _Reply(st["else"], menus, f"{self.name}.{name}.else"),
+                                       [(k, v) for k, v in synonyms if v in on])
+        self.start = spec["start"]
+        self.intro = _Reply(spec.get("intro", {}), menus, f"{self.name}.intro")
+        for st in self.states.values():
+            for r in (*st.on.values(), st.miss):
+                if r.goto is not None and r.goto not in self.states:
+                    raise ValueError(f"{self.name}.{st.name}: estado desconocido {r.goto!r}")
+        if self.start not in self.states:
+            raise ValueError(f"{self.name}: estado inicial desconocido {self.start!r}")
+
+    def match(self, text: str, state: _State) -> str | None:
+        """Valor elegido: diccionario exacto primero; fuzzy solo si no hay, y sobre lo que acepta el estado."""
+        t = _n(text)
+        value = self.exact.get(t)
+        if value is not None:
+            return value
+        for k, v in state.fuzzy:
+            if fuzz.partial_ratio(t, k) >= self.threshold:
+                return v
+        return None
+
+    def step(self, state_name: str, text: str, link_fn) -> tuple[str, str]:
+        """(estado siguiente, html) para la entrada `text` en `state_name`."""
+        st = self.states.get(state_name) or self.states[self.start]
+        reply = st.on.get(self.match(text, st)) or st.miss
+        return reply.goto or st.name, reply.render(link_fn)
+
+class FlowEngine:
+    """
+    store:   SessionStore con el estado por sid
+    link_fn: fn(título de accesos.txt) -> HTML del enlace ("" si no existe)
+    """
+    def __init__(self, flows: list[Flow], store, link_fn):
+        self.flows = {f.name: f for f in flows}
+        self.store = store
+        self.link_fn = link_fn
+
+    @classmethod
+    def load(cls, base: str, store, link_fn) -> "FlowEngine":
+        flows = []
+        for path in sorted(glob.glob(os.path.join(base, "*.json"))):
+            with open(path, encoding="utf-8") as f:
+                flows.append(Flow(json.load(f)))
+        return cls(flows, store, link_fn)
+
+    def trigger(self, text: str) -> Flow | None:
+        t = _n(text)
+        for f in self.flows.values():
+            if any(w in t for w in f.triggers):
+                return f
+        return None
+
+    def start(self, sid: str, flow: Flow) -> str:
+        self.store.set(sid, {"flow": flow.name, "state": flow.start})
+        return flow.intro.render(self.link_fn)
+
+    def step(self, sid: str, text: str) -> tuple[Flow, str] | None:
+        """Avanza el flujo activo del sid; None si no tiene ninguno."""
+        ctx = self.store.get(sid)
+        flow = self.flows.get(ctx.get("flow")) if ctx else None
+        if flow is None:
+            return None
+        ctx["state"], htmlx = flow.step(ctx.get("state"), text, self.link_fn)
+        self.store.set(sid, ctx)  # persiste el paso (y renueva el TTL)
+        return flow, htmlx
+
+    def info(self) -> dict:
+        return {f.name: {"states": len(f.states), "options": len(f.exact), "triggers": list(f.triggers)}
+                for f in self.flows.values()}
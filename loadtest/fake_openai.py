@@ -0,0 +1,165 @@
+"""
+Servidor local que imita POST /v1/chat/completions de OpenAI (normal y stream)
+para pruebas de carga sin tráfico real:
+
+    python loadtest/fake_openai.py --port 8900 --latency lognormal:1.2,0.4 --error-rate 0.02 --tokens 80
+
+y la app apuntando a él:
+
+    OPENAI_API_KEY=fake OPENAI_BASE_URL=http://127.0.0.1:8900/v1 gunicorn ...
+
+--latency   fixed:S | uniform:A,B | lognormal:MEDIANA,SIGMA   (segundos)
+--error-rate fracción de llamadas que responden 500
+--tokens    palabras de la respuesta (usage.completion_tokens ≈ tokens)
+usage.prompt_tokens_details.cached_tokens imita el caché de prefijos del proveedor.
+GET /stats  contadores del servidor; GET /config?latency=..&error_rate=.. cambia la config en caliente.
+"""
+import argparse, json, math, random, threading, time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
+
+WORDS = ("según la política vigente el colaborador debe registrar la solicitud en el sistema "
+         "con al menos cinco días de anticipación y contar con la aprobación de su jefe directo").split()
+
+def parse_latency(spec: str):
+    kind, _, args = spec.partition(":")
+    vals = [float(x) for x in args.split(",") if x]
+    if kind == "fixed":
+        return lambda: vals[0]
+    if kind == "uniform":
+        return lambda: random.uniform(vals[0], vals[1])
+    if kind == "lognormal":
+        median, sigma = vals
+        return lambda: random.lognormvariate(math.log(median), sigma)
+    raise ValueError(f"latencia no soportada: {spec!r}")
+
+class State:
+    def __init__(self, latency: str, error_rate: float, tokens: int):
+        self.lock = threading.Lock()
+        self.configure(latency, error_rate, tokens)
+        self.requests = self.errors = self.streams = self.in_flight = self.max_in_flight = 0
+        self.prefixes = set()
+
+    def configure(self, latency: str, error_rate: float, tokens: int):
+        self.latency_spec, self.latency = latency, parse_latency(latency)
+        self.error_rate, self.tokens = error_rate, tokens
+
+    def cached(self, prompt_text: str) -> int:
+        """Imita el caché de prefijos: desde 1024 tokens, bloques de 128 ya vistos."""
+        blocks = [(end, hash(prompt_text[: end * 4])) for end in range(1024, len(prompt_text) // 4 + 1, 128)]
+        hit = 0
+        with self.lock:
+            for end, key in blocks:
+                if key not in self.prefixes:
+                    break
+                hit = end
+            self.prefixes.update(key for _, key in blocks)
+        return hit
+
+    def info(self) -> dict:
+        return {"latency": self.latency_spec, "error_rate": self.error_rate, "tokens": self.tokens,
+                "requests": self.requests, "errors": self.errors, "streams": self.streams,
+                "in_flight": self.in_flight, "max_in_flight": self.max_in_flight}
+
+STATE: State = None
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, como la API real
+
+    def log_message(self, *a):
+        pass
+
+    def send_json(self, status: int, data: dict):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/config":
+            q = {k: v[0] for k, v in parse_qs(url.query).items()}
+            with STATE.lock:
+                STATE.configure(q.get("latency", STATE.latency_spec),
+                                float(q.get("error_rate", STATE.error_rate)),
+                                int(q.get("tokens", STATE.tokens)))
+        self.send_json(200, STATE.info())
+
+    def do_POST(self):
+        req = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))) or b"{}")
+        with STATE.lock:
+            STATE.requests += 1
+            STATE.in_flight += 1
+            STATE.max_in_flight = max(STATE.max_in_flight, STATE.in_flight)
+            fail = random.random() < STATE.error_rate
+            delay, tokens = STATE.latency(), STATE.tokens
+            if fail:
+                STATE.errors += 1
+        try:
+            if fail:
+                time.sleep(min(delay, 0.05))
+                return self.send_json(500, {"error": {"message": "fake upstream error", "type": "server_error"}})
+            words = [WORDS[i % len(WORDS)] for i in range(tokens)]
+            prompt_text = "".join(m.get("content") or "" for m in req.get("messages", []))
+            prompt_tokens = len(prompt_text) // 4
+            usage = {"prompt_tokens": prompt_tokens, "completion_tokens": tokens, "total_tokens": prompt_tokens + tokens,
+                     "prompt_tokens_details": {"cached_tokens": STATE.cached(prompt_text)}}
+            if req.get("stream"):
+                with STATE.lock:
+                    STATE.streams += 1
+                return self.stream(req, words, delay, usage)
+            time.sleep(delay)
+            self.send_json(200, {
+                "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()),
+                "model": req.get("model", "fake"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(words)},
+                             "finish_reason": "stop"}],
+                "usage": usage,
+            })
+        finally:
+            with STATE.lock:
+                STATE.in_flight -= 1
+
+    def stream(self, req: dict, words: list, delay: float, usage: dict):
+        """Primer token tras ~30% de la latencia, el resto repartido hasta completarla."""
+        self.send_response(200)
+        self.send_header("content-type", "text/event-stream")
+        self.send_header("transfer-encoding", "chunked")
+        self.end_headers()
+
+        def chunk(data: dict):
+            payload = f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(payload):x}\r\n".encode() + payload + b"\r\n")
+            self.wfile.flush()
+
+        base = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                "model": req.get("model", "fake")}
+        time.sleep(delay * 0.3)
+        step = delay * 0.7 / max(1, len(words))
+        for i, w in enumerate(words):
+            chunk({**base, "choices": [{"index": 0, "delta": {"content": w if i == 0 else " " + w}, "finish_reason": None}]})
+            time.sleep(step)
+        chunk({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if (req.get("stream_options") or {}).get("include_usage"):
+            chunk({**base, "choices": [], "usage": usage})
+        payload = b"data: [DONE]\n\n"
+        self.wfile.write(f"{len(payload):x}\r\n".encode() + payload + b"\r\n0\r\n\r\n")
+
+def serve(port: int, latency: str, error_rate: float, tokens: int):
+    global STATE
+    STATE = State(latency, error_rate, tokens)
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    server.serve_forever()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--port", type=int, default=8900)
+    ap.add_argument("--latency", default="lognormal:1.0,0.4")
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--tokens", type=int, default=60)
+    a = ap.parse_args()
+    print(f"fake OpenAI en http://127.0.0.1:{a.port}/v1 (latency={a.latency}, error_rate={a.error_rate})", flush=True)
+    serve(a.port, a.latency, a.error_rate, a.tokens)
@@ -0,0 +1,245 @@
+"""
+Prueba de carga de /responder de punta a punta, sin tráfico real a OpenAI.
+
+Levanta loadtest/fake_openai.py y la app (gunicorn) apuntando a él, reproduce
+una mezcla de preguntas (reglas fijas, flujo de uniformes, preguntas que van
+al modelo) y reporta throughput, p50/p95/p99 por camino de respuesta y errores:
+
+    python loadtest/run.py --workers 2 --concurrency 50 --duration 30
+    python loadtest/run.py --app main:app --workers 4 --rps 40 --fake-latency lognormal:2,0.5
+    python loadtest/run.py --url http://127.0.0.1:5000 --concurrency 20   # contra una app ya levantada
+
+--concurrency N  lazo cerrado: N usuarios que preguntan apenas reciben respuesta
+--rps R          lazo abierto: llegadas de Poisson a R req/s (mide colas de verdad)
+--mix            pesos fixed=..,uniform=..,llm=..  (uniform = conversación de 4 mensajes)
+--unique-llm     agrega un sufijo único a las preguntas al modelo para que no las sirva la caché
+"""
+import argparse, asyncio, itertools, json, os, random, signal, statistics, subprocess, sys, time, uuid
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIXED = [
+    "me olvide de marcar ayer",
+    "llegue tarde por el trafico me van a descontar?",
+    "me sale usuario bloqueado en d2 movil",
+    "como hago un cambio de turno con mi compañera",
+    "cuantos dias me dan por maternidad",
+    "cuanto dura la lactancia",
+    "quiero pedir bacaciones para diciembre",
+]
+UNIFORM = ["quiero ver la politica de uniformes", "OLA", "Comercial", "Optómetra"]
+LLM = [
+    "falleció mi abuelo cuantos dias tengo",
+    "me pueden negar un permiso medico?",
+    "cuanto tiempo tengo para legalizar una compra",
+    "como se calcula la comision si vendo lentes de contacto",
+    "a que banco me depositan el sueldo si no tengo cuenta",
+    "puedo pedir permiso para un tramite en el registro civil",
+    "quien aprueba las compras de mas de 500 dolares",
+]
+
+def pct(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    s = sorted(values)
+    return s[min(len(s) - 1, int(q * len(s)))]
+
+# respuestas sin IA por falla o por falta de cupo (shed: control de admisión)
+DEGRADED_PATHS = ("fallback", "exception", "shed")
+
+class Recorder:
+    def __init__(self):
+        self.by_path = {}     # path -> [latencias]
+        self.errors = {}      # tipo -> n
+        self.started = self.ended = 0.0
+
+    def ok(self, path: str, seconds: float):
+        self.by_path.setdefault(path, []).append(seconds)
+
+    def error(self, kind: str):
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def report(self) -> dict:
+        elapsed = max(1e-9, self.ended - self.started)
+        ok = sum(len(v) for v in self.by_path.values())
+        total = ok + sum(self.errors.values())
+        degraded = sum(len(self.by_path.get(p, [])) for p in DEGRADED_PATHS)
+        shed = len(self.by_path.get("shed", []))
+        every = [x for v in self.by_path.values() for x in v]
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "requests": total,
+            "throughput_rps": round(ok / elapsed, 2),
+            "http_error_rate": round((total - ok) / total, 4) if total else 0.0,
+            "degraded_rate": round(degraded / ok, 4) if ok else 0.0,
+            "shed_rate": round(shed / ok, 4) if ok else 0.0,
+            "errors": self.errors,
+            "all": summary(every),
+            "paths": {p: summary(v) for p, v in sorted(self.by_path.items())},
+        }
+
+def summary(v: list[float]) -> dict:
+    return {"n": len(v), "mean_ms": round(statistics.fmean(v) * 1000, 1) if v else 0.0,
+            "p50_ms": round(pct(v, 0.50) * 1000, 1), "p95_ms": round(pct(v, 0.95) * 1000, 1),
+            "p99_ms": round(pct(v, 0.99) * 1000, 1), "max_ms": round(max(v, default=0) * 1000, 1)}
+
+async def ask(http: httpx.AsyncClient, rec: Recorder, mensaje: str, sid: str):
+    t0 = time.perf_counter()
+    try:
+        r = await http.post("/responder", json={"mensaje": mensaje, "sid": sid})
+    except httpx.TimeoutException:
+        return rec.error("timeout")
+    except httpx.HTTPError as e:
+        return rec.error(type(e).__name__)
+    dt = time.perf_counter() - t0
+    if r.status_code != 200:
+        return rec.error(f"http_{r.status_code}")
+    rec.ok(r.json().get("path", "unknown"), dt)
+
+async def scenario(http: httpx.AsyncClient, rec: Recorder, kind: str, unique_llm: bool, n: int):
+    if kind == "uniform":
+        sid = uuid.uuid4().hex
+        for msg in UNIFORM:
+            await ask(http, rec, msg, sid)
+    elif kind == "fixed":
+        await ask(http, rec, random.choice(FIXED), "")
+    else:
+        q = random.choice(LLM)
+        await ask(http, rec, f"{q} (caso {n})" if unique_llm else q, "")
+
+async def load(args, rec: Recorder):
+    kinds, weights = zip(*args.mix.items())
+    pick = lambda: random.choices(kinds, weights)[0]
+    counter = itertools.count()
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as http:
+        rec.started = time.perf_counter()
+        deadline = rec.started + args.duration
+        if args.rps:
+            tasks = set()
+            while time.perf_counter() < deadline:
+                t = asyncio.create_task(scenario(http, rec, pick(), args.unique_llm, next(counter)))
+                tasks.add(t)
+                t.add_done_callback(tasks.discard)
+                await asyncio.sleep(random.expovariate(args.rps))
+            if tasks:
+                await asyncio.wait(tasks)
+        else:
+            async def user():
+                while time.perf_counter() < deadline:
+                    await scenario(http, rec, pick(), args.unique_llm, next(counter))
+            await asyncio.gather(*(user() for _ in range(args.concurrency)))
+        rec.ended = time.perf_counter()
+
+def wait_http(url: str, timeout: float = 30):
+    t_end = time.time() + timeout
+    while time.time() < t_end:
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"no responde: {url}")
+
+def boot(args) -> list[subprocess.Popen]:
+    """Fake OpenAI + gunicorn con la app, en su propio grupo de procesos."""
+    procs = []
+    fake = [sys.executable, os.path.join(ROOT, "loadtest", "fake_openai.py"), "--port", str(args.fake_port),
+            "--latency", args.fake_latency, "--error-rate", str(args.fake_error_rate), "--tokens", str(args.fake_tokens)]
+    procs.append(subprocess.Popen(fake, cwd=ROOT, start_new_session=True))
+    wait_http(f"http://127.0.0.1:{args.fake_port}/stats")
+
+    env = dict(os.environ, OPENAI_API_KEY="fake-key", OPENAI_BASE_URL=f"http://127.0.0.1:{args.fake_port}/v1")
+    env.update(kv.split("=", 1) for kv in args.env)
+    cmd = [sys.executable, "-m", "gunicorn", "-w", str(args.workers), "-b", f"127.0.0.1:{args.port}",
+           "--timeout", str(args.gunicorn_timeout), "--log-level", "warning"]
+    if args.app.startswith("asgi:"):
+        cmd += ["-k", "uvicorn.workers.UvicornWorker"]
+    elif args.threads > 1:
+        cmd += ["-k", "gthread", "--threads", str(args.threads)]
+    procs.append(subprocess.Popen(cmd + [args.app], cwd=ROOT, env=env, start_new_session=True))
+    try:
+        wait_http(f"http://127.0.0.1:{args.port}/ping")
+    except RuntimeError:
+        stop(procs)
+        raise
+    return procs
+
+def stop(procs: list[subprocess.Popen]):
+    for p in reversed(procs):
+        try:
+            os.killpg(p.pid, signal.SIGTERM)
+            p.wait(10)
+        except ProcessLookupError:
+            pass
+        except subprocess.TimeoutExpired:
+            os.killpg(p.pid, signal.SIGKILL)
+
+def print_report(rep: dict):
+    print(f"\n{rep['requests']} requests en {rep['elapsed_s']} s -> {rep['throughput_rps']} req/s"
+          f" | errores HTTP {rep['http_error_rate']:.1%} | degradadas (fallback/exception/shed) {rep['degraded_rate']:.1%}")
+    print(f"rechazadas por control de admisión (shed): {rep['shed_rate']:.1%}")
+    if rep["errors"]:
+        print("errores:", rep["errors"])
+    print(f"\n{'camino':<12} {'n':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, s in [*rep["paths"].items(), ("TOTAL", rep["all"])]:
+        print(f"{name:<12} {s['n']:>7} {s['p50_ms']:>9.1f} {s['p95_ms']:>9.1f} {s['p99_ms']:>9.1f} {s['max_ms']:>9.1f}")
+    if "fake_openai" in rep:
+        f = rep["fake_openai"]
+        print(f"\nfake OpenAI: {f['requests']} llamadas, {f['errors']} errores, máx. en vuelo {f['max_in_flight']}")
+
+def parse_mix(s: str) -> dict:
+    mix = {k: float(v) for k, v in (kv.split("=") for kv in s.split(","))}
+    unknown = set(mix) - {"fixed", "uniform", "llm"}
+    if unknown:
+        raise argparse.ArgumentTypeError(f"tipos desconocidos en --mix: {', '.join(sorted(unknown))}")
+    return mix
+
+def main_cli():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    g = ap.add_argument_group("carga")
+    g.add_argument("--concurrency", type=int, default=20)
+    g.add_argument("--rps", type=float, default=0, help="si > 0, lazo abierto a esta tasa (ignora --concurrency)")
+    g.add_argument("--duration", type=float, default=20, help="segundos")
+    g.add_argument("--mix", type=parse_mix, default=parse_mix("fixed=0.5,uniform=0.1,llm=0.4"))
+    g.add_argument("--unique-llm", action="store_true")
+    g.add_argument("--timeout", type=float, default=30, help="timeout del cliente de carga")
+    g.add_argument("--max-connections", type=int, default=500)
+    g = ap.add_argument_group("app")
+    g.add_argument("--url", help="usar una app ya levantada (no arranca nada)")
+    g.add_argument("--app", default="main:app", help="main:app (WSGI) o asgi:app (uvicorn)")
+    g.add_argument("--workers", type=int, default=2)
+    g.add_argument("--threads", type=int, default=1, help="con main:app, >1 usa el worker gthread")
+    g.add_argument("--port", type=int, default=8911)
+    g.add_argument("--gunicorn-timeout", type=int, default=30)
+    g.add_argument("--env", nargs="*", default=[], metavar="K=V", help="variables extra para la app (LLM_BUDGET=5 ...)")
+    g = ap.add_argument_group("fake OpenAI")
+    g.add_argument("--fake-port", type=int, default=8900)
+    g.add_argument("--fake-latency", default="lognormal:1.0,0.4")
+    g.add_argument("--fake-error-rate", type=float, default=0.0)
+    g.add_argument("--fake-tokens", type=int, default=60)
+    ap.add_argument("--out", help="guardar el reporte en JSON")
+    args = ap.parse_args()
+
+    procs = []
+    if not args.url:
+        procs = boot(args)
+        args.url = f"http://127.0.0.1:{args.port}"
+    rec = Recorder()
+    try:
+        asyncio.run(load(args, rec))
+        rep = rec.report()
+        if procs:
+            rep["fake_openai"] = httpx.get(f"http://127.0.0.1:{args.fake_port}/stats").json()
+    finally:
+        stop(procs)
+    rep["config"] = {k: v for k, v in vars(args).items() if k != "mix"} | {"mix": args.mix}
+    print_report(rep)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(rep, f, indent=2, ensure_ascii=False)
+
+if __name__ == "__main__":
+    main_cli()
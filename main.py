@@ -1,20 +1,72 @@
-from flask import Flask, request, jsonify, render_template_string, redirect
+from startup import STARTUP  # primero: mide los imports y la inicialización que siguen
+from flask import Flask, Response, request, jsonify, redirect, stream_with_context
 from dotenv import load_dotenv
 from markupsafe import Markup
-import os, re, html, unicodedata
-import httpx
+import hashlib, importlib.util, os, re, html, json, sqlite3, threading, time
+from concurrent.futures import Future, ThreadPoolExecutor
+STARTUP.mark("import flask")
 
-# 3rd party
+# 3rd party (openai y httpx se importan recién al crear el cliente: ver ensure_client)
 from rapidfuzz import fuzz
-from unidecode import unidecode
-from openai import OpenAI
+from utils import _n, normalize_q, read_txt, sanitize, slugify
+STARTUP.mark("import rapidfuzz+unidecode")
+
+from access import AccessLinks, parse_accesos
+from assets import AssetBundle
+from corpus import POLICY_FILES, PolicyCorpus
+from retrieval import PassageIndex, render_passages
+from qa_bank import QABank, answer_html
+from matcher import RuleMatcher
+from classifier import DomainClassifier, load_or_train
+from cache import ResponseCache
+from answer_store import AnswerStore
+from sessions import open_session_store
+from snapshot import open_snapshot
+from conversation import ConversationMemory
+from flows import FlowEngine
+from speller import Speller
+from singleflight import AsyncSingleFlight, SingleFlight
+from breaker import CircuitBreaker, CircuitOpenError
+from admission import Admission, AdmissionRejected
+from metrics import Metrics
+from tokens import Pricing, backend as token_backend, count_messages, count_tokens, truncate_tokens, usage_report
+STARTUP.mark("import modules")
 
 # ================= Base =================
 load_dotenv()
 app = Flask(__name__)
 
+# Métricas por etapa y por camino de respuesta (GET /metrics, formato Prometheus).
+# Con METRICS_DIR los workers de gunicorn comparten sus snapshots y /metrics los suma.
+METRICS = Metrics("olivia")
+METRICS.describe("stage_seconds", "histogram", "Latencia por etapa del pipeline de /responder")
+METRICS.describe("request_seconds", "histogram", "Latencia total por camino de respuesta")
+METRICS.describe("answers_total", "counter", "Respuestas por camino (uniform, fixed, qa, cache, store, llm, fallback, shed, exception)")
+METRICS.describe("llm_tokens_total", "counter", "Tokens reportados por OpenAI (prompt, cached, completion)")
+METRICS.describe("llm_cost_usd_total", "counter", "Costo estimado de las llamadas al modelo (USD)")
+METRICS.describe("spelling_checked_total", "counter", "Consultas revisadas por el corrector ortográfico")
+METRICS.describe("spelling_corrected_total", "counter", "Consultas que el corrector ortográfico cambió")
+METRICS.describe("prompt_trimmed_total", "counter", "System prompts recortados por superar PROMPT_MAX_TOKENS")
+METRICS.describe("qa_bank_hits_total", "counter", "Respuestas directas desde el banco de preguntas")
+if os.getenv("METRICS_DIR"):
+    METRICS.enable_multiprocess(os.getenv("METRICS_DIR"), float(os.getenv("METRICS_FLUSH", "5")))
+STARTUP.mark("flask+metrics")
+
 # ---------------- OpenAI ----------------
+# El SDK (openai + httpx, ~250 ms de import) y el cliente se crean en el primer uso o
+# en el warm-up en segundo plano: un worker que no llama al modelo no los paga.
 OPENAI_INIT_ERROR = None
+LLM_WARMUP = os.getenv("LLM_WARMUP", "1") == "1"
+
+# Presupuesto de latencia por request para la IA: vencido, se responde con fallback
+LLM_BUDGET = float(os.getenv("LLM_BUDGET", "8"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "0"))
+
+# Tras N fallos/timeouts seguidos se deja de llamar a OpenAI por BREAKER_RESET segundos
+BREAKER = CircuitBreaker(
+    failure_threshold=int(os.getenv("BREAKER_FAILURES", "5")),
+    reset_timeout=float(os.getenv("BREAKER_RESET", "30")),
+)
 
 def get_openai_client():
     """
@@ -27,97 +79,100 @@ def get_openai_client():
         OPENAI_INIT_ERROR = "NO_API_KEY"
         return None
     try:
-        # httpx client SIN heredar variables de entorno (HTTP(S)_PROXY, etc.)
-        transport = httpx.HTTPTransport(retries=2)
-        http_client = httpx.Client(transport=transport, timeout=20.0, trust_env=False)
-        return OpenAI(api_key=key, http_client=http_client)
+        with STARTUP.lazy_step("openai_client"):
+            openai, httpx = openai_sdk()
+            # httpx client SIN heredar variables de entorno (HTTP(S)_PROXY, etc.)
+            # retries del transporte = solo errores de conexión; los del SDK los limita LLM_MAX_RETRIES
+            transport = httpx.HTTPTransport(retries=1)
+            http_client = httpx.Client(transport=transport, timeout=LLM_BUDGET, trust_env=False)
+            c = openai.OpenAI(api_key=key, http_client=http_client, max_retries=LLM_MAX_RETRIES)
+        OPENAI_INIT_ERROR = None
+        return c
     except Exception as e:
         OPENAI_INIT_ERROR = f"{type(e).__name__}: {e}"
         return None
 
-client = get_openai_client()
-
-# --------------- Utilidades -------------
-def _n(s: str) -> str:
-    return unidecode((s or "").lower())
-
-def read_txt(path: str) -> str:
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return f.read().strip()
-    except Exception:
-        return ""
+def openai_sdk():
+    """(openai, httpx), importados en el primer uso."""
+    import httpx, openai
+    return openai, httpx
 
-def sanitize(text: str) -> str:
-    text = (text or "").replace("\r", " ").replace("\n", " ").strip()
-    return re.sub(r"\s+", " ", text)
+client = None
+_client_lock = threading.Lock()
 
-def slugify(label: str) -> str:
-    """convierte 'Política de uniformes - Administrativos' -> 'politica_de_uniformes_administrativos'"""
-    s = unidecode(label or "").strip().lower()
-    s = re.sub(r"[^a-z0-9]+", "_", s)
-    s = re.sub(r"_+", "_", s).strip("_")
-    return s
+def ensure_client():
+    """Cliente OpenAI del proceso; se crea una sola vez aunque lo pidan varios hilos a la vez."""
+    global client
+    if client is None:
+        with _client_lock:
+            if client is None:
+                client = get_openai_client()
+    return client
+
+_warmup_pid = None
+
+def warmup():
+    """Crea el cliente en un hilo aparte, una vez por proceso y ya con el worker atendiendo
+    (no al importar: con --preload el fork cortaría el import a medias)."""
+    global _warmup_pid
+    if not LLM_WARMUP or _warmup_pid == os.getpid():
+        return
+    _warmup_pid = os.getpid()
+    threading.Thread(target=ensure_client, name="llm-warmup", daemon=True).start()
+
+@app.before_request
+def _warmup_on_first_request():
+    if _warmup_pid != os.getpid():
+        warmup()
 
 # --------------- Policies ----------------
 def load_policies() -> dict:
-    base = "policies"
-    return {
-        "vacaciones": read_txt(os.path.join(base, "politica_vacaciones.txt")),
-        "permisos":   read_txt(os.path.join(base, "politica_permisos.txt")),
-        "compras":    read_txt(os.path.join(base, "politica_compras.txt")),
-        "comision":   read_txt(os.path.join(base, "politica_comision.txt")),
-        "banco":      read_txt(os.path.join(base, "banco_preguntas.txt")),
-    }
+    return CORPUS.texts()
 
-# --------------- Accesos -----------------
-def load_access_map_from_your_txt() -> dict:
-    """
-    Lee policies/accesos.txt con tu formato:
-      TÍTULO EN UNA LÍNEA
-          URL EN LA SIGUIENTE LÍNEA
-    (Hay líneas en blanco entre pares; pueden venir con tabs)
-    Devuelve: { slug: {"label": titulo, "url": url} }
-    """
-    path = os.path.join("policies", "accesos.txt")
-    mapping = {}
-    if not os.path.isfile(path):
-        return mapping
-
-    def is_url(line: str) -> bool:
-        return line.startswith("http://") or line.startswith("https://") or line.startswith("chrome-extension://")
-
-    title_buffer = None
-    with open(path, "r", encoding="utf-8") as f:
-        for raw in f:
-            line = raw.strip()
-            if not line:
-                continue
-            # algunas líneas vienen con "Título  <tab> URL"
-            if "\t" in line and "http" in line:
-                parts = [p.strip() for p in line.split("\t") if p.strip()]
-                # intenta detectar "titulo \t url"
-                if len(parts) >= 2 and is_url(parts[1]):
-                    title = parts[0]
-                    url = parts[1]
-                    mapping[slugify(title)] = {"label": title, "url": url}
-                    title_buffer = None
-                    continue
-
-            if is_url(line):
-                if title_buffer:
-                    mapping[slugify(title_buffer)] = {"label": title_buffer, "url": line}
-                    title_buffer = None
-                else:
-                    # url sin título previo: ignora
-                    pass
-            else:
-                # es un título
-                title_buffer = line
+# Snapshot compilado de policies/ (python snapshot.py build): índices ya armados en un
+# archivo mapeado en memoria; solo se usa si su hash coincide con los archivos actuales
+KB_SNAPSHOT_DEFAULT = "policies.kb"
+KB, KB_STATUS = open_snapshot(os.getenv("KB_SNAPSHOT", KB_SNAPSHOT_DEFAULT), "policies")
+STARTUP.mark("snapshot")
 
-    return mapping
+def kb_section(name: str, version: str | None = None):
+    """Sección del snapshot; None si no hay snapshot o si es de otra versión del corpus (recarga)."""
+    if KB is None:
+        return None
+    try:
+        state = KB.section(name)
+    except Exception:
+        return None
+    return state if version is None or state.get("version") == version else None
 
-ACCESS_MAP = load_access_map_from_your_txt()
+# --------------- Accesos -----------------
+# Reglas de accesos contextuales (títulos tal cual en accesos.txt); ver access.AccessLinks
+ACCESS_RULES = [
+    {"title": "Correo Zimbra", "any": ["correo","email","zimbra","office","mail"]},
+    {"title": "Correo Office", "any": ["correo","email","zimbra","office","mail"]},
+    # horarios: si menciona norte/sur, solo ese; si no, ambos
+    {"title": "Horario Region Norte", "any": ["horario","hora"], "group": "horarios", "narrow": "norte"},
+    {"title": "Horario Region Sur",   "any": ["horario","hora"], "group": "horarios", "narrow": "sur"},
+    # en accesos.txt 'Twins' apunta a la home de Twiins corporativa
+    {"title": "Twins", "any": ["rol de pagos","mi rol","descargar rol","comprobante","twiins","twins"],
+     "only_domains": ["NOMINA","VACACIONES","PERMISOS"]},
+    {"title": "Biométrica", "any": ["biometr","d2movil","marcaci","marcar"], "domains": ["BIOMETRIKA"]},
+    {"title": "Apolo", "any": ["ticket","soporte","novedad","apolo"]},
+]
+
+ACCESS = AccessLinks(
+    os.path.join("policies", "accesos.txt"),
+    ACCESS_RULES,
+    check_interval=float(os.getenv("POLICY_CHECK_INTERVAL", "2")),
+    mapping=kb_section("access"),
+)
+STARTUP.mark("access")
+# Segundos que el navegador/proxy puede reutilizar el redirect de /go/<slug>
+GO_CACHE_SECONDS = int(os.getenv("GO_CACHE_SECONDS", "300"))
+
+def load_access_map_from_your_txt() -> dict:
+    """{ slug: {"label": titulo, "url": url} } leído de policies/accesos.txt (ver access.parse_accesos)."""
+    return parse_accesos(read_txt(os.path.join("policies", "accesos.txt")))
 
 def short_href(slug: str, label: str) -> str:
     return f'<a href="/go/{slug}" target="_blank">{html.escape(label)}</a>'
@@ -125,10 +180,15 @@ def short_href(slug: str, label: str) -> str:
 @app.route("/go/<slug>")
 def go(slug):
     slug = (slug or "").lower()
-    data = ACCESS_MAP.get(slug)
+    data = ACCESS.get(slug)
     if not data:
-        return redirect("/", code=302)
-    return redirect(data["url"], code=302)
+        resp = redirect("/", code=302)
+        resp.headers["Cache-Control"] = "no-cache"
+        return resp
+    # 302 cacheable por poco tiempo: si cambia accesos.txt, el link nuevo llega en minutos
+    resp = redirect(data["url"], code=302)
+    resp.headers["Cache-Control"] = f"public, max-age={GO_CACHE_SECONDS}"
+    return resp
 
 # ------------- Dominios RRHH -------------
 DOMAINS = {
@@ -151,15 +211,6 @@ DOMAINS = {
     "COMISIONES": ["comision","comisiones","ip","indicadores","metas","aceleradores"],
 }
 
-def route_domain(q: str) -> str:
-    qn = _n(q)
-    best, score = "PERMISOS", 0
-    for dom, terms in DOMAINS.items():
-        s = max((fuzz.partial_ratio(qn, _n(t)) for t in terms), default=0)
-        if s > score:
-            best, score = dom, s
-    return best
-
 # ------- Reglas deterministas seguras ----
 def fuzzy_any(q: str, terms: list[str], score=85) -> bool:
     qn = _n(q)
@@ -193,44 +244,62 @@ RESP_VACACIONES = "Vacaciones: 15 días/año; desde el 6° sumas 1 día anual ha
 RESP_NOMINA_ROL = "Para ver/descargar tu rol: Twiins > Rol de Pagos > PDF. ¿Te ayudo con algo más?"
 RESP_SEGURO = "Seguro médico Humana: revisa cobertura y red; coordina con médico ocupacional cuando aplique. ¿Te ayudo con algo más?"
 
-def detect_intent_fixed(q: str) -> str | None:
-    if fuzzy_any(q, [
+# Intenciones fijas como datos. El orden es la prioridad: gana la primera que dispare.
+#   terms:  dispara si alguno alcanza min_score (partial_ratio, default 85)
+#   all_of: dispara también si cada grupo tiene alguna subcadena en la consulta
+INTENT_RULES = [
+    {"id": "omision", "response": RESP_OMISION, "terms": [
         "olvido de marcar","me olvide de marcar","omision de marcacion","no marque","no hice la marcacion",
         "sin registro de marcacion","no me registro la marcacion","se me paso marcar","marcacion omitida","falta de marcacion"
-    ]) or (("olvid" in _n(q) or "omision" in _n(q)) and ("marc" in _n(q) or "biometr" in _n(q))):
-        return RESP_OMISION
-    if fuzzy_any(q, ["atraso","llegue tarde","retraso","minutos tarde","multa por atraso","descuento por atraso"]):
-        return RESP_ATRASOS
-    if fuzzy_any(q, ["trafico","pico y placa","clima","lluvia","partido","evento","alarma","mecanico","detenido"]):
-        return RESP_NO_PERMISOS_COMUNES
-    if fuzzy_any(q, ["usuario bloqueado","dispositivo no autorizado","fuera de rango","gps","ubicacion","error de marcacion","d2movilplus error"]):
-        return RESP_TECNICO_BIOMETRIA
-    if fuzzy_any(q, ["cambio de turno","reemplazo de turno","intercambiar turno","cambiar horario"]):
-        return RESP_CAMBIO_TURNO
-    if fuzzy_any(q, ["maternidad"]): return RESP_MATERNIDAD
-    if fuzzy_any(q, ["paternidad"]): return RESP_PATERNIDAD
-    if fuzzy_any(q, ["lactancia"]):  return RESP_LACTANCIA
-    if fuzzy_any(q, ["fallecimiento"]): return RESP_FALLECIMIENTO
-    if fuzzy_any(q, ["gestiones personales","tramites personales","reunion escolar","cedula","documento de identidad"]):
-        return RESP_GESTIONES_PERSONALES
-    if fuzzy_any(q, ["vacaciones","tomar vacaciones","pedir vacaciones"]): return RESP_VACACIONES
-    if fuzzy_any(q, ["rol de pagos","ver rol","descargar rol","mi rol","comprobante de pago"]): return RESP_NOMINA_ROL
-    if fuzzy_any(q, ["seguro","humana","cobertura medica","red medica","prestadores"]): return RESP_SEGURO
-    return None
+    ], "all_of": [["olvid","omision"], ["marc","biometr"]]},
+    {"id": "atrasos", "response": RESP_ATRASOS, "terms": [
+        "atraso","llegue tarde","retraso","minutos tarde","multa por atraso","descuento por atraso"]},
+    {"id": "no_permisos_comunes", "response": RESP_NO_PERMISOS_COMUNES, "terms": [
+        "trafico","pico y placa","clima","lluvia","partido","evento","alarma","mecanico","detenido"]},
+    {"id": "tecnico_biometria", "response": RESP_TECNICO_BIOMETRIA, "terms": [
+        "usuario bloqueado","dispositivo no autorizado","fuera de rango","gps","ubicacion","error de marcacion","d2movilplus error"]},
+    {"id": "cambio_turno", "response": RESP_CAMBIO_TURNO, "terms": [
+        "cambio de turno","reemplazo de turno","intercambiar turno","cambiar horario"]},
+    {"id": "maternidad", "response": RESP_MATERNIDAD, "terms": ["maternidad"]},
+    {"id": "paternidad", "response": RESP_PATERNIDAD, "terms": ["paternidad"]},
+    {"id": "lactancia", "response": RESP_LACTANCIA, "terms": ["lactancia"]},
+    {"id": "fallecimiento", "response": RESP_FALLECIMIENTO, "terms": ["fallecimiento"]},
+    {"id": "gestiones_personales", "response": RESP_GESTIONES_PERSONALES, "terms": [
+        "gestiones personales","tramites personales","reunion escolar","cedula","documento de identidad"]},
+    {"id": "vacaciones", "response": RESP_VACACIONES, "terms": ["vacaciones","tomar vacaciones","pedir vacaciones"]},
+    {"id": "nomina_rol", "response": RESP_NOMINA_ROL, "terms": [
+        "rol de pagos","ver rol","descargar rol","mi rol","comprobante de pago"]},
+    {"id": "seguro", "response": RESP_SEGURO, "terms": ["seguro","humana","cobertura medica","red medica","prestadores"]},
+]
+
+# Intenciones + dominios compilados una vez; una sola pasada de rapidfuzz por consulta
+MATCHER = RuleMatcher(INTENT_RULES, DOMAINS, default_domain="PERMISOS")
+STARTUP.mark("matcher")
+
+def route_domain(q: str) -> str:
+    return MATCHER.match(q).domain
+
+def detect_intent_fixed(q: str) -> str | None:
+    it = MATCHER.match(q).intent
+    return it["response"] if it else None
 
 # ---------------- Prompt -----------------
-def system_prompt_from(p: dict, domain: str) -> str:
-    return f"""
+# Prefijo estable (reglas + políticas) y lo variable al final: el proveedor cachea
+# prefijos idénticos, así el corpus completo se reutiliza entre dominios y requests.
+PROMPT_HEAD = """
 Eres OLIVIA, asistente virtual de Grupo OLA. Respondes cálida y directa, máx. 3 líneas.
-Usa SOLO la información oficial y limita tu respuesta al DOMINIO actual.
-
-DOMINIO ACTUAL: {domain}
+Usa SOLO la información oficial y limita tu respuesta al DOMINIO ACTUAL (indicado al final).
 
 [REGLAS FIJAS]
 - Si el usuario consulta por olvido/omisión de marcaciones, responde literalmente:
   "De acuerdo con la política, no se puede justificar la omisión de marcaciones por olvido. Desde la 4ª omisión en el mes se aplica una sanción de $15."
+""".strip()
+
+def _prompt(domain: str, body: str) -> str:
+    return f"{PROMPT_HEAD}\n\n{body}\n\nDOMINIO ACTUAL: {domain}"
 
-[POLÍTICAS OFICIALES]
+def system_prompt_from(p: dict, domain: str) -> str:
+    return _prompt(domain, f"""[POLÍTICAS OFICIALES]
 VACACIONES:
 {p.get('vacaciones','')}
 
@@ -244,8 +313,173 @@ COMISIONES:
 {p.get('comision','')}
 
 BANCO DE PREGUNTAS DO:
-{p.get('banco','')}
-""".strip()
+{p.get('banco','')}""")
+
+def system_prompt_from_passages(passages: list[dict], domain: str) -> str:
+    # en el orden del corpus, no por puntaje: preguntas que recuperan los mismos pasajes
+    # arman el mismo prompt (y comparten el prefijo cacheado por el proveedor)
+    passages = sorted(passages, key=lambda p: p["id"])
+    return _prompt(domain, "[POLÍTICAS OFICIALES - EXTRACTOS RELEVANTES]\n" + render_passages(passages))
+
+# Corpus en memoria: se recarga solo si cambia algún mtime en policies/
+CORPUS = PolicyCorpus(
+    base="policies",
+    prompt_builder=system_prompt_from,
+    check_interval=float(os.getenv("POLICY_CHECK_INTERVAL", "2")),
+)
+
+def prebuild_prompts(corpus: PolicyCorpus):
+    for dom in DOMAINS:
+        corpus.prompt(dom)
+
+prebuild_prompts(CORPUS)
+CORPUS.on_reload(prebuild_prompts)
+STARTUP.mark("corpus+prompts")
+
+# Recuperación de pasajes: top-k del dominio dentro de un presupuesto de tokens
+RETRIEVAL_ENABLED = os.getenv("RETRIEVAL_ENABLED", "1") == "1"
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "6"))
+RETRIEVAL_TOKEN_BUDGET = int(os.getenv("RETRIEVAL_TOKEN_BUDGET", "1200"))
+RETRIEVAL_MIN_CONFIDENCE = float(os.getenv("RETRIEVAL_MIN_CONFIDENCE", "0.5"))
+
+PASSAGE_INDEX = None
+
+def build_passage_index(corpus: PolicyCorpus):
+    global PASSAGE_INDEX
+    state = kb_section("passages", corpus.version)
+    PASSAGE_INDEX = (PassageIndex.from_state(state) if state
+                     else PassageIndex.from_texts(corpus.texts(), version=corpus.version))
+
+build_passage_index(CORPUS)
+CORPUS.on_reload(build_passage_index)
+STARTUP.mark("passage_index")
+
+# Banco de preguntas: respuestas curadas sin pasar por OpenAI
+QA_ENABLED = os.getenv("QA_ENABLED", "1") == "1"
+QA_MIN_SCORE = float(os.getenv("QA_MIN_SCORE", "88"))
+QA_MIN_COVERAGE = float(os.getenv("QA_MIN_COVERAGE", "0.75"))
+QA_MIN_QUERY_COVERAGE = float(os.getenv("QA_MIN_QUERY_COVERAGE", "0.6"))
+
+QA_BANK = None
+
+def build_qa_bank(corpus: PolicyCorpus):
+    global QA_BANK
+    params = dict(min_score=QA_MIN_SCORE, min_coverage=QA_MIN_COVERAGE, min_query_coverage=QA_MIN_QUERY_COVERAGE)
+    state = kb_section("qa_bank", corpus.version)
+    QA_BANK = (QABank.from_state(state, **params) if state
+               else QABank.from_text(corpus.texts()["banco"], version=corpus.version, **params))
+
+build_qa_bank(CORPUS)
+CORPUS.on_reload(build_qa_bank)
+STARTUP.mark("qa_bank")
+
+def qa_bank() -> QABank:
+    CORPUS.texts()  # dispara la recarga por mtime si corresponde
+    return QA_BANK
+
+# Clasificador de dominio (TF-IDF de n-gramas del corpus) para el enrutamiento de MATCHER;
+# el modelo se guarda en DOMAIN_MODEL_PATH y se reutiliza mientras no cambie el corpus
+DOMAIN_CLASSIFIER_ENABLED = os.getenv("DOMAIN_CLASSIFIER", "1") == "1"
+DOMAIN_MODEL_PATH = os.getenv("DOMAIN_MODEL_PATH", "domain_model.json.gz")
+DOMAIN_CLASSIFIER = None
+
+def build_domain_classifier(corpus: PolicyCorpus):
+    global DOMAIN_CLASSIFIER
+    state = kb_section("classifier", corpus.version)
+    if state and state["domains"] == list(DOMAINS):
+        DOMAIN_CLASSIFIER = DomainClassifier.from_state(state)
+    else:
+        DOMAIN_CLASSIFIER = load_or_train(DOMAIN_MODEL_PATH, corpus.texts(), DOMAINS, corpus.version)
+    MATCHER.classifier = DOMAIN_CLASSIFIER
+
+if DOMAIN_CLASSIFIER_ENABLED:
+    build_domain_classifier(CORPUS)
+    CORPUS.on_reload(build_domain_classifier)
+STARTUP.mark("classifier")
+
+# Caché de respuestas del modelo (clave: pregunta normalizada + dominio + versión del corpus)
+RESPONSE_CACHE = ResponseCache(
+    max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "512")),
+    ttl=float(os.getenv("CACHE_TTL", "3600")),
+    fuzzy_score=float(os.getenv("CACHE_FUZZY_SCORE", "0")),
+)
+CORPUS.on_reload(lambda corpus: RESPONSE_CACHE.clear())
+
+# Respuestas pregeneradas por warmup.py (SQLite, persistente entre deploys y compartido por
+# los workers); cada una se sirve mientras no cambien las políticas que entraron a su prompt
+ANSWER_STORE_PATH = os.getenv("ANSWER_STORE", "answers.db")
+try:
+    ANSWER_STORE = AnswerStore(ANSWER_STORE_PATH) if ANSWER_STORE_PATH else None
+except sqlite3.Error:
+    ANSWER_STORE = None  # sistema de archivos de solo lectura: sin respuestas pregeneradas
+
+# Preguntas idénticas en vuelo comparten una sola llamada al modelo
+# (SINGLEFLIGHT para main:app con hilos, ASYNC_SINGLEFLIGHT para asgi:app)
+SINGLEFLIGHT_TIMEOUT = float(os.getenv("SINGLEFLIGHT_TIMEOUT", str(LLM_BUDGET)))
+SINGLEFLIGHT = SingleFlight()
+ASYNC_SINGLEFLIGHT = AsyncSingleFlight()
+
+# Control de admisión de la etapa del modelo (por worker): fichas por sid y globales,
+# tope de llamadas en vuelo y una cola corta; lo que no entra recibe el fallback al instante.
+# Las respuestas sin IA (reglas, uniformes, banco, caché, /go/) no pasan por acá.
+ADMISSION = Admission(
+    max_concurrency=int(os.getenv("LLM_CONCURRENCY", "24")),
+    queue_size=int(os.getenv("LLM_QUEUE", "24")),
+    queue_timeout=float(os.getenv("LLM_QUEUE_TIMEOUT", "1")),
+    rate=float(os.getenv("LLM_RATE", "0")),
+    burst=float(os.getenv("LLM_RATE_BURST", "20")),
+    sid_rate=float(os.getenv("SID_RATE", "0.5")),
+    sid_burst=float(os.getenv("SID_BURST", "4")),
+)
+
+# Tope de tokens del system prompt: si se pasa, se recorta el contexto
+PROMPT_MAX_TOKENS = int(os.getenv("PROMPT_MAX_TOKENS", "10000"))
+# USD por millón de tokens para el costo estimado (gpt-4o-mini)
+PRICING = Pricing(
+    float(os.getenv("LLM_PRICE_INPUT", "0.15")),
+    float(os.getenv("LLM_PRICE_CACHED", "0.075")),
+    float(os.getenv("LLM_PRICE_OUTPUT", "0.60")),
+)
+
+def build_system_prompt(q: str, domain: str) -> tuple[str, dict | None]:
+    """Prompt con los pasajes recuperados; si la confianza es baja, el prompt completo del dominio."""
+    full = CORPUS.prompt(domain)  # también dispara la recarga por mtime
+    if not RETRIEVAL_ENABLED or PASSAGE_INDEX is None:
+        return guard_prompt(q, domain, full, None)
+    r = PASSAGE_INDEX.retrieve(
+        q, domain,
+        top_k=RETRIEVAL_TOP_K,
+        token_budget=RETRIEVAL_TOKEN_BUDGET,
+        min_confidence=RETRIEVAL_MIN_CONFIDENCE,
+    )
+    if r["fallback"]:
+        return guard_prompt(q, domain, full, r)
+    return guard_prompt(q, domain, system_prompt_from_passages(r["passages"], domain), r)
+
+def guard_prompt(q: str, domain: str, prompt: str, r: dict | None) -> tuple[str, dict | None]:
+    """
+    Si el prompt supera PROMPT_MAX_TOKENS: primero los pasajes más relevantes que
+    quepan (sin umbral de confianza) y, si aun así no alcanza, corte duro del texto.
+    """
+    if count_tokens(prompt) <= PROMPT_MAX_TOKENS:
+        return prompt, r
+    METRICS.inc("prompt_trimmed_total")
+    budget = PROMPT_MAX_TOKENS - count_tokens(_prompt(domain, ""))
+    if PASSAGE_INDEX is not None:
+        r = PASSAGE_INDEX.retrieve(q, domain, top_k=len(PASSAGE_INDEX.chunks), token_budget=budget, min_confidence=0)
+        passages = r["passages"]
+        # los rótulos de fuente y sección no entran en el presupuesto de pasajes: se sueltan
+        # los de menor puntaje antes de caer al corte duro
+        while len(passages) > 1 and count_tokens(system_prompt_from_passages(passages, domain)) > PROMPT_MAX_TOKENS:
+            passages = passages[:-1]
+        if passages:
+            prompt = system_prompt_from_passages(passages, domain)
+            r = {**r, "passages": passages, "tokens": sum(p["tokens"] for p in passages), "trimmed": True}
+    if count_tokens(prompt) > PROMPT_MAX_TOKENS:
+        body = prompt[len(PROMPT_HEAD):prompt.rindex("\n\nDOMINIO ACTUAL:")].strip()
+        prompt = _prompt(domain, truncate_tokens(body, budget))
+        r = {**(r or {}), "trimmed": True, "truncated": True}
+    return prompt, r
 
 def fallback_answer(q: str) -> str:
     ql = q.lower()
@@ -262,344 +496,548 @@ def choose_access_slug(question: str, domain: str) -> list[tuple[str, str]]:
     """
     Devuelve lista de (slug,label) para sugerir; así podemos devolver 1 o varios (ej. horarios norte/sur).
     """
-    qn = _n(question)
-    suggestions = []
-
-    # correo
-    for lbl in ("correo zimbra","correo office","zimbra","office"):
-        sg = slugify(lbl)
-        if lbl in _n(" ".join(ACCESS_MAP.get(sg, {}).values())) or sg in ACCESS_MAP:
-            if any(w in qn for w in ["correo","email","zimbra","office","mail"]):
-                if sg in ACCESS_MAP:
-                    suggestions.append((sg, ACCESS_MAP[sg]["label"]))
-    # horarios
-    if "horario" in qn or "hora" in qn:
-        for lbl in ("horario region norte","horario region sur"):
-            sg = slugify(lbl)
-            if sg in ACCESS_MAP:
-                # si menciona norte/sur, sugiere solo ese; si no, ambos
-                if "norte" in qn and "norte" in lbl:
-                    suggestions.append((sg, ACCESS_MAP[sg]["label"]))
-                elif "sur" in qn and "sur" in lbl:
-                    suggestions.append((sg, ACCESS_MAP[sg]["label"]))
-        if not suggestions:
-            for lbl in ("horario region norte","horario region sur"):
-                sg = slugify(lbl)
-                if sg in ACCESS_MAP:
-                    suggestions.append((sg, ACCESS_MAP[sg]["label"]))
-
-    # twiins / biometrika
-    if domain in ("NOMINA","VACACIONES","PERMISOS"):
-        sg = slugify("Twins")
-        if any(w in qn for w in ["rol de pagos","mi rol","descargar rol","comprobante","twiins","twins"]):
-            # en tu txt 'Twins' tiene url a la home de Twiins corporativa
-            sgt = slugify("Twins")
-            if sgt in ACCESS_MAP:
-                suggestions.append((sgt, ACCESS_MAP[sgt]["label"]))
-    if domain == "BIOMETRIKA" or any(w in qn for w in ["biometr","d2movil","marcaci","marcar"]):
-        for lbl in ("Biométrica",):
-            sg = slugify(lbl)
-            if sg in ACCESS_MAP:
-                suggestions.append((sg, ACCESS_MAP[sg]["label"]))
-
-    # tickets apolo
-    if any(w in qn for w in ["ticket","soporte","novedad","apolo"]):
-        sg = slugify("Apolo")
-        if sg in ACCESS_MAP:
-            suggestions.append((sg, ACCESS_MAP[sg]["label"]))
-
-    # eliminar duplicados conservando orden
-    seen = set()
-    out = []
-    for s in suggestions:
-        if s[0] not in seen:
-            out.append(s); seen.add(s[0])
-    return out
-
-# ------------- Flujo: Uniformes -------------
-STATE = {}  # { sid: {"flow":"uniformes","step":1..3,"brand":...} }
-
-def render_chip(label: str, value: str) -> str:
-    return f'<a class="chip" data-chip="{html.escape(value)}"><span>👉</span> {html.escape(label)}</a>'
-
-def uniform_link_by_title(label: str) -> str:
+    return ACCESS.choose(question, domain)
+
+def access_appendix(question: str, domain: str) -> str:
+    """Bloque HTML de accesos rápidos que se agrega al final de la respuesta."""
+    with METRICS.timer("stage_seconds", stage="access_links"):
+        links = choose_access_slug(question, domain)
+    if not links:
+        return ""
+    if len(links) == 2 and all("norte" in l[1].lower() or "sur" in l[1].lower() for l in links):
+        return (
+            "<br><br>Seleccione el horario según su Región:<br>" +
+            "<br>".join([f"👉 {short_href(sl, lb)}" for sl, lb in links])
+        )
+    # muestra el primero
+    sl, lb = links[0]
+    return f"<br><br>Acceso rápido: {short_href(sl, lb)}"
+
+# ------------- Flujos guiados -------------
+# { sid: {"flow":"uniformes","state":"marca"} } en un store compartido con TTL
+STATE = open_session_store(
+    os.getenv("SESSION_STORE", "memory"),
+    ttl=float(os.getenv("SESSION_TTL", "1800")),
+    max_entries=int(os.getenv("SESSION_MAX_ENTRIES", "10000")),
+)
+
+# ------------- Memoria de conversación -------------
+# Últimos intercambios + resumen por sid, mismo backend que STATE (namespace aparte)
+MEMORY_ENABLED = os.getenv("MEMORY_ENABLED", "1") == "1"
+MEMORY = ConversationMemory(
+    open_session_store(
+        os.getenv("SESSION_STORE", "memory"),
+        ttl=float(os.getenv("SESSION_TTL", "1800")),
+        max_entries=int(os.getenv("MEMORY_MAX_SESSIONS", "5000")),
+        namespace="mem",
+    ),
+    max_turns=int(os.getenv("MEMORY_MAX_TURNS", "4")),
+    turn_tokens=int(os.getenv("MEMORY_TURN_TOKENS", "400")),
+    summary_tokens=int(os.getenv("MEMORY_SUMMARY_TOKENS", "200")),
+)
+STARTUP.mark("sessions")
+# Bajo este puntaje de dominio la pregunta no trae tema propio (hereda el de la conversación)
+MEMORY_DOMAIN_SCORE = 80
+FOLLOWUP_PREFIXES = ("y ", "e ", "o ", "pero ", "entonces ", "tambien ", "ademas ", "en ese caso", "que pasa si")
+FOLLOWUP_WORDS = {"eso", "esa", "ese", "esos", "esas", "ahi", "alli"}
+
+def is_followup(pregunta: str) -> bool:
+    """'¿y si es por paternidad?', 'pero si estoy enfermo', '¿eso aplica a practicantes?'..."""
+    qn = normalize_q(pregunta)
+    return qn.startswith(FOLLOWUP_PREFIXES) or not FOLLOWUP_WORDS.isdisjoint(qn.split())
+
+def remember(sid: str, pregunta: str, result: dict) -> dict:
+    """Guarda el intercambio en la memoria del sid (no los pasos de los flujos guiados)."""
+    if MEMORY_ENABLED and sid and result.get("path") != "empty" and "flow" not in result:
+        try:
+            MEMORY.add(sid, pregunta, str(result.get("respuesta", "")), result.get("domain", ""))
+        except Exception:
+            pass
+    return result
+
+def link_by_title(label: str) -> str:
+    """Enlace corto de accesos.txt por título (para los flujos guiados); "" si no existe."""
     sg = slugify(label)
-    data = ACCESS_MAP.get(sg)
+    data = ACCESS.get(sg)
     if not data: return ""
     return f'👉 {short_href(sg, data["label"])}'
 
-def menu_brand() -> str:
-    chips = " ".join([
-        render_chip("OLA","OLA"),
-        render_chip("Aura Skin","Aura Skin"),
-        render_chip("Metrored","Metrored")
-    ])
-    return f'<div class="box"><div class="hint">¿Dime en dónde trabajas?</div><div class="chips">{chips}</div></div>'
-
-def menu_area_ola() -> str:
-    chips = " ".join([render_chip("Administrativo","Administrativo"), render_chip("Comercial","Comercial")])
-    return f'<div class="box"><div class="hint">Selecciona en qué área trabajas:</div><div class="chips">{chips}</div></div>'
-
-def menu_cargo_ola() -> str:
-    chips = " ".join([render_chip("Asesor Comercial","Asesor Comercial"), render_chip("Optómetra","Optómetra")])
-    return f'<div class="box"><div class="hint">¿Cuál es tu cargo?</div><div class="chips">{chips}</div></div>'
-
-def start_uniform_flow(sid: str) -> str:
-    STATE[sid] = {"flow":"uniformes","step":1}
-    return menu_brand()
-
-def normalize_val(txt: str) -> str:
-    t = _n(txt)
-    mapping = {
-        "ola":"OLA","aura skin":"Aura Skin","metrored":"Metrored",
-        "administrativo":"Administrativo","comercial":"Comercial",
-        "asesor comercial":"Asesor Comercial","optometra":"Optómetra","optómetra":"Optómetra"
-    }
-    for k,v in mapping.items():
-        if t == _n(k): return v
-    for k,v in mapping.items():
-        if fuzz.partial_ratio(t, _n(k)) >= 88: return v
-    return txt.strip()
-
-def uniform_step(sid: str, user_text: str) -> str | None:
-    ctx = STATE.get(sid)
-    if not ctx or ctx.get("flow") != "uniformes":
-        return None
-    val = normalize_val(user_text)
-
-    if val in ("OLA","Aura Skin","Metrored"):
-        ctx["brand"] = val
-        if val == "OLA":
-            ctx["step"] = 2
-            return menu_area_ola()
-        if val == "Aura Skin":
-            htmlx = 'Puedes consultar la política de uniformes de Aura Skin:<br>' + uniform_link_by_title("Política de uniformes - Aura Skin")
-            return htmlx + "<br><br>" + menu_brand()
-        if val == "Metrored":
-            htmlx = 'Puedes consultar la política de uniformes de Metrored:<br>' + uniform_link_by_title("Política de uniformes - Metrored")
-            return htmlx + "<br><br>" + menu_brand()
-
-    if ctx.get("brand") == "OLA":
-        if val == "Administrativo":
-            ctx["step"] = 2
-            htmlx = 'Aquí puedes revisar la política de uniformes de OLA Administrativo:<br>' + uniform_link_by_title("Política de uniformes - Administrativos")
-            return htmlx + "<br><br>" + menu_area_ola() + "<br>" + menu_brand()
-        if val == "Comercial":
-            ctx["step"] = 3
-            return menu_cargo_ola()
-        if ctx.get("step") == 3 and val in ("Asesor Comercial","Optómetra"):
-            if val == "Asesor Comercial":
-                htmlx = 'Aquí puedes revisar la política de uniformes de OLA para los Asesores Comerciales:<br>' + uniform_link_by_title("Política de uniformes - Asesor Comercial")
-            else:
-                htmlx = 'Aquí puedes revisar la política de uniformes de OLA para los Optómetras:<br>' + uniform_link_by_title("Política de uniformes - Optometra")
-            return htmlx + "<br><br>" + menu_cargo_ola() + "<br>" + menu_area_ola() + "<br>" + menu_brand()
-        return menu_area_ola() + "<br>" + menu_brand()
-
-    return menu_brand()
+# Flujos definidos como grafos de estados en flows/*.json (ver flows.py); menús prerenderados al cargar
+FLOWS = FlowEngine.load(os.path.join(os.path.dirname(os.path.abspath(__file__)), "flows"), STATE, link_by_title)
+STARTUP.mark("flows")
+
+def flow_result(flow, htmlx: str) -> dict:
+    return {"respuesta": Markup(htmlx), "path": flow.path, "flow": flow.name}
+
+# Corrección ortográfica de la consulta antes del enrutamiento (ver speller.py): palabras
+# desconocidas -> término curado más cercano de DOMAINS, las intenciones fijas y los flujos
+SPELLING_ENABLED = os.getenv("SPELLING_ENABLED", "1") == "1"
+SPELLER = None
+
+def spelling_terms() -> list[str]:
+    return [*(t for terms in DOMAINS.values() for t in terms),
+            *(t for r in INTENT_RULES for t in r.get("terms", [])),
+            *(k for f in FLOWS.flows.values() for k in f.exact)]
+
+def build_speller(corpus: PolicyCorpus):
+    global SPELLER
+    SPELLER = Speller.from_texts(list(corpus.texts().values()), spelling_terms(), version=corpus.version)
+
+if SPELLING_ENABLED:
+    build_speller(CORPUS)
+    CORPUS.on_reload(build_speller)
+STARTUP.mark("speller")
+
+def spell(pregunta: str) -> tuple[str, dict | None]:
+    """(consulta corregida, detalle para la respuesta o None si no cambió)."""
+    if SPELLER is None:
+        return pregunta, None
+    with METRICS.timer("stage_seconds", stage="spelling"):
+        fixed, changes = SPELLER.correct(pregunta)
+    METRICS.inc("spelling_checked_total")
+    if changes:
+        METRICS.inc("spelling_corrected_total")
+    if not changes:
+        return pregunta, None
+    return fixed, {"original": pregunta, "query": fixed, "changes": [list(c) for c in changes]}
 
 # ================= UI =====================
+# ui/index.html + CSS/JS se versionan, renderizan y comprimen una sola vez al importar
+UI = AssetBundle(os.path.join(os.path.dirname(os.path.abspath(__file__)), "ui"))
+HOME_PAGE = UI.page(app.jinja_env.from_string(read_txt(os.path.join(UI.base, "index.html"))).render(
+    css_url=UI.add_file("olivia.css"),
+    js_url=UI.add_file("olivia.js"),
+))
+STARTUP.mark("ui")
+
 @app.route("/", methods=["GET"])
 def home():
-    return render_template_string("""
-<!doctype html>
-<html>
-<head>
-<meta charset="utf-8" />
-<title>OLIVIA</title>
-<style>
-  body { font-family: 'Segoe UI', sans-serif; background: #ffffff; margin: 0; padding: 0; }
-  .chat-box { max-width: 420px; height: 100vh; margin: 0 auto; display: flex; flex-direction: column; border: 1px solid #e5e7eb; }
-  .header { text-align: center; border-bottom: 1px solid #e5e7eb; padding: 16px 0 10px; }
-  .header img { height: 50px; }
-  .nombre-olivia { text-align: center; font-size: 20px; font-weight: 700; color: #00989a; margin-top: 6px; letter-spacing: 1px; }
-  .messages { flex: 1; padding: 20px; background: #f9fafb; overflow-y: auto; }
-  .bubble { max-width: 75%; padding: 10px 14px; border-radius: 16px; font-size: 14px; line-height: 1.4; margin-bottom: 10px; clear: both; }
-  .usuario { background: #d1f1e3; color: #00332f; float: right; }
-  .olivia { background: #ffffff; border: 1px solid #e0e0e0; float: left; }
-  .input-area { display: flex; align-items: center; gap: 8px; border-top: 1px solid #e5e7eb; padding: 10px; background: #fff; }
-  .whatsapp { display: flex; align-items: center; justify-content: center; border: none; background: none; cursor: pointer; }
-  .whatsapp img { width: 26px; height: 26px; }
-  input[type="text"] { flex: 1; border: 1px solid #ccc; border-radius: 20px; padding: 10px; font-size: 14px; }
-  button { background: #00989a; border: none; color: white; border-radius: 20px; font-weight: bold; padding: 8px 16px; cursor: pointer; }
-  .footer { text-align: center; font-size: 12px; color: #94a3b8; padding-bottom: 8px; }
-  /* chips */
-  .chips{display:flex;gap:10px;flex-wrap:wrap;margin-top:6px}
-  .chip{display:inline-flex;align-items:center;gap:8px;padding:8px 12px;border-radius:16px;background:#00989a;color:#fff;font-weight:600;cursor:pointer;text-decoration:none}
-  .chip span{font-size:18px}
-  .hint{color:#0f172a;font-weight:600;margin-bottom:4px}
-  .box{background:#eef2ff;border:1px solid #dfe3f0;padding:12px;border-radius:12px}
-</style>
-</head>
-<body>
-  <div class="chat-box" id="chatBox">
-    <div class="header">
-      <img src="https://intranet.opticalosandes.com.ec/wp-content/uploads/2022/02/grupo-ola.png" alt="Grupo OLA" />
-      <div class="nombre-olivia">OLIVIA</div>
-    </div>
-
-    <div class="messages" id="chatMessages">
-      <div class="bubble olivia">Hola, estoy aquí para acompañarte y ayudarte con cualquier duda 😊</div>
-    </div>
-
-    <form class="input-area" id="chatForm">
-      <a class="whatsapp" href="https://wa.me/593998515934" target="_blank" title="Sugerencias o soporte">
-        <img src="https://upload.wikimedia.org/wikipedia/commons/6/6b/WhatsApp.svg" alt="WhatsApp" />
-      </a>
-      <input type="text" id="mensaje" placeholder="Mensaje" required />
-      <button type="submit">Enviar</button>
-    </form>
-    <div class="footer">© Grupo OLA 2025</div>
-  </div>
-
-<script>
-const form = document.getElementById('chatForm');
-const inputField = document.getElementById('mensaje');
-const chatMessages = document.getElementById('chatMessages');
-
-// SID persistente
-const SID_KEY = 'olivia_sid';
-let SID = localStorage.getItem(SID_KEY);
-if(!SID){ SID = (crypto.randomUUID && crypto.randomUUID()) || String(Date.now()); localStorage.setItem(SID_KEY, SID); }
-
-async function sendToBot(text){
-  const userBubble = document.createElement('div');
-  userBubble.className = 'bubble usuario';
-  userBubble.textContent = text;
-  chatMessages.appendChild(userBubble);
-  chatMessages.scrollTop = chatMessages.scrollHeight;
-
-  const loader = document.createElement('div');
-  loader.className = 'bubble olivia';
-  loader.textContent = 'Escribiendo...';
-  chatMessages.appendChild(loader);
-  chatMessages.scrollTop = chatMessages.scrollHeight;
-
-  try {
-    const res = await fetch('/responder', {
-      method: 'POST',
-      headers: {'Content-Type':'application/json'},
-      body: JSON.stringify({mensaje: text, sid: SID})
-    });
-    const data = await res.json();
-    loader.innerHTML = data.respuesta || 'Error interno';
-  } catch {
-    loader.textContent = 'Error de conexión';
-  }
-  chatMessages.scrollTop = chatMessages.scrollHeight;
-}
+    return HOME_PAGE.response(request)
 
-form.addEventListener('submit', (e) => {
-  e.preventDefault();
-  const mensaje = inputField.value.trim();
-  if (!mensaje) return;
-  inputField.value = '';
-  sendToBot(mensaje);
-});
-
-// Click en chips
-chatMessages.addEventListener('click', (e)=>{
-  const chip = e.target.closest('[data-chip]');
-  if(!chip) return;
-  const value = chip.getAttribute('data-chip');
-  sendToBot(value);
-});
-</script>
-</body>
-</html>
-""")
+@app.route("/assets/<name>")
+def asset(name):
+    a = UI.get(name)
+    if a is None:
+        return "Not found", 404
+    return a.response(request)
 
 # ================= API ====================
+def postprocess_answer(answer: str) -> str:
+    """Máx. 4 líneas y cierre estándar."""
+    answer = (answer or "").strip()
+    lines = [l.strip() for l in re.split(r'(?:\r?\n)+', answer) if l.strip()]
+    if len(lines) > 4:
+        answer = " ".join(lines[:4])
+    if "¿Te ayudo con algo más?" not in answer:
+        answer = f"{answer} ¿Te ayudo con algo más?"
+    return answer
+
+def llm_request(pregunta: str, domain: str, sys_prompt: str, history: list[dict] | None = None, **extra) -> dict:
+    """Parámetros de chat.completions.create (compartidos por la vía sync y la async)."""
+    return dict(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": sys_prompt},
+            *(history or []),  # contexto de la conversación, después del prefijo estable
+            {"role": "user",   "content": f"[DOMINIO={domain}] Pregunta: {pregunta}"}
+        ],
+        temperature=0.3,
+        max_tokens=160,
+        **extra
+    )
+
+def prompt_version() -> str:
+    """
+    Huella de todo lo que arma el prompt además de las políticas: reglas fijas, plantilla,
+    parámetros del modelo y de la recuperación (qué pasajes y cuántos entran). Cambiar
+    cualquiera invalida las respuestas guardadas.
+    """
+    return hashlib.sha1(json.dumps([
+        PROMPT_HEAD,
+        system_prompt_from_passages([], "{domain}"),
+        llm_request("", "", ""),
+        {"retrieval": RETRIEVAL_ENABLED, "top_k": RETRIEVAL_TOP_K, "token_budget": RETRIEVAL_TOKEN_BUDGET,
+         "min_confidence": RETRIEVAL_MIN_CONFIDENCE, "max_tokens": PROMPT_MAX_TOKENS},
+    ], sort_keys=True).encode()).hexdigest()[:12]
+
+PROMPT_VERSION = prompt_version()
+
+def answer_versions() -> dict:
+    """Versiones actuales de cada fuente posible de una respuesta guardada (archivos de policies/ + prompt)."""
+    return {**CORPUS.hashes, "prompt": PROMPT_VERSION}
+
+def prompt_sources(r: dict | None) -> list[str]:
+    """Archivos de policies/ que entraron al prompt: los de los pasajes, o todos si fue el corpus completo."""
+    if not r or r.get("fallback") or r.get("truncated") or not r.get("passages"):
+        return list(POLICY_FILES)
+    return sorted({p["source"] for p in r["passages"]})
+
+def remaining_budget(started: float) -> float:
+    return LLM_BUDGET - (time.monotonic() - started)
+
+def llm_answer(pregunta: str, domain: str, sys_prompt: str, timeout: float | None = None,
+               history: list[dict] | None = None) -> tuple[str, dict]:
+    """Llamada al modelo + post-proceso -> (respuesta, uso y costo). Lanza excepción si falla."""
+    with METRICS.timer("stage_seconds", stage="llm"):
+        cmpl = client.chat.completions.create(**llm_request(pregunta, domain, sys_prompt, history,
+                                                            timeout=timeout or LLM_BUDGET))
+    return postprocess_answer(cmpl.choices[0].message.content), record_usage(cmpl.usage)
+
+def llm_stream(pregunta: str, domain: str, sys_prompt: str, started: float | None = None, usage: dict | None = None,
+               history: list[dict] | None = None):
+    """Igual que llm_answer pero con stream=True: genera los fragmentos de texto (el uso queda en `usage`)."""
+    started = started or time.monotonic()
+    t0 = time.perf_counter()
+    stream = client.chat.completions.create(
+        **llm_request(pregunta, domain, sys_prompt, history, stream=True, timeout=remaining_budget(started),
+                      stream_options={"include_usage": True})
+    )
+    for chunk in stream:
+        if remaining_budget(started) <= 0:
+            stream.close()
+            raise TimeoutError("llm_stream: presupuesto agotado")
+        if getattr(chunk, "usage", None):
+            report = record_usage(chunk.usage)
+            if usage is not None:
+                usage.update(report)
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+    METRICS.observe("stage_seconds", time.perf_counter() - t0, stage="llm")
+
+def record_usage(usage) -> dict:
+    """Tokens reportados por OpenAI (incl. los cacheados por prefijo) + costo estimado."""
+    if usage is None:
+        return {}
+    report = usage_report(usage, PRICING)
+    METRICS.inc("llm_tokens_total", report["prompt_tokens"], kind="prompt")
+    METRICS.inc("llm_tokens_total", report["cached_tokens"], kind="cached")
+    METRICS.inc("llm_tokens_total", report["completion_tokens"], kind="completion")
+    METRICS.inc("llm_cost_usd_total", report["cost_usd"])
+    return report
+
+def answered(result: dict, started: float) -> dict:
+    """Cuenta la respuesta por camino y registra la latencia total."""
+    path = result.get("path", "unknown")
+    METRICS.inc("answers_total", path=path)
+    METRICS.observe("request_seconds", time.monotonic() - started, path=path)
+    return result
+
+def resolve_fast(pregunta: str, sid: str, m=None) -> tuple[dict | None, dict | None]:
+    """
+    Pasos 0-4 del pipeline (todo lo que no es el modelo).
+    Devuelve (respuesta, None) si se resolvió sin IA, o (None, job) para llamar al modelo.
+    `m`: Match ya calculado (lotes) para no volver a puntuar la consulta; la consulta ya viene corregida.
+    Si la ortografía cambió algo, la respuesta (o el job) lleva "spelling" con el detalle.
+    """
+    # 0) Flujo guiado activo (uniformes, ...): recibe el texto tal cual, tiene su propio fuzzy
+    if sid:
+        with METRICS.timer("stage_seconds", stage="flow"):
+            step = FLOWS.step(sid, pregunta)
+        if step:
+            return flow_result(*step), None
+
+    # 0b) Ortografía: todo lo que sigue (reglas, banco, cachés, prompt) ve la consulta corregida
+    spelling = None
+    if m is None:
+        pregunta, spelling = spell(pregunta)
+    done, job = resolve_rules(pregunta, sid, m)
+    if spelling:
+        (done or job)["spelling"] = spelling
+    return done, job
+
+def resolve_rules(pregunta: str, sid: str, m=None) -> tuple[dict | None, dict | None]:
+    """Pasos 1-4 de resolve_fast sobre la consulta ya corregida."""
+    # 1) Disparadores de flujos
+    flow = FLOWS.trigger(pregunta)
+    if flow:
+        return flow_result(flow, FLOWS.start(sid or "anon", flow)), None
+
+    # 2) Router + 3) Reglas deterministas (una sola pasada del matcher)
+    if m is None:
+        with METRICS.timer("stage_seconds", stage="match"):
+            m = MATCHER.match(pregunta)
+    domain = m.domain
+
+    # 2b) Memoria: una pregunta de seguimiento lleva el contexto y, si no trae tema, hereda el dominio
+    mem = MEMORY.get(sid) if MEMORY_ENABLED else None
+    followup = bool(mem) and is_followup(pregunta)
+    if followup and m.domain_score < MEMORY_DOMAIN_SCORE and mem.get("domain"):
+        domain = mem["domain"]
+
+    if m.intent:
+        return {"respuesta": m.intent["response"] + access_appendix(pregunta, domain), "path": "fixed", "domain": domain}, None
+
+    # 3b) Banco de preguntas: respuesta curada directa si la coincidencia es confiable
+    with METRICS.timer("stage_seconds", stage="qa_bank"):
+        qa = qa_bank().match(pregunta) if QA_ENABLED else None
+    if qa:
+        METRICS.inc("qa_bank_hits_total")  # QA_BANK se rehace en cada recarga: su .hits vuelve a 0
+        answer = answer_html(qa)
+        if "¿Te ayudo con algo más?" not in answer:
+            answer = f"{answer}<br>¿Te ayudo con algo más?"
+        return {
+            "respuesta": Markup(answer + access_appendix(pregunta, domain)),
+            "path": "qa",
+            "domain": domain,
+            "qa": {"id": qa["id"], "score": qa["score"], "coverage": qa["coverage"], "query_coverage": qa["query_coverage"]},
+        }, None
+
+    # 3c) Caché de respuestas del modelo (un seguimiento solo comparte caché con su mismo contexto)
+    with METRICS.timer("stage_seconds", stage="cache"):
+        qn, version = normalize_q(pregunta), CORPUS.version
+        if followup:
+            qn = f"{qn}#{MEMORY.fingerprint(mem)}"
+        cached = RESPONSE_CACHE.get(qn, domain, version)
+    if cached is not None:
+        return {"respuesta": Markup(cached + access_appendix(pregunta, domain)), "path": "cache", "domain": domain}, None
+
+    # 3d) Respuestas pregeneradas (warmup.py), si sus políticas no cambiaron
+    if ANSWER_STORE is not None and not followup:
+        with METRICS.timer("stage_seconds", stage="answer_store"):
+            stored = ANSWER_STORE.get(qn, domain, answer_versions())
+        if stored is not None:
+            RESPONSE_CACHE.set(qn, domain, version, stored)
+            return {"respuesta": Markup(stored + access_appendix(pregunta, domain)), "path": "store", "domain": domain}, None
+
+    # 4) Prompt: pasajes recuperados o corpus completo del dominio (+ contexto de la conversación)
+    with METRICS.timer("stage_seconds", stage="prompt"):
+        sys_prompt, retrieval = build_system_prompt(pregunta, domain)
+        history = MEMORY.messages(mem) if followup else []
+        prompt_tokens = count_messages(llm_request(pregunta, domain, sys_prompt, history)["messages"])
+    return None, {"pregunta": pregunta, "sid": sid, "domain": domain, "qn": qn, "version": version,
+                  "sys_prompt": sys_prompt, "sources": prompt_sources(retrieval), "history": history,
+                  "prompt_tokens": prompt_tokens}
+
+def llm_key(job: dict) -> tuple:
+    """Clave de coalescencia / caché: misma pregunta normalizada, dominio y versión del corpus."""
+    return (job["qn"], job["domain"], job["version"])
+
+def job_result(job: dict, respuesta, path: str, **extra) -> dict:
+    """Respuesta para un job del modelo (lleva el detalle de ortografía si lo hubo)."""
+    result = {"respuesta": respuesta, "path": path, "domain": job["domain"], **extra}
+    if "spelling" in job:
+        result["spelling"] = job["spelling"]
+    return result
+
+def finish_llm(job: dict, answer: str, usage: dict | None = None) -> dict:
+    RESPONSE_CACHE.set(job["qn"], job["domain"], job["version"], answer)
+    return job_result(job, Markup(answer + access_appendix(job["pregunta"], job["domain"])), "llm",
+                      usage={**(usage or {}), "prompt_tokens_est": job["prompt_tokens"]})
+
+def fallback(job: dict, path: str = "fallback") -> dict:
+    """Fallback sin IA para un job (path: fallback, exception, shed)."""
+    return job_result(job, fallback_answer(job["pregunta"]), path)
+
+def shed(job: dict) -> dict:
+    """Sin cupo para el modelo (control de admisión): fallback en vez de esperar."""
+    return fallback(job, "shed")
+
+def queue_timeout(started: float) -> float:
+    """Espera máxima en la cola del modelo: la de ADMISSION, sin pasarse del presupuesto."""
+    return max(0.0, min(ADMISSION.queue_timeout, remaining_budget(started)))
+
+def resolve_llm(job: dict, started: float) -> dict:
+    """Pasos 5-6: modelo (con admisión, coalescido, con breaker y presupuesto) o fallback."""
+    pregunta = job["pregunta"]
+    # 5) Cliente OpenAI (breaker abierto => fallback inmediato) y fichas del sid / globales
+    if ensure_client() is None or BREAKER.is_open():
+        return fallback(job)
+    try:
+        ADMISSION.check_rate(job["sid"])
+    except AdmissionRejected:
+        return shed(job)
+
+    # 6) IA dentro del presupuesto de latencia; solo el líder del singleflight ocupa un cupo
+    def call():
+        with ADMISSION.slot(queue_timeout(started)):
+            return BREAKER.call(lambda: llm_answer(pregunta, job["domain"], job["sys_prompt"],
+                                                   timeout=max(remaining_budget(started), 0.1), history=job["history"]))
+    try:
+        answer, usage = SINGLEFLIGHT.do(llm_key(job), call, timeout=min(SINGLEFLIGHT_TIMEOUT, remaining_budget(started)))
+        return finish_llm(job, answer, usage)
+    except AdmissionRejected:
+        return shed(job)
+    except Exception:
+        return fallback(job, "exception")
+
 @app.route("/responder", methods=["POST"])
 def responder():
+    started = time.monotonic()
     data = request.get_json(silent=True) or {}
-    pregunta = sanitize(data.get("mensaje", ""))
+    with METRICS.timer("stage_seconds", stage="sanitize"):
+        pregunta = sanitize(data.get("mensaje", ""))
     sid = (data.get("sid") or "").strip()
 
     if not pregunta:
-        return jsonify({"respuesta": "Por favor, escribe un mensaje."})
-
-    # 0) Flujo Uniformes si está activo
-    if sid and STATE.get(sid, {}).get("flow") == "uniformes":
-        htmlx = uniform_step(sid, pregunta)
-        if htmlx:
-            return jsonify({"respuesta": Markup(htmlx)})
-
-    # 1) Disparador Uniformes
-    if any(w in _n(pregunta) for w in ["uniforme","uniformes"]):
-        htmlx = start_uniform_flow(sid or "anon")
-        return jsonify({"respuesta": Markup(htmlx)})
-
-    # 2) Router
-    domain = route_domain(pregunta)
-
-    # 3) Reglas deterministas
-    fixed = detect_intent_fixed(pregunta)
-    if fixed:
-        appendix = ""
-        links = choose_access_slug(pregunta, domain)
-        if links:
-            if len(links) == 2 and all("norte" in l[1].lower() or "sur" in l[1].lower() for l in links):
-                appendix = (
-                    "<br><br>Seleccione el horario según su Región:<br>" +
-                    "<br>".join([f"👉 {short_href(sl, lb)}" for sl, lb in links])
-                )
-            else:
-                # muestra el primero
-                sl, lb = links[0]
-                appendix = f"<br><br>Acceso rápido: {short_href(sl, lb)}"
-        return jsonify({"respuesta": fixed + appendix})
+        return jsonify(answered({"respuesta": "Por favor, escribe un mensaje.", "path": "empty"}, started))
 
-    # 4) Políticas y prompt
-    policies = load_policies()
-    sys_prompt = system_prompt_from(policies, domain)
+    done, job = resolve_fast(pregunta, sid)
+    if done:
+        return jsonify(answered(remember(sid, pregunta, done), started))
+    return jsonify(answered(remember(sid, pregunta, resolve_llm(job, started)), started))
 
-    # 5) Cliente OpenAI
-    global client
-    if client is None:
-        client = get_openai_client()
-    if client is None:
-        return jsonify({"respuesta": fallback_answer(pregunta)})
+def sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
-    # 6) IA
-    try:
-        cmpl = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": sys_prompt},
-                {"role": "user",   "content": f"[DOMINIO={domain}] Pregunta: {pregunta}"}
-            ],
-            temperature=0.3,
-            max_tokens=160
-        )
-        answer = (cmpl.choices[0].message.content or "").strip()
-        lines = [l.strip() for l in re.split(r'(?:\r?\n)+', answer) if l.strip()]
-        if len(lines) > 4:
-            answer = " ".join(lines[:4])
-
-        appendix = ""
-        links = choose_access_slug(pregunta, domain)
-        if links:
-            if len(links) == 2 and all("norte" in l[1].lower() or "sur" in l[1].lower() for l in links):
-                appendix = (
-                    "<br><br>Seleccione el horario según su Región:<br>" +
-                    "<br>".join([f"👉 {short_href(sl, lb)}" for sl, lb in links])
-                )
-            else:
-                sl, lb = links[0]
-                appendix = f"<br><br>Acceso rápido: {short_href(sl, lb)}"
+@app.route("/responder/stream", methods=["POST"])
+def responder_stream():
+    """
+    Mismo pipeline que /responder, como Server-Sent Events:
+      event: delta  {"t": "..."}        fragmentos del modelo (texto plano)
+      event: done   {"respuesta": ...}  respuesta final (HTML), siempre al cierre
+    Las respuestas deterministas llegan como un único 'done'.
+    """
+    started = time.monotonic()
+    data = request.get_json(silent=True) or {}
+    pregunta = sanitize(data.get("mensaje", ""))
+    sid = (data.get("sid") or "").strip()
 
-        if "¿Te ayudo con algo más?" not in answer:
-            answer = f"{answer} ¿Te ayudo con algo más?"
-        return jsonify({"respuesta": Markup(answer + appendix)})
-    except Exception:
-        return jsonify({"respuesta": fallback_answer(pregunta)})
+    def events():
+        if not pregunta:
+            yield sse("done", answered({"respuesta": "Por favor, escribe un mensaje.", "path": "empty"}, started))
+            return
+        done, job = resolve_fast(pregunta, sid)
+        if done:
+            yield sse("done", answered(remember(sid, pregunta, done), started))
+            return
+        if ensure_client() is None or BREAKER.is_open():
+            result = fallback(job)
+            yield sse("done", answered(remember(sid, pregunta, result), started))
+            return
+        try:
+            ADMISSION.check_rate(sid)
+            ADMISSION.acquire(queue_timeout(started))
+        except AdmissionRejected:
+            yield sse("done", answered(remember(sid, pregunta, shed(job)), started))
+            return
+        parts, usage, grant = [], {}, None
+        try:  # el cupo se ocupa mientras dura el stream
+            grant = BREAKER.admit()
+            if grant is None:
+                raise CircuitOpenError(BREAKER.name)
+            for t in llm_stream(pregunta, job["domain"], job["sys_prompt"], started, usage, job["history"]):
+                parts.append(t)
+                yield sse("delta", {"t": t})
+            BREAKER.record_success()
+            result = finish_llm(job, postprocess_answer("".join(parts)), usage)
+        except CircuitOpenError:
+            result = fallback(job)
+        except Exception:
+            BREAKER.record_failure()
+            result = fallback(job, "exception")
+        except BaseException:  # GeneratorExit: el cliente cortó el stream, sin veredicto
+            BREAKER.abandon(grant)
+            raise
+        finally:
+            ADMISSION.release()
+        yield sse("done", answered(remember(sid, pregunta, result), started))
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# --------------- Lotes ---------------
+# /responder/batch: reglas para todo el lote en una pasada; lo que va al modelo,
+# por un pool acotado compartido por el worker
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_POOL = ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY, thread_name_prefix="batch")
+
+def batch_llm(job: dict) -> tuple[dict, float]:
+    started = time.monotonic()  # el presupuesto corre desde que la pregunta toma un hilo
+    return resolve_llm(job, started), started
+
+@app.route("/responder/batch", methods=["POST"])
+def responder_batch():
+    """
+    Varias preguntas en un request: {"preguntas": ["...", ...]}
+    Responde NDJSON, una línea por pregunta y en el mismo orden:
+      {"i": 0, "pregunta": "...", "respuesta": "...", "path": "fixed", "ms": 0.4}
+    y una última línea {"done": true, "n": N, "paths": {...}, "ms": ...}.
+    Sin sid: los flujos guiados (uniformes, ...) no avanzan dentro de un lote.
+    """
+    data = request.get_json(silent=True) or {}
+    raw = data.get("preguntas")
+    if not isinstance(raw, list) or not raw:
+        return jsonify({"error": 'Envía {"preguntas": ["...", ...]}'}), 400
+    if len(raw) > BATCH_MAX_ITEMS:
+        return jsonify({"error": f"Máximo {BATCH_MAX_ITEMS} preguntas por lote"}), 413
+    started = time.monotonic()
+    preguntas = [sanitize(q if isinstance(q, str) else "") for q in raw]
+    spelled = [spell(p) if p else (p, None) for p in preguntas]
+
+    def lines():
+        with METRICS.timer("stage_seconds", stage="match_batch"):
+            matches = MATCHER.match_many([p for p, _ in spelled if p])
+        it = iter(matches)
+        items = []  # (respuesta | Future, ms)
+        for p, spelling in spelled:
+            t0 = time.monotonic()
+            if not p:
+                done, job = {"respuesta": "Por favor, escribe un mensaje.", "path": "empty"}, None
+            else:
+                done, job = resolve_fast(p, "", next(it))
+                if spelling:
+                    (done or job)["spelling"] = spelling
+            if done:
+                items.append((answered(done, t0), (time.monotonic() - t0) * 1000))
+            else:
+                items.append((BATCH_POOL.submit(batch_llm, job), None))
+        paths = {}
+        try:
+            for i, (item, ms) in enumerate(items):
+                if isinstance(item, Future):
+                    item, t0 = item.result()
+                    ms = (time.monotonic() - t0) * 1000
+                    answered(item, t0)
+                paths[item["path"]] = paths.get(item["path"], 0) + 1
+                yield json.dumps({"i": i, "pregunta": preguntas[i], **item, "ms": round(ms, 1)}, ensure_ascii=False) + "\n"
+        finally:
+            for item, _ in items:
+                if isinstance(item, Future):
+                    item.cancel()  # cliente desconectado: no seguir llamando al modelo
+        yield json.dumps({"done": True, "n": len(items), "paths": paths,
+                          "ms": round((time.monotonic() - started) * 1000, 1)}) + "\n"
+
+    return Response(lines(), mimetype="application/x-ndjson", headers={"X-Accel-Buffering": "no"})
+
+# --------------- Métricas ---------------
+@METRICS.collector
+def _component_metrics():
+    c, sf, af, br, ad = RESPONSE_CACHE.info(), SINGLEFLIGHT.info(), ASYNC_SINGLEFLIGHT.info(), BREAKER.info(), ADMISSION.info()
+    return [
+        ("response_cache_hits_total", "counter", "Aciertos de la caché de respuestas", {"kind": "exact"}, c["hits"]),
+        ("response_cache_hits_total", "counter", "Aciertos de la caché de respuestas", {"kind": "fuzzy"}, c["fuzzy_hits"]),
+        ("response_cache_misses_total", "counter", "Fallos de la caché de respuestas", {}, c["misses"]),
+        ("response_cache_entries", "gauge", "Entradas en la caché de respuestas", {}, c["size"]),
+        ("singleflight_coalesced_total", "counter", "Requests que esperaron una llamada idéntica en vuelo", {}, sf["coalesced"] + af["coalesced"]),
+        ("singleflight_timeouts_total", "counter", "Esperas de singleflight vencidas", {}, sf["timeouts"] + af["timeouts"]),
+        ("breaker_open", "gauge", "Workers con el circuit breaker abierto", {}, int(br["state"] == "open")),
+        ("breaker_trips_total", "counter", "Aperturas del circuit breaker", {}, br["trips"]),
+        ("breaker_rejected_total", "counter", "Llamadas rechazadas con el breaker abierto", {}, br["rejected"]),
+        ("answer_store_stale_total", "counter", "Respuestas pregeneradas descartadas porque cambió alguna de sus políticas", {},
+         ANSWER_STORE.stale if ANSWER_STORE is not None else 0),
+        *(("admission_rejected_total", "counter", "Preguntas al modelo rechazadas por control de admisión (fallback)",
+           {"reason": r}, ad["rejected"].get(r, 0)) for r in ("rate_sid", "rate_global", "queue_full", "queue_timeout")),
+        ("admission_queued_total", "counter", "Preguntas al modelo que esperaron cupo en la cola", {}, ad["queued"]),
+        ("llm_in_flight", "gauge", "Llamadas al modelo en vuelo", {}, ad["in_flight"]),
+        ("llm_queue_depth", "gauge", "Preguntas esperando cupo para el modelo", {}, ad["queue_depth"]),
+    ]
+
+@app.route("/metrics")
+def metrics():
+    return Response(METRICS.render(), mimetype="text/plain; version=0.0.4")
 
 # --------------- Diagnóstico ---------------
+# openai instalado (sin importarlo): se consulta una vez, no en cada /diag
+OPENAI_INSTALLED = importlib.util.find_spec("openai") is not None
+
 @app.route("/diag")
 def diag():
-    from importlib.util import find_spec
     has_key = bool(os.getenv("OPENAI_API_KEY"))
-    has_pkg = find_spec("openai") is not None
+    has_pkg = OPENAI_INSTALLED
     base = "policies"
     pols = {
         "vacaciones": os.path.isfile(os.path.join(base, "politica_vacaciones.txt")),
@@ -609,15 +1047,47 @@ def diag():
         "banco":      os.path.isfile(os.path.join(base, "banco_preguntas.txt")),
         "accesos":    os.path.isfile(os.path.join(base, "accesos.txt")),
     }
-    sample = list(ACCESS_MAP.keys())[:6]
+    access = ACCESS.info()
     return {
-        "ai_ready": has_key and has_pkg and (client is not None),
+        "ai_ready": has_key and has_pkg and OPENAI_INIT_ERROR is None,
+        "openai_client": "ready" if client is not None else ("lazy" if OPENAI_INIT_ERROR is None else "error"),
         "has_OPENAI_API_KEY": has_key,
         "openai_installed": has_pkg,
         "policies": pols,
-        "access_map_size": len(ACCESS_MAP),
-        "access_map_sample": sample,
+        "policies_corpus": CORPUS.info(),
+        "knowledge_snapshot": {"status": KB_STATUS, **(KB.info() if KB else {})},
+        "qa_bank": QA_BANK.info() if QA_BANK else None,
+        "domain_classifier": DOMAIN_CLASSIFIER.info() if DOMAIN_CLASSIFIER_ENABLED and DOMAIN_CLASSIFIER else None,
+        "response_cache": RESPONSE_CACHE.info(),
+        "answer_store": ANSWER_STORE.info() if ANSWER_STORE is not None else None,
+        "sessions": STATE.info(),
+        "flows": FLOWS.info(),
+        "spelling": SPELLER.info() if SPELLER is not None else None,
+        "memory": MEMORY.info() if MEMORY_ENABLED else None,
+        "singleflight": {"sync": SINGLEFLIGHT.info(), "async": ASYNC_SINGLEFLIGHT.info()},
+        "llm_budget": LLM_BUDGET,
+        "prompt": {
+            "max_tokens": PROMPT_MAX_TOKENS,
+            "token_counter": token_backend(),
+            "stable_prefix_tokens": count_tokens(PROMPT_HEAD),
+            "full_corpus_tokens": count_tokens(CORPUS.prompt("PERMISOS")),
+        },
+        "breaker": BREAKER.info(),
+        "admission": ADMISSION.info(),
+        "retrieval": {
+            "enabled": RETRIEVAL_ENABLED,
+            "chunks": len(PASSAGE_INDEX.chunks) if PASSAGE_INDEX else 0,
+            "index_version": PASSAGE_INDEX.version if PASSAGE_INDEX else None,
+            "top_k": RETRIEVAL_TOP_K,
+            "token_budget": RETRIEVAL_TOKEN_BUDGET,
+            "min_confidence": RETRIEVAL_MIN_CONFIDENCE,
+        },
+        "access_map_size": access["size"],
+        "access_map_sample": access["sample"],
+        "access_links": access,
+        "ui": UI.info(),
         "init_error": OPENAI_INIT_ERROR,
+        "startup": STARTUP.report(),
         "key_prefix": (os.getenv("OPENAI_API_KEY") or "")[:5],
         "key_len": len(os.getenv("OPENAI_API_KEY") or "")
     }, 200
@@ -626,6 +1096,9 @@ def diag():
 def ping():
     return "pong", 200
 
+STARTUP.mark("routes")
+STARTUP.ready(os.getenv("STARTUP_LOG"))
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
     app.run(host="0.0.0.0", port=port)
\ No newline at end of file
@@ -0,0 +1,117 @@
+"""
+Matcher compilado para intenciones fijas + dominios.
+
+Las reglas se declaran como datos y sus términos se normalizan una sola vez al
+importar. Cada consulta se normaliza una vez y se puntúa contra TODOS los
+términos en una sola llamada a rapidfuzz (process.extract en C); luego se
+resuelven prioridad y umbrales sobre esa fila de puntajes. Para lotes,
+match_many puntúa todas las consultas en una sola pasada de process.cdist
+(requiere numpy; sin numpy cae a una fila por consulta).
+
+Con un `classifier` (classifier.DomainClassifier) el dominio lo decide el
+clasificador cuando su margen es claro; si no, un término con puntaje alto; y
+si ninguno es confiable, el clasificador con margen mínimo o los términos.
+"""
+from collections import namedtuple
+from rapidfuzz import fuzz, process
+from utils import _n
+
+try:
+    import numpy as np  # process.cdist devuelve una matriz numpy
+except ImportError:
+    np = None
+
+Match = namedtuple("Match", "domain domain_score intent")
+
+class RuleMatcher:
+    """
+    intents: lista ORDENADA (primera que dispara gana) de dicts:
+        {"id": str, "terms": [...], "response": str, "min_score": 85,
+         "all_of": [[subcadenas], [subcadenas]]}   # opcional
+      Dispara si algún término alcanza min_score (partial_ratio) o si cada
+      grupo de all_of tiene alguna subcadena presente en la consulta normalizada.
+    domains: {DOMINIO: [términos]} en orden de prioridad ante empates.
+    classifier: opcional, con classify(qn) / classify_many(qns) -> Prediction(domain, score, margin)
+      - margin >= clf_margin: gana el clasificador (domain_score 100)
+      - si no, un término >= term_score gana por palabras clave
+      - si no, margin >= clf_min_margin: clasificador con domain_score proporcional al margen
+    """
+    def __init__(self, intents: list[dict], domains: dict, default_domain: str = "PERMISOS",
+                 scorer=fuzz.partial_ratio, classifier=None, clf_margin: float = 0.10,
+                 clf_min_margin: float = 0.05, term_score: float = 90):
+        self.scorer = scorer
+        self.default_domain = default_domain
+        self.classifier = classifier
+        self.clf_margin = clf_margin
+        self.clf_min_margin = clf_min_margin
+        self.term_score = term_score
+        self.terms = []
+        pos = {}
+
+        def ids(terms):
+            out = []
+            for t in terms:
+                tn = _n(t)
+                if tn not in pos:
+                    pos[tn] = len(self.terms)
+                    self.terms.append(tn)
+                out.append(pos[tn])
+            return tuple(out)
+
+        self.intents = [
+            {
+                **it,
+                "min_score": it.get("min_score", 85),
+                "all_of": [tuple(_n(x) for x in grp) for grp in it.get("all_of", [])],
+                "_ids": ids(it["terms"]),
+            }
+            for it in intents
+        ]
+        self.domains = [(dom, ids(terms)) for dom, terms in domains.items()]
+
+    def normalize(self, q: str) -> str:
+        return _n(q)
+
+    def score_row(self, qn: str) -> list[float]:
+        """Puntaje de la consulta normalizada contra cada término (mismo orden que self.terms)."""
+        row = [0.0] * len(self.terms)
+        for _, s, i in process.extract(qn, self.terms, scorer=self.scorer, processor=None, limit=None):
+            row[i] = s
+        return row
+
+    def score_matrix(self, qns: list[str], workers: int = 1) -> list[list[float]]:
+        """Una fila de score_row por consulta."""
+        if np is None or not qns:
+            return [self.score_row(qn) for qn in qns]
+        return process.cdist(qns, self.terms, scorer=self.scorer, processor=None,
+                             dtype=np.float64, workers=workers).tolist()
+
+    def resolve(self, qn: str, row: list[float], pred=None) -> Match:
+        # dominio: el primero con el mayor puntaje estrictamente positivo
+        best, score = self.default_domain, 0
+        for dom, idx in self.domains:
+            s = max((row[i] for i in idx), default=0)
+            if s > score:
+                best, score = dom, s
+        if pred is not None and (pred.margin >= self.clf_margin or
+                                 (score < self.term_score and pred.margin >= self.clf_min_margin)):
+            best, score = pred.domain, min(100.0, 100.0 * pred.margin / self.clf_margin)
+        intent = None
+        for it in self.intents:
+            thr = it["min_score"]
+            if any(row[i] >= thr for i in it["_ids"]) or (
+                it["all_of"] and all(any(x in qn for x in grp) for grp in it["all_of"])
+            ):
+                intent = it
+                break
+        return Match(best, score, intent)
+
+    def match(self, q: str) -> Match:
+        qn = self.normalize(q)
+        pred = self.classifier.classify(qn) if self.classifier is not None else None
+        return self.resolve(qn, self.score_row(qn), pred)
+
+    def match_many(self, qs: list[str], workers: int = 1) -> list[Match]:
+        qns = [self.normalize(q) for q in qs]
+        preds = self.classifier.classify_many(qns) if self.classifier is not None else [None] * len(qns)
+        return [self.resolve(qn, row, p) for qn, row, p in zip(qns, self.score_matrix(qns, workers), preds)]
@@ -0,0 +1,287 @@
+"""
+Métricas en proceso con salida en formato texto de Prometheus.
+
+- Contadores e histogramas de buckets fijos (se pueden sumar entre procesos).
+- Con METRICS_DIR, cada worker vuelca su snapshot a METRICS_DIR/<pid>.json
+  cada pocos segundos; /metrics suma los snapshots de todos los workers. El
+  proceso que hace fork (master de gunicorn --preload) no atiende requests:
+  deja de volcar y borra su archivo, y cada hijo arranca con métricas en cero.
+  Los contadores e histogramas de un worker muerto (reinicio, max_requests) se
+  suman a METRICS_DIR/retired.json antes de borrar su archivo, así los totales
+  nunca bajan (Prometheus lo tomaría como un reset); sus gauges se descartan.
+- Los histogramas exponen _bucket/_sum/_count y además p50/p95/p99 estimados
+  a partir de los buckets (olivia_*_quantile).
+"""
+import bisect, glob, json, os, threading, time
+from contextlib import contextmanager
+
+try:
+    import fcntl  # lock entre workers para plegar los snapshots de los muertos
+except ImportError:
+    fcntl = None
+
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0,
+)
+QUANTILES = (0.5, 0.95, 0.99)
+RETIRED = "retired.json"
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _lkey(labels: dict) -> str:
+    return ",".join(f'{k}="{labels[k]}"' for k in sorted(labels))
+
+class Metrics:
+    def __init__(self, prefix: str = "olivia"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._meta = {}        # name -> (type, help)
+        self._counters = {}    # name -> {lkey: value}
+        self._hists = {}       # name -> {lkey: [bucket counts..., +Inf, sum]}
+        self._collectors = []  # fn() -> [(name, type, help, labels, value)]
+        self._flush_lock = threading.Lock()
+        self._forked = False   # True en el proceso que ya hizo fork (no es un worker)
+        self.dir = None
+
+    # ---- declaración ----
+    def describe(self, name: str, mtype: str, help_: str):
+        self._meta[f"{self.prefix}_{name}"] = (mtype, help_)
+
+    def collector(self, fn):
+        """fn() -> [(name, type, help, labels, value)], evaluado en cada snapshot."""
+        self._collectors.append(fn)
+        return fn
+
+    # ---- registro (hot path) ----
+    def inc(self, name: str, value: float = 1, **labels):
+        k = _lkey(labels)
+        name = f"{self.prefix}_{name}"
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[k] = series.get(k, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        k = _lkey(labels)
+        name = f"{self.prefix}_{name}"
+        i = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+        with self._lock:
+            series = self._hists.setdefault(name, {})
+            h = series.get(k)
+            if h is None:
+                h = series[k] = [0] * (len(LATENCY_BUCKETS) + 2)
+            h[i] += 1
+            h[-1] += seconds
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    # ---- snapshots / multi-proceso ----
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = {n: dict(s) for n, s in self._counters.items()}
+            hists = {n: {k: list(h) for k, h in s.items()} for n, s in self._hists.items()}
+        gauges = {}
+        meta = {n: list(m) for n, m in self._meta.items()}
+        for fn in self._collectors:
+            try:
+                rows = fn()
+            except Exception:
+                continue
+            for name, mtype, help_, labels, value in rows:
+                name = f"{self.prefix}_{name}"
+                meta.setdefault(name, [mtype, help_])
+                target = counters if mtype == "counter" else gauges
+                target.setdefault(name, {})[_lkey(labels)] = value
+        return {"pid": os.getpid(), "ts": time.time(), "meta": meta,
+                "counters": counters, "gauges": gauges, "hists": hists}
+
+    def enable_multiprocess(self, path: str, interval: float = 5.0):
+        """Vuelca el snapshot de este worker a path/<pid>.json cada `interval` segundos."""
+        os.makedirs(path, exist_ok=True)
+        self.dir = path
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.flush()
+                except Exception:
+                    pass
+
+        def start():
+            threading.Thread(target=loop, name="metrics-flush", daemon=True).start()
+
+        def after_fork():
+            # los locks del padre pudieron quedar tomados por su hilo de volcado; lo que el
+            # padre contó antes del fork no es de este worker (sumado N veces lo inflaría)
+            self._lock = threading.Lock()
+            self._flush_lock = threading.Lock()
+            self._counters, self._hists = {}, {}
+            self._forked = False
+            start()
+
+        def after_fork_parent():
+            with self._flush_lock:
+                self._forked = True
+                try:
+                    os.remove(os.path.join(self.dir, f"{os.getpid()}.json"))
+                except OSError:
+                    pass
+        start()
+        # gunicorn --preload importa la app antes del fork: los hilos no pasan al worker
+        os.register_at_fork(after_in_child=after_fork, after_in_parent=after_fork_parent)
+        return self
+
+    def flush(self):
+        if not self.dir:
+            return
+        with self._flush_lock:
+            if self._forked:
+                return
+            dst = os.path.join(self.dir, f"{os.getpid()}.json")
+            tmp = dst + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp, dst)
+
+    @contextmanager
+    def _dir_lock(self):
+        """Exclusivo entre workers mientras se lee o se pliega METRICS_DIR."""
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.dir, ".lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _retire(self, paths: list[str]):
+        """Suma contadores e histogramas de los workers muertos a retired.json y borra sus archivos."""
+        dst = os.path.join(self.dir, RETIRED)
+        try:
+            with open(dst) as f:
+                retired = json.load(f)
+        except (OSError, ValueError):
+            retired = {}
+        snaps = [retired]
+        for p in paths:
+            try:
+                with open(p) as f:
+                    snaps.append({**json.load(f), "gauges": {}})
+            except (OSError, ValueError):
+                pass
+        merged = self.merge(snaps)
+        tmp = f"{dst}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"pid": "retired", "ts": time.time(), **merged, "gauges": {}}, f)
+        os.replace(tmp, dst)  # primero el acumulado, después se borran los muertos
+        for p in paths:
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+
+    def collect(self) -> list[dict]:
+        """Snapshots de todos los workers (o solo el propio si no hay METRICS_DIR) + los retirados."""
+        if not self.dir:
+            return [self.snapshot()]
+        self.flush()
+        with self._dir_lock():
+            paths = glob.glob(os.path.join(self.dir, "*.json"))
+            dead = [p for p in paths
+                    if os.path.basename(p)[:-5].isdigit() and not _alive(int(os.path.basename(p)[:-5]))]
+            if dead:
+                self._retire(dead)
+                paths = glob.glob(os.path.join(self.dir, "*.json"))
+            out = []
+            for p in paths:
+                try:
+                    with open(p) as f:
+                        out.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        return out
+
+    # ---- salida ----
+    @staticmethod
+    def merge(snaps: list[dict]) -> dict:
+        merged = {"meta": {}, "counters": {}, "gauges": {}, "hists": {}}
+        for s in snaps:
+            merged["meta"].update(s.get("meta", {}))
+            for kind in ("counters", "gauges"):
+                for n, series in s.get(kind, {}).items():
+                    dst = merged[kind].setdefault(n, {})
+                    for k, v in series.items():
+                        dst[k] = dst.get(k, 0) + v
+            for n, series in s.get("hists", {}).items():
+                dst = merged["hists"].setdefault(n, {})
+                for k, h in series.items():
+                    cur = dst.get(k)
+                    dst[k] = list(h) if cur is None else [a + b for a, b in zip(cur, h)]
+        return merged
+
+    @staticmethod
+    def quantile(h: list, q: float) -> float:
+        """Estimación por interpolación lineal dentro del bucket."""
+        counts = h[:-1]
+        total = sum(counts)
+        if not total:
+            return 0.0
+        rank, acc = q * total, 0
+        for i, c in enumerate(counts):
+            if acc + c >= rank and c:
+                lo = LATENCY_BUCKETS[i - 1] if i > 0 else 0.0
+                hi = LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else LATENCY_BUCKETS[-1]
+                return lo + (hi - lo) * (rank - acc) / c
+            acc += c
+        return LATENCY_BUCKETS[-1]
+
+    def render(self) -> str:
+        m = self.merge(self.collect())
+        lines = []
+
+        def head(name, default_type):
+            mtype, help_ = m["meta"].get(name, (default_type, name))
+            lines.append(f"# HELP {name} {help_}")
+            lines.append(f"# TYPE {name} {mtype}")
+
+        for kind, default_type in (("counters", "counter"), ("gauges", "gauge")):
+            for name in sorted(m[kind]):
+                head(name, default_type)
+                for k, v in sorted(m[kind][name].items()):
+                    lines.append(f"{name}{{{k}}} {v}" if k else f"{name} {v}")
+        for name in sorted(m["hists"]):
+            head(name, "histogram")
+            for k, h in sorted(m["hists"][name].items()):
+                sep = "," if k else ""
+                acc = 0
+                for le, c in zip(LATENCY_BUCKETS, h):
+                    acc += c
+                    lines.append(f'{name}_bucket{{{k}{sep}le="{le}"}} {acc}')
+                acc += h[len(LATENCY_BUCKETS)]
+                lines.append(f'{name}_bucket{{{k}{sep}le="+Inf"}} {acc}')
+                lines.append(f"{name}_sum{{{k}}} {h[-1]:.6f}" if k else f"{name}_sum {h[-1]:.6f}")
+                lines.append(f"{name}_count{{{k}}} {acc}" if k else f"{name}_count {acc}")
+            qname = f"{name}_quantile"
+            lines.append(f"# HELP {qname} p50/p95/p99 estimados desde los buckets de {name}")
+            lines.append(f"# TYPE {qname} gauge")
+            for k, h in sorted(m["hists"][name].items()):
+                sep = "," if k else ""
+                for q in QUANTILES:
+                    lines.append(f'{qname}{{{k}{sep}quantile="{q}"}} {self.quantile(h, q):.6f}')
+        return "\n".join(lines) + "\n"
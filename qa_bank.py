@@ -0,0 +1,103 @@
+"""
+Banco de preguntas (policies/banco_preguntas.txt) como índice pregunta -> respuesta.
+
+Si la pregunta del usuario coincide con suficiente confianza con una pregunta
+curada, se responde directo con la respuesta oficial sin llamar a OpenAI.
+"""
+import hashlib, html
+from rapidfuzz import fuzz, process
+from utils import normalize_q
+from retrieval import chunk_text, tokenize
+
+def parse_bank(text: str) -> list[dict]:
+    """
+    Cada bloque cuya primera línea termina en '?' es una entrada; el resto del
+    bloque es la respuesta. Devuelve [{"id","section","domain","question","answer"}]
+    """
+    out = []
+    for ch in chunk_text("banco", text):
+        first, _, rest = ch["text"].partition("\n")
+        question = first.strip()
+        answer = "\n".join(l.strip() for l in rest.splitlines() if l.strip())
+        if not question.endswith("?") or not answer:
+            continue
+        qid = "qa-" + hashlib.sha1(normalize_q(question).encode()).hexdigest()[:8]
+        out.append({
+            "id": qid,
+            "section": ch["section"],
+            "domain": ch["domain"],
+            "question": question,
+            "answer": answer,
+        })
+    return out
+
+class QABank:
+    """
+    min_score:    umbral de token_set_ratio (0-100)
+    min_coverage: fracción de términos de la pregunta curada que deben estar en
+                  la consulta; evita que 'vacaciones' a secas calce con cualquier
+                  pregunta que contenga esa palabra.
+    min_query_coverage: fracción de términos de la consulta que deben estar en la
+                  pregunta curada. token_set_ratio da 100 si la curada está
+                  contenida en la consulta: sin este tope "que es d2movilplus y
+                  como recupero mi clave" recibiría solo la respuesta de "¿Qué es
+                  D2MovilPlus?". Las preguntas compuestas pasan al modelo.
+    """
+    def __init__(self, entries: list[dict], min_score: float = 88, min_coverage: float = 0.75,
+                 min_query_coverage: float = 0.6, version: str = "", choices: list[str] | None = None,
+                 terms: list[set] | None = None):
+        self.entries = entries
+        self.version = version
+        self.min_score = min_score
+        self.min_coverage = min_coverage
+        self.min_query_coverage = min_query_coverage
+        self.choices = choices if choices is not None else [normalize_q(e["question"]) for e in entries]
+        self.terms = terms if terms is not None else [set(tokenize(e["question"])) for e in entries]
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_text(cls, text: str, **kw) -> "QABank":
+        return cls(parse_bank(text), **kw)
+
+    def state(self) -> dict:
+        """Entradas + preguntas ya normalizadas (para el snapshot de conocimiento)."""
+        return {"entries": self.entries, "version": self.version, "choices": self.choices, "terms": self.terms}
+
+    @classmethod
+    def from_state(cls, state: dict, **kw) -> "QABank":
+        return cls(state["entries"], version=state["version"], choices=state["choices"], terms=state["terms"], **kw)
+
+    def match(self, query: str, limit: int = 5) -> dict | None:
+        """Mejor entrada que pasa score y ambas coberturas, con {"score","coverage","query_coverage"} añadidos."""
+        qn = normalize_q(query)
+        if not qn or not self.choices:
+            return None
+        qterms = set(tokenize(query))
+        cands = process.extract(qn, self.choices, scorer=fuzz.token_set_ratio,
+                                processor=None, limit=limit, score_cutoff=self.min_score)
+        for _, score, i in cands:
+            terms = self.terms[i]
+            common = len(terms & qterms)
+            cov = common / len(terms) if terms else 0.0
+            qcov = common / len(qterms) if qterms else 0.0
+            if cov >= self.min_coverage and qcov >= self.min_query_coverage:
+                self.hits += 1
+                return {**self.entries[i], "score": round(score, 1), "coverage": round(cov, 2), "query_coverage": round(qcov, 2)}
+        self.misses += 1
+        return None
+
+    def info(self) -> dict:
+        return {
+            "entries": len(self.entries),
+            "version": self.version,
+            "min_score": self.min_score,
+            "min_coverage": self.min_coverage,
+            "min_query_coverage": self.min_query_coverage,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+def answer_html(entry: dict) -> str:
+    """Respuesta curada escapada, una línea por renglón."""
+    return "<br>".join(html.escape(l) for l in entry["answer"].splitlines())
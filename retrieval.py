@@ -0,0 +1,235 @@
+"""
+Índice de pasajes (BM25) sobre policies/.
+
+Los textos se parten por encabezado / bloque pregunta-respuesta y se indexan una
+vez por versión del corpus. En el request se eligen los top-k pasajes del
+dominio enrutado dentro de un presupuesto de tokens; si la confianza es baja,
+quien llama usa el corpus completo.
+
+Uso offline (inspección):  python retrieval.py "¿cuántos días de vacaciones tengo?"
+"""
+import math, re
+from collections import Counter
+from utils import _n
+
+# Dominio "dueño" de cada archivo y de cada sección del banco de preguntas
+SOURCE_DOMAINS = {
+    "vacaciones": "VACACIONES",
+    "permisos":   "PERMISOS",
+    "compras":    "COMPRAS",
+    "comision":   "COMISIONES",
+}
+SECTION_DOMAINS = [
+    ("biometrika", "BIOMETRIKA"),
+    ("permisos",   "PERMISOS"),
+    ("vacaciones", "VACACIONES"),
+    ("prestamo",   "NOMINA"),
+    ("bgr",        "NOMINA"),
+    ("nomina",     "NOMINA"),
+    ("prepaid",    "NOMINA"),
+]
+SOURCE_TITLES = {
+    "vacaciones": "VACACIONES",
+    "permisos":   "PERMISOS Y ATRASOS",
+    "compras":    "COMPRAS DE EMPLEADOS",
+    "comision":   "COMISIONES",
+    "banco":      "BANCO DE PREGUNTAS DO",
+}
+
+STOPWORDS = set("""
+a al algo algun alguna algunas alguno algunos ante antes como con contra cual cuales
+cuando de del desde donde dos el ella ellas ellos en entre era es esa esas ese eso esos
+esta estan estas este esto estos fue ha hay la las le les lo los mas me mi mis muy nos
+o para pero por porque puedo que quien se si sin sobre son su sus te tengo tiene tu tus
+un una uno unos y ya yo
+""".split())
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+def approx_tokens(text: str) -> int:
+    """Estimación rápida (~4 caracteres por token en español)."""
+    return max(1, len(text) // 4)
+
+def clip_text(text: str, max_tokens: int) -> str:
+    """Corta `text` para que approx_tokens quede en `max_tokens`, en un espacio si lo hay."""
+    limit = max_tokens * 4
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    space = cut.rfind(" ")
+    return (cut[:space] if space > limit // 2 else cut).rstrip()
+
+def _stem(tok: str) -> str:
+    # plural simple: vacaciones -> vacacion, permisos -> permiso
+    if len(tok) > 4 and tok.endswith("es"):
+        return tok[:-2]
+    if len(tok) > 3 and tok.endswith("s"):
+        return tok[:-1]
+    return tok
+
+def tokenize(text: str) -> list[str]:
+    return [_stem(t) for t in _TOKEN.findall(_n(text)) if t not in STOPWORDS and len(t) > 1]
+
+def _is_heading(block: str) -> bool:
+    line = block.strip()
+    return "\n" not in line and len(line) <= 80 and line == line.upper() and any(c.isalpha() for c in line)
+
+def _section_domain(section: str, default: str | None) -> str | None:
+    sn = _n(section)
+    for kw, dom in SECTION_DOMAINS:
+        if kw in sn:
+            return dom
+    return default
+
+def chunk_text(source: str, text: str) -> list[dict]:
+    """
+    Parte un archivo en bloques separados por líneas en blanco. Un bloque que
+    empieza indentado continúa al anterior; un encabezado suelto (MAYÚSCULAS)
+    abre sección y se antepone a los pasajes siguientes.
+    """
+    default_dom = SOURCE_DOMAINS.get(source)
+    section = ""
+    chunks = []
+    for raw in re.split(r"\n[ \t]*\n", text or ""):
+        if not raw.strip():
+            continue
+        if raw[:1] in (" ", "\t") and chunks and chunks[-1]["source"] == source:
+            chunks[-1]["text"] += "\n" + raw.rstrip()
+            continue
+        block = raw.strip()
+        if _is_heading(block):
+            section = block
+            continue
+        chunks.append({
+            "source": source,
+            "section": section,
+            "domain": _section_domain(section, default_dom),
+            "text": block,
+        })
+    return chunks
+
+class PassageIndex:
+    """BM25 en memoria con listas invertidas: term -> [(chunk_id, tf), ...]"""
+
+    def __init__(self, chunks: list[dict], k1: float = 1.4, b: float = 0.75, version: str = ""):
+        self.chunks = chunks
+        self.version = version
+        self.k1, self.b = k1, b
+        self.postings = {}
+        self.lengths = []
+        for i, ch in enumerate(chunks):
+            toks = tokenize(ch["section"] + " " + ch["text"])
+            self.lengths.append(len(toks))
+            ch["tokens"] = approx_tokens(ch["text"])
+            for t, tf in Counter(toks).items():
+                self.postings.setdefault(t, []).append((i, tf))
+        n = len(chunks) or 1
+        self.avgdl = (sum(self.lengths) / n) or 1.0
+        self.idf = {
+            t: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5))
+            for t, p in self.postings.items()
+        }
+
+    @classmethod
+    def from_texts(cls, texts: dict, version: str = "", **kw) -> "PassageIndex":
+        chunks = []
+        for source, text in texts.items():
+            chunks.extend(chunk_text(source, text))
+        return cls(chunks, version=version, **kw)
+
+    def state(self) -> dict:
+        """Índice ya construido, en tipos básicos (para el snapshot de conocimiento)."""
+        return {"chunks": self.chunks, "version": self.version, "k1": self.k1, "b": self.b,
+                "postings": self.postings, "lengths": self.lengths, "avgdl": self.avgdl, "idf": self.idf}
+
+    @classmethod
+    def from_state(cls, state: dict) -> "PassageIndex":
+        self = cls.__new__(cls)
+        self.chunks, self.version = state["chunks"], state["version"]
+        self.k1, self.b = state["k1"], state["b"]
+        self.postings, self.lengths = state["postings"], state["lengths"]
+        self.avgdl, self.idf = state["avgdl"], state["idf"]
+        return self
+
+    def search(self, query: str, domain: str | None = None, top_k: int = 6,
+               domain_boost: float = 1.5) -> list[tuple[float, int]]:
+        """Devuelve [(score, chunk_id)] ordenado; los pasajes del dominio pesan más."""
+        scores = {}
+        for t in set(tokenize(query)):
+            idf = self.idf.get(t)
+            if idf is None:
+                continue
+            for i, tf in self.postings[t]:
+                dl = self.lengths[i]
+                s = idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * dl / self.avgdl))
+                scores[i] = scores.get(i, 0.0) + s
+        if domain:
+            for i in scores:
+                if self.chunks[i]["domain"] == domain:
+                    scores[i] *= domain_boost
+        ranked = sorted(((s, i) for i, s in scores.items()), reverse=True)
+        return ranked[:top_k]
+
+    def confidence(self, query: str, chunk_id: int) -> float:
+        """Fracción (ponderada por idf) de los términos de la consulta presentes en el pasaje."""
+        terms = [t for t in set(tokenize(query)) if t in self.idf]
+        if not terms:
+            return 0.0
+        total = sum(self.idf[t] for t in terms)
+        hit = sum(self.idf[t] for t in terms if any(i == chunk_id for i, _ in self.postings[t]))
+        return hit / total if total else 0.0
+
+    def retrieve(self, query: str, domain: str | None = None, top_k: int = 6,
+                 token_budget: int = 1200, min_confidence: float = 0.5) -> dict:
+        """
+        Selecciona pasajes para el prompt sin pasar de `token_budget`; si el mejor
+        pasaje solo ya no cabe, va recortado (truncated=True).
+        Devuelve {"passages": [...], "confidence": float, "tokens": int, "fallback": bool}
+        fallback=True => usar el corpus completo.
+        """
+        ranked = self.search(query, domain, top_k=top_k)
+        if not ranked:
+            return {"passages": [], "confidence": 0.0, "tokens": 0, "fallback": True}
+        conf = self.confidence(query, ranked[0][1])
+        picked, used = [], 0
+        for score, i in ranked:
+            ch = self.chunks[i]
+            if used + ch["tokens"] > token_budget:
+                if picked or token_budget <= 0:
+                    continue
+                text = clip_text(ch["text"], token_budget)
+                ch = {**ch, "text": text, "tokens": approx_tokens(text), "truncated": True}
+            picked.append({**ch, "id": i, "score": round(score, 3)})
+            used += ch["tokens"]
+        return {
+            "passages": picked,
+            "confidence": round(conf, 3),
+            "tokens": used,
+            "fallback": conf < min_confidence,
+        }
+
+def render_passages(passages: list[dict]) -> str:
+    """Agrupa los pasajes por archivo de origen, con el mismo rótulo que el prompt completo."""
+    by_src = {}
+    for p in passages:
+        by_src.setdefault(p["source"], []).append(p)
+    out = []
+    for src, items in by_src.items():
+        out.append(f"{SOURCE_TITLES.get(src, src.upper())}:")
+        for p in items:
+            head = f"[{p['section']}] " if p["section"] else ""
+            out.append(head + p["text"])
+        out.append("")
+    return "\n".join(out).strip()
+
+if __name__ == "__main__":
+    import sys
+    from corpus import PolicyCorpus
+    c = PolicyCorpus()
+    idx = PassageIndex.from_texts(c.texts(), version=c.version)
+    print(f"{len(idx.chunks)} pasajes, {len(idx.postings)} términos, corpus {idx.version}")
+    for q in sys.argv[1:]:
+        r = idx.retrieve(q)
+        print(f"\n> {q}  conf={r['confidence']} tokens={r['tokens']} fallback={r['fallback']}")
+        for p in r["passages"]:
+            print(f"  {p['score']:7.3f} {p['source']:<10} {p['domain'] or '-':<11} {p['text'][:70]!r}")
@@ -0,0 +1,280 @@
+"""
+Almacén de sesiones por sid (estado de los flujos guiados).
+
+Backends (SESSION_STORE):
+  memory                      LRU + TTL en el proceso (default)
+  sqlite:///ruta/sesiones.db  archivo SQLite en modo WAL, compartido entre workers
+  redis://host:6379/0         Redis (o cualquier servidor compatible); requiere `redis`
+
+Todos exponen get/set/delete con TTL deslizante (cada set renueva la vida),
+tope de entradas y barrido de expirados en segundo plano. `namespace` separa
+almacenes que comparten backend (tabla en SQLite, prefijo en Redis). `get`
+devuelve siempre una copia: el estado solo cambia a través de `set`.
+"""
+import copy, json, os, re, sqlite3, sys, threading, time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+class SessionStore(ABC):
+    """Interfaz común. Los valores son dicts serializables a JSON."""
+    backend = "base"
+
+    def __init__(self, ttl: float = 1800, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.expired = 0
+        self.evicted = 0
+
+    @abstractmethod
+    def get(self, sid: str) -> dict | None: ...
+
+    @abstractmethod
+    def set(self, sid: str, value: dict): ...
+
+    @abstractmethod
+    def delete(self, sid: str): ...
+
+    @abstractmethod
+    def __len__(self) -> int: ...
+
+    def sweep(self) -> int:
+        """Elimina expirados y aplica el tope; devuelve cuántos expiraron."""
+        return 0
+
+    def memory_bytes(self) -> int:
+        return 0
+
+    def start_sweeper(self, interval: float = 60):
+        """
+        Hilo daemon que elimina expirados y aplica el tope cada `interval` segundos.
+        Con gunicorn --preload el store se crea en el master y los hilos no pasan
+        al fork: cada worker arranca el suyo y el master (no atiende requests) deja
+        de barrer.
+        """
+        self._sweep_interval = interval
+        self._sweeper_pid = None
+        self._spawn_sweeper()
+        os.register_at_fork(after_in_child=self._spawn_sweeper, after_in_parent=self._stop_sweeper)
+        return self
+
+    def _spawn_sweeper(self):
+        pid = self._sweeper_pid = os.getpid()
+
+        def loop():
+            while True:
+                time.sleep(self._sweep_interval)
+                if self._sweeper_pid != pid:
+                    return
+                try:
+                    self.sweep()
+                except Exception:
+                    pass
+        threading.Thread(target=loop, name=f"sessions-{self.backend}-sweeper", daemon=True).start()
+
+    def _stop_sweeper(self):
+        self._sweeper_pid = None
+
+    def info(self) -> dict:
+        return {
+            "backend": self.backend,
+            "entries": len(self),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "memory_bytes": self.memory_bytes(),
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+class MemorySessionStore(SessionStore):
+    backend = "memory"
+
+    def __init__(self, ttl: float = 1800, max_entries: int = 10000):
+        super().__init__(ttl, max_entries)
+        self._data = OrderedDict()  # sid -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, sid):
+        with self._lock:
+            item = self._data.get(sid)
+            if item is None:
+                return None
+            if item[0] <= time.monotonic():
+                del self._data[sid]
+                self.expired += 1
+                return None
+            self._data.move_to_end(sid)
+            return copy.deepcopy(item[1])
+
+    def set(self, sid, value):
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._data[sid] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(sid)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evicted += 1
+
+    def delete(self, sid):
+        with self._lock:
+            self._data.pop(sid, None)
+
+    def sweep(self):
+        now = time.monotonic()
+        with self._lock:
+            dead = [sid for sid, (exp, _) in self._data.items() if exp <= now]
+            for sid in dead:
+                del self._data[sid]
+            self.expired += len(dead)
+        return len(dead)
+
+    def __len__(self):
+        return len(self._data)
+
+    def memory_bytes(self):
+        with self._lock:
+            items = list(self._data.items())
+        return sum(sys.getsizeof(sid) + len(json.dumps(v)) for sid, (_, v) in items)
+
+class SqliteSessionStore(SessionStore):
+    """
+    Una conexión por hilo y por proceso (un worker nunca usa la que abrió el master
+    antes del fork); WAL permite lectores concurrentes entre procesos.
+    """
+    backend = "sqlite"
+
+    def __init__(self, path: str, ttl: float = 1800, max_entries: int = 10000, table: str = "sessions"):
+        super().__init__(ttl, max_entries)
+        if not re.fullmatch(r"[a-z_][a-z0-9_]*", table):
+            raise ValueError(f"nombre de tabla inválido: {table!r}")
+        self.path = path
+        self.table = table
+        self._local = threading.local()
+        self._inherited = []  # conexiones heredadas de un fork: no se usan ni se cierran
+        self._conn().executescript(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                sid TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS {table}_expires ON {table}(expires_at);
+        """)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            if conn is not None:
+                self._inherited.append(conn)  # cerrarla en el hijo tocaría los locks y el WAL del padre
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, sid):
+        row = self._conn().execute(
+            f"SELECT value FROM {self.table} WHERE sid = ? AND expires_at > ?", (sid, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, sid, value):
+        self._conn().execute(
+            f"INSERT INTO {self.table}(sid, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(sid) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+            (sid, json.dumps(value, ensure_ascii=False), time.time() + self.ttl),
+        )
+
+    def delete(self, sid):
+        self._conn().execute(f"DELETE FROM {self.table} WHERE sid = ?", (sid,))
+
+    def sweep(self):
+        conn = self._conn()
+        n = conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (time.time(),)).rowcount
+        self.expired += n
+        extra = len(self) - self.max_entries
+        if extra > 0:
+            # expires_at crece con cada set: los más antiguos son los menos usados
+            self.evicted += conn.execute(
+                f"DELETE FROM {self.table} WHERE sid IN (SELECT sid FROM {self.table} ORDER BY expires_at LIMIT ?)",
+                (extra,),
+            ).rowcount
+        return n
+
+    def __len__(self):
+        return self._conn().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def memory_bytes(self):
+        conn = self._conn()
+        pages = conn.execute("PRAGMA page_count").fetchone()[0]
+        size = conn.execute("PRAGMA page_size").fetchone()[0]
+        return pages * size
+
+class RedisSessionStore(SessionStore):
+    """
+    TTL nativo de Redis (SETEX) más un índice ZSET sid -> expires_at por namespace:
+    el tope se aplica en sweep() sacando los de vencimiento más próximo (los menos
+    usados) y el conteo es un ZCARD, sin recorrer el keyspace.
+    """
+    backend = "redis"
+
+    def __init__(self, url: str, ttl: float = 1800, max_entries: int = 10000, prefix: str = "olivia:sid:",
+                 client=None):
+        super().__init__(ttl, max_entries)
+        if client is None:
+            import redis  # opcional: solo si se elige este backend
+            client = redis.Redis.from_url(url)
+        self.r = client
+        self.prefix = prefix
+        self.index = prefix.rstrip(":") + ".index"  # fuera del espacio prefix + sid
+
+    def get(self, sid):
+        raw = self.r.get(self.prefix + sid)
+        return json.loads(raw) if raw else None
+
+    def set(self, sid, value):
+        pipe = self.r.pipeline()
+        pipe.setex(self.prefix + sid, int(self.ttl), json.dumps(value, ensure_ascii=False))
+        pipe.zadd(self.index, {sid: time.time() + self.ttl})
+        pipe.execute()
+
+    def delete(self, sid):
+        pipe = self.r.pipeline()
+        pipe.delete(self.prefix + sid)
+        pipe.zrem(self.index, sid)
+        pipe.execute()
+
+    def sweep(self):
+        # las claves ya las borró el TTL de Redis; acá se limpia el índice
+        n = self.r.zremrangebyscore(self.index, "-inf", time.time())
+        self.expired += n
+        extra = self.r.zcard(self.index) - self.max_entries
+        if extra > 0:
+            sids = [s.decode() if isinstance(s, bytes) else s for s in self.r.zrange(self.index, 0, extra - 1)]
+            pipe = self.r.pipeline()
+            pipe.delete(*[self.prefix + s for s in sids])
+            pipe.zrem(self.index, *sids)
+            self.evicted += pipe.execute()[1]
+        return n
+
+    def __len__(self):
+        return self.r.zcount(self.index, time.time(), "+inf")
+
+    def memory_bytes(self):
+        try:
+            return int(self.r.info("memory").get("used_memory", 0))
+        except Exception:
+            return 0
+
+def open_session_store(spec: str = "memory", ttl: float = 1800, max_entries: int = 10000,
+                       sweep_interval: float = 60, namespace: str = "sid") -> SessionStore:
+    spec = (spec or "memory").strip()
+    if spec.startswith("sqlite:///"):
+        path = spec[len("sqlite:///"):]
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        table = "sessions" if namespace == "sid" else f"sessions_{namespace}"
+        store = SqliteSessionStore(path, ttl, max_entries, table=table)
+    elif spec.startswith(("redis://", "rediss://", "unix://")):
+        store = RedisSessionStore(spec, ttl, max_entries, prefix=f"olivia:{namespace}:")
+    else:
+        store = MemorySessionStore(ttl, max_entries)
+    return store.start_sweeper(sweep_interval)
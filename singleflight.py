@@ -0,0 +1,94 @@
+"""
+Singleflight: peticiones concurrentes con la misma clave comparten una sola
+llamada al modelo. La primera (líder) ejecuta; las demás esperan su resultado
+hasta `timeout` segundos y, si vence, reciben TimeoutError.
+
+SingleFlight       para workers con hilos (main:app)
+AsyncSingleFlight  para el event loop (asgi:app)
+"""
+import asyncio, threading
+
+class _Stats:
+    def __init__(self):
+        self.leaders = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+    def info(self) -> dict:
+        return {
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "timeouts": self.timeouts,
+        }
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight(_Stats):
+    def __init__(self):
+        super().__init__()
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, timeout: float | None = None):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            if not call.event.wait(timeout):
+                self.timeouts += 1
+                raise TimeoutError(f"singleflight: {key!r}")
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+class AsyncSingleFlight(_Stats):
+    def __init__(self):
+        super().__init__()
+        self._calls = {}  # key -> asyncio.Future
+
+    async def do(self, key, coro_fn, timeout: float | None = None):
+        fut = self._calls.get(key)
+        if fut is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.wait_for(asyncio.shield(fut), timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise TimeoutError(f"singleflight: {key!r}")
+        fut = self._calls[key] = asyncio.get_running_loop().create_future()
+        self.leaders += 1
+        try:
+            result = await coro_fn()
+            fut.set_result(result)
+            return result
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                # el líder se canceló (cliente desconectado): los demás no deben cancelarse
+                e = RuntimeError("singleflight: líder cancelado")
+            fut.set_exception(e)
+            fut.exception()  # marcada como leída aunque nadie más esperara
+            raise
+        finally:
+            self._calls.pop(key, None)
@@ -0,0 +1,134 @@
+"""
+Snapshot compilado de la base de conocimiento (policies/).
+
+`python snapshot.py build` lee policies/ una vez y guarda en un solo archivo
+binario todo lo que hoy cada worker deriva al importar: mapa de accesos, banco
+de preguntas con sus preguntas normalizadas, índice de pasajes (BM25) y
+clasificador de dominio. El archivo lleva el hash del contenido de policies/.
+
+La app lo abre con mmap de solo lectura y decodifica cada sección desde esa
+vista, sin parsear ni indexar de nuevo: las páginas del archivo las comparte el
+page cache entre workers y, con `gunicorn --preload`, también los objetos ya
+construidos (copy-on-write). Si el hash no coincide con los archivos actuales
+el snapshot se ignora y todo se construye como siempre; las recargas en
+caliente tampoco lo usan.
+
+Formato:  MAGIC | u32 largo del encabezado | encabezado JSON | secciones (marshal)
+"""
+import hashlib, json, marshal, mmap, os, struct, sys, time
+from corpus import POLICY_FILES
+
+MAGIC = b"OLVKB\x00\x00\x01"
+SOURCES = (*POLICY_FILES.values(), "accesos.txt")
+
+def content_hash(base: str = "policies") -> str:
+    """sha1 de nombre + bytes de cada archivo fuente (los que falten cuentan como vacíos)."""
+    h = hashlib.sha1()
+    for name in SOURCES:
+        h.update(name.encode()); h.update(b"\0")
+        try:
+            with open(os.path.join(base, name), "rb") as f:
+                h.update(f.read())
+        except OSError:
+            pass
+        h.update(b"\0")
+    return h.hexdigest()[:12]
+
+def write(path: str, sections: dict, meta: dict):
+    blobs = {name: marshal.dumps(obj) for name, obj in sections.items()}
+    layout, offset = {}, 0
+    for name, blob in blobs.items():
+        layout[name] = [offset, len(blob)]
+        offset += len(blob)
+    header = json.dumps({
+        **meta,
+        "built_at": int(time.time()),
+        "python": list(sys.version_info[:2]),
+        "marshal": marshal.version,
+        "sections": layout,
+    }).encode("utf-8")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(header)) + header)
+        for blob in blobs.values():
+            f.write(blob)
+    os.replace(tmp, path)
+
+class KnowledgeSnapshot:
+    """Archivo mapeado en memoria; section(nombre) decodifica una sección desde el mmap."""
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError("no es un snapshot de conocimiento")
+        (n,) = struct.unpack_from("<I", self._mm, len(MAGIC))
+        start = len(MAGIC) + 4
+        self.meta = json.loads(self._mm[start:start + n])
+        if self.meta["python"] != list(sys.version_info[:2]) or self.meta["marshal"] != marshal.version:
+            raise ValueError(f"snapshot de Python {self.meta['python']}: hay que reconstruirlo")
+        self._data = start + n
+        self.version = self.meta["version"]
+        self.used = []
+
+    def section(self, name: str):
+        off, length = self.meta["sections"][name]
+        base = self._data + off
+        obj = marshal.loads(memoryview(self._mm)[base:base + length])
+        self.used.append(name)
+        return obj
+
+    def info(self) -> dict:
+        return {
+            "path": self.path,
+            "version": self.version,
+            "corpus_version": self.meta.get("corpus_version"),
+            "built_at": self.meta.get("built_at"),
+            "bytes": len(self._mm),
+            "sections": {k: v[1] for k, v in self.meta["sections"].items()},
+            "used": self.used,
+        }
+
+def open_snapshot(path: str | None, base: str = "policies") -> tuple[KnowledgeSnapshot | None, str]:
+    """(snapshot, estado): el snapshot solo se devuelve si corresponde a los archivos actuales."""
+    if not path or not os.path.isfile(path):
+        return None, "missing"
+    try:
+        snap = KnowledgeSnapshot(path)
+    except (OSError, ValueError, KeyError, struct.error) as e:
+        return None, f"invalid: {e}"
+    if snap.version != content_hash(base):
+        return None, f"stale: {snap.version}"
+    return snap, "active"
+
+def build(path: str, base: str, domain_terms: dict) -> dict:
+    """Compila policies/ (mismo armado que hace main.py al importar) y escribe el snapshot."""
+    from access import parse_accesos
+    from classifier import DomainClassifier
+    from corpus import PolicyCorpus
+    from qa_bank import QABank
+    from retrieval import PassageIndex
+    from utils import read_txt
+
+    version = content_hash(base)
+    corpus = PolicyCorpus(base=base)
+    texts, cv = corpus.texts(), corpus.version
+    sections = {
+        "access": parse_accesos(read_txt(os.path.join(base, "accesos.txt"))),
+        "qa_bank": QABank.from_text(texts["banco"], version=cv).state(),
+        "passages": PassageIndex.from_texts(texts, version=cv).state(),
+        "classifier": DomainClassifier.from_texts(texts, domain_terms, version=cv).state(),
+    }
+    if content_hash(base) != version:
+        raise RuntimeError("policies/ cambió durante la compilación; vuelve a intentar")
+    write(path, sections, {"version": version, "corpus_version": cv})
+    return KnowledgeSnapshot(path).info()
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.environ["KB_SNAPSHOT"] = ""  # compilar desde los archivos, no desde un snapshot previo
+    import main
+    if sys.argv[1:2] != ["build"]:
+        sys.exit("uso: python snapshot.py build [ruta]")
+    out = sys.argv[2] if len(sys.argv) > 2 else main.KB_SNAPSHOT_DEFAULT
+    print(json.dumps(build(out, "policies", main.DOMAINS), indent=2))
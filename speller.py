@@ -0,0 +1,135 @@
+"""
+Corrección ortográfica de consultas con un vocabulario sacado del corpus.
+
+Vocabulario conocido: las palabras de policies/*.txt, las stopwords y los
+términos de DOMAINS, de las intenciones fijas y de los flujos guiados; esas
+palabras nunca se tocan. Destinos de corrección: solo las palabras de esos
+términos curados (son las que deciden el camino rápido), con su frecuencia en
+el corpus como desempate. Así "salida" o "llegar" no se "corrigen" hacia otra
+palabra de las políticas.
+
+Los destinos se indexan al estilo SymSpell: cada uno se guarda bajo todas sus
+variantes con hasta `max_distance` letras borradas, así los candidatos de una
+palabra mal escrita salen de unas pocas búsquedas en un dict (sus propios
+borrados) en vez de compararla contra todo el vocabulario; solo esos
+candidatos se miden con Damerau-Levenshtein. Se corrigen palabras alfabéticas
+desconocidas, con distancia máxima según el largo (las cortas no se tocan), y
+no se cambia una palabra por una variante de plural o género del mismo término:
+"bacaciones" -> "vacaciones", "marcasion" -> "marcacion", "d2 mobil" -> "d2 movil".
+"""
+import re
+from collections import Counter
+from itertools import combinations
+from rapidfuzz.distance import DamerauLevenshtein
+from retrieval import STOPWORDS, _stem
+from utils import normalize_q
+
+_WORD = re.compile(r"[^\W\d_]+", re.UNICODE)
+TERM_WEIGHT = 50
+PREFIX = 7
+
+def _variant(a: str, b: str) -> bool:
+    """Misma palabra en otro número o género: empleado/empleados, segura/seguro, asesora/asesor."""
+    if len(a) < len(b):
+        a, b = b, a
+    return (_stem(a) == _stem(b) or (a[:-1] == b[:-1] and a[-1] in "aeo" and b[-1] in "aeo")
+            or (a.startswith(b) and a[len(b):] in ("s", "es", "a", "as")))
+
+def _deletes(word: str, max_distance: int) -> set:
+    """La palabra y todas sus variantes con 1..max_distance letras borradas."""
+    out = {word}
+    for k in range(1, min(max_distance, len(word) - 1) + 1):
+        for idx in combinations(range(len(word)), k):
+            out.add("".join(c for i, c in enumerate(word) if i not in idx))
+    return out
+
+class Speller:
+    """
+    words:   palabras conocidas (normalizadas), no se corrigen
+    targets: {palabra: frecuencia} hacia las que se puede corregir
+    lengths: (largo mínimo para distancia 1, largo mínimo para distancia 2)
+    """
+    def __init__(self, words: set, targets: dict, max_distance: int = 2, lengths: tuple = (5, 9), version: str = ""):
+        self.words = words
+        self.targets = targets
+        self.max_distance = max_distance
+        self.lengths = tuple(lengths)
+        self.version = version
+        deletes = {}
+        for w in targets:
+            for d in _deletes(w[:PREFIX], max_distance):
+                deletes.setdefault(d, []).append(w)
+        self.deletes = {d: tuple(ws) for d, ws in deletes.items()}
+        self._memo = {}
+        self.queries = self.corrected = 0
+
+    @classmethod
+    def from_texts(cls, texts: list[str], terms: list[str], version: str = "", **kw) -> "Speller":
+        freq = Counter()
+        for t in texts:
+            freq.update(w for w in normalize_q(t).split() if w.isalpha())
+        targets = {}
+        for t in terms:
+            for w in normalize_q(t).split():
+                if w.isalpha() and len(w) > 2:
+                    targets[w] = freq[w] + TERM_WEIGHT
+        words = set(freq) | set(targets) | {normalize_q(w) for w in STOPWORDS}
+        return cls(words, targets, version=version, **kw)
+
+    def lookup(self, word: str) -> str | None:
+        """Destino más cercano (menor distancia, luego mayor frecuencia) o None; las conocidas no cambian."""
+        if word in self.words:
+            return word
+        hit = self._memo.get(word, False)
+        if hit is not False:
+            return hit
+        max_d = 2 if len(word) >= self.lengths[1] else 1 if len(word) >= self.lengths[0] else 0
+        best = None
+        if max_d:
+            cands = set()
+            for d in _deletes(word[:PREFIX], min(max_d, self.max_distance)):
+                cands.update(self.deletes.get(d, ()))
+            scored = []
+            for w in cands:
+                if len(word) == self.lengths[0] and len(w) != len(word):
+                    continue  # en las más cortas solo sustituciones: "apago" no es "pago"
+                dist = DamerauLevenshtein.distance(word, w, score_cutoff=max_d)
+                if dist <= max_d:
+                    scored.append((dist, -self.targets[w], w))
+            best = min(scored)[2] if scored else None
+            if best is not None and _variant(word, best):
+                best = None
+        if len(self._memo) >= 10000:
+            self._memo.clear()
+        self._memo[word] = best
+        return best
+
+    def correct(self, text: str) -> tuple[str, list]:
+        """(texto con las palabras corregidas, [(original, corrección)]); el resto del texto queda igual."""
+        changes = []
+
+        def fix(m):
+            w = normalize_q(m.group())
+            if w in self.words or len(w) < self.lengths[0]:
+                return m.group()
+            c = self.lookup(w)
+            if c is None or c == w:
+                return m.group()
+            changes.append((m.group(), c))
+            return c
+
+        out = _WORD.sub(fix, text)
+        self.queries += 1
+        self.corrected += bool(changes)
+        return out, changes
+
+    def info(self) -> dict:
+        return {
+            "version": self.version,
+            "words": len(self.words),
+            "targets": len(self.targets),
+            "deletes": len(self.deletes),
+            "queries": self.queries,
+            "corrected": self.corrected,
+            "corrected_ratio": round(self.corrected / self.queries, 3) if self.queries else 0.0,
+        }
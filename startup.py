@@ -0,0 +1,55 @@
+"""
+Reporte de arranque del worker: cuánto tarda cada import e inicialización.
+
+main.py lo importa primero y marca el fin de cada paso con STARTUP.mark(nombre)
+(tiempo desde la marca anterior), sin reindentar el código de arranque. Lo que
+se carga de forma diferida (cliente OpenAI) queda en la sección "lazy" con el
+momento en que ocurrió. El reporte sale en /diag ("startup"), y con
+STARTUP_LOG=ruta se agrega como una línea JSON por arranque para seguirlo en el
+tiempo (ver bench/startup.py para medirlo en frío y comparar corridas).
+"""
+import json, os, threading, time
+from contextlib import contextmanager
+
+class StartupReport:
+    def __init__(self):
+        self.t0 = self._last = time.perf_counter()
+        self.steps = []   # [(nombre, ms)] en orden
+        self.lazy = []    # [(nombre, ms, ms desde el arranque)]
+        self.ready_ms = None
+        self._lock = threading.Lock()
+
+    def mark(self, name: str):
+        """Cierra el paso `name`: lo que pasó desde la marca anterior (o desde el inicio)."""
+        now = time.perf_counter()
+        self.steps.append((name, (now - self._last) * 1000))
+        self._last = now
+
+    @contextmanager
+    def lazy_step(self, name: str):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.lazy.append((name, (time.perf_counter() - t) * 1000, (t - self.t0) * 1000))
+
+    def ready(self, log_path: str | None = None):
+        """Fin de la importación de la app; con log_path agrega el reporte como línea JSON."""
+        self.ready_ms = (time.perf_counter() - self.t0) * 1000
+        if log_path:
+            try:
+                with open(log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"ts": int(time.time()), **self.report()}) + "\n")
+            except OSError:
+                pass
+
+    def report(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "ready_ms": round(self.ready_ms, 1) if self.ready_ms is not None else None,
+            "steps": {name: round(ms, 1) for name, ms in self.steps},
+            "lazy": {name: {"ms": round(ms, 1), "at_ms": round(at, 1)} for name, ms, at in self.lazy},
+        }
+
+STARTUP = StartupReport()
@@ -0,0 +1,18 @@
+"""
+Configuración común: los tests corren desde la raíz del repo (policies/, flows/
+y ui/ se leen con rutas relativas) y, al importar main, sin snapshot, sin
+warm-up del cliente y con el almacén de respuestas en un directorio temporal.
+"""
+import os, sys, tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+_tmp = tempfile.mkdtemp(prefix="olivia-tests-")
+os.environ["KB_SNAPSHOT"] = ""
+os.environ["LLM_WARMUP"] = "0"
+os.environ["ANSWER_STORE"] = os.path.join(_tmp, "answers.db")
+os.environ["DOMAIN_MODEL_PATH"] = os.path.join(_tmp, "domain_model.json.gz")
+os.environ.pop("METRICS_DIR", None)
+os.environ.pop("OPENAI_API_KEY", None)
@@ -0,0 +1,136 @@
+import asyncio, importlib.util, os, threading, time
+import pytest
+import admission
+from admission import Admission, AdmissionRejected, TokenBucket
+
+def test_token_bucket_refills():
+    b = TokenBucket(rate=2, burst=2, now=0.0)
+    assert b.take(0.0) and b.take(0.0) and not b.take(0.0)
+    assert b.take(0.5)                 # 0.5 s a 2/s = 1 ficha
+    assert not b.take(0.5)
+
+def test_sid_rate_limits_each_sid_separately(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(admission.time, "monotonic", lambda: now[0])
+    ad = Admission(sid_rate=1, sid_burst=2)
+    ad.check_rate("a")
+    ad.check_rate("a")
+    with pytest.raises(AdmissionRejected) as e:
+        ad.check_rate("a")
+    assert e.value.reason == "rate_sid"
+    ad.check_rate("b")                 # otro sid tiene su propio bucket
+    now[0] += 1
+    ad.check_rate("a")
+    assert ad.info()["rejected"] == {"rate_sid": 1}
+
+def test_global_rate(monkeypatch):
+    monkeypatch.setattr(admission.time, "monotonic", lambda: 5.0)
+    ad = Admission(rate=1, burst=1, sid_rate=0)
+    ad.check_rate("a")
+    with pytest.raises(AdmissionRejected) as e:
+        ad.check_rate("b")
+    assert e.value.reason == "rate_global"
+
+def test_sid_buckets_are_bounded():
+    ad = Admission(sid_rate=1, max_sids=3)
+    for sid in "abcde":
+        ad.check_rate(sid)
+    assert ad.info()["tracked_sids"] == 3
+
+def test_queue_full_rejects_immediately():
+    ad = Admission(max_concurrency=1, queue_size=0)
+    ad.acquire()
+    with pytest.raises(AdmissionRejected) as e:
+        ad.acquire(timeout=1)
+    assert e.value.reason == "queue_full"
+    ad.release()
+    assert ad.info()["in_flight"] == 0
+
+def test_queue_timeout():
+    ad = Admission(max_concurrency=1, queue_size=1)
+    ad.acquire()
+    t0 = time.monotonic()
+    with pytest.raises(AdmissionRejected) as e:
+        ad.acquire(timeout=0.05)
+    assert e.value.reason == "queue_timeout" and time.monotonic() - t0 < 0.5
+    assert ad.info()["queue_depth"] == 0
+    ad.release()
+    assert ad.info()["in_flight"] == 0
+
+def test_released_slot_goes_to_first_waiter_in_order():
+    ad = Admission(max_concurrency=1, queue_size=5)
+    ad.acquire()
+    order = []
+
+    def worker(name):
+        with ad.slot(timeout=2):
+            order.append(name)
+
+    threads = []
+    for name in ("w1", "w2", "w3"):
+        t = threading.Thread(target=worker, args=(name,))
+        t.start()
+        threads.append(t)
+        while ad.info()["queue_depth"] < len(threads):
+            time.sleep(0.002)
+    ad.release()
+    for t in threads:
+        t.join()
+    assert order == ["w1", "w2", "w3"]
+    info = ad.info()
+    assert (info["in_flight"], info["queued"], info["peak_queue"]) == (0, 3, 3)
+
+def test_concurrency_cap_is_respected():
+    ad = Admission(max_concurrency=3, queue_size=50, queue_timeout=2)
+    peak, cur, lock = [0], [0], threading.Lock()
+
+    def worker():
+        with ad.slot():
+            with lock:
+                cur[0] += 1
+                peak[0] = max(peak[0], cur[0])
+            time.sleep(0.01)
+            with lock:
+                cur[0] -= 1
+
+    threads = [threading.Thread(target=worker) for _ in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert peak[0] == 3 and ad.info()["in_flight"] == 0 and ad.admitted == 20
+
+def test_async_queue_and_cancellation():
+    async def scenario():
+        ad = Admission(max_concurrency=1, queue_size=2)
+        await ad.acquire_async()
+        waiter = asyncio.create_task(ad.acquire_async(timeout=2))
+        cancelled = asyncio.create_task(ad.acquire_async(timeout=2))
+        await asyncio.sleep(0.01)
+        assert ad.info()["queue_depth"] == 2
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        ad.release()                   # pasa al primero de la cola
+        await waiter
+        assert ad.info()["in_flight"] == 1
+        with pytest.raises(AdmissionRejected) as e:
+            await ad.acquire_async(timeout=0.02)
+        assert e.value.reason == "queue_timeout"
+        ad.release()
+        return ad
+
+    ad = asyncio.run(scenario())
+    assert ad.info()["in_flight"] == 0 and ad.info()["queue_depth"] == 0
+
+def test_loadtest_counts_shed_as_degraded():
+    spec = importlib.util.spec_from_file_location("loadtest_run", os.path.join("loadtest", "run.py"))
+    run = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(run)
+    rec = run.Recorder()
+    rec.started, rec.ended = 0.0, 1.0
+    for path in ("fixed", "llm", "shed", "shed", "fallback"):
+        rec.ok(path, 0.01)
+    rep = rec.report()
+    assert rep["degraded_rate"] == pytest.approx(3 / 5)
+    assert rep["shed_rate"] == pytest.approx(2 / 5)
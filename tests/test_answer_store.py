@@ -0,0 +1,137 @@
+import json, os
+import pytest
+import main
+import warmup
+from answer_store import AnswerStore
+
+@pytest.fixture
+def store(tmp_path):
+    return AnswerStore(str(tmp_path / "answers.db"))
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requiere fork")
+def test_forked_worker_opens_its_own_connection(store):
+    parent_conn = store._conn()
+    store.put("q", "VACACIONES", "15 días", {"vacaciones": "v1"})
+    r, w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(r)
+            got = store.get("q", "VACACIONES", {"vacaciones": "v1"})
+            store.put("q2", "PERMISOS", "sí", {"permisos": "v1"})
+            os.write(w, json.dumps([store._conn() is not parent_conn, got]).encode())
+        finally:
+            os._exit(0)
+    os.close(w)
+    with os.fdopen(r) as f:
+        own, got = json.loads(f.read())
+    os.waitpid(pid, 0)
+    assert own is True and got == "15 días"
+    assert store._conn() is parent_conn
+    assert store.get("q2", "PERMISOS", {"permisos": "v1"}) == "sí"
+
+def test_get_checks_every_source_version(store):
+    store.put("q", "VACACIONES", "15 días", {"vacaciones": "v1", "prompt": "p1"}, question="¿q?", origin="banco")
+    assert store.get("q", "VACACIONES", {"vacaciones": "v1", "permisos": "x", "prompt": "p1"}) == "15 días"
+    assert store.get("q", "VACACIONES", {"vacaciones": "v2", "prompt": "p1"}) is None
+    assert store.get("q", "VACACIONES", {"vacaciones": "v1", "prompt": "p2"}) is None
+    assert store.get("q", "PERMISOS", {"vacaciones": "v1", "prompt": "p1"}) is None
+    assert (store.hits, store.stale, store.misses) == (1, 2, 1)
+
+def test_purge_removes_only_stale_answers(store):
+    store.put("a", "VACACIONES", "A", {"vacaciones": "v1"})
+    store.put("b", "PERMISOS", "B", {"permisos": "v1"})
+    assert store.purge({"vacaciones": "v2", "permisos": "v1"}) == 1
+    assert len(store) == 1 and store.get("b", "PERMISOS", {"permisos": "v1"}) == "B"
+
+# ---- con la app: versiones, warmup.py y /responder ----
+
+FAQ = [
+    "me gusta mucho el fútbol de los domingos",
+    "¿puedo llevar a mi mascota a la oficina?",
+    "¿hay estacionamiento para empleados?",
+]
+
+@pytest.fixture
+def llm(monkeypatch):
+    calls = []
+
+    def llm_answer(pregunta, domain, sys_prompt, timeout=None, history=None):
+        calls.append(pregunta)
+        return f"Generada: {pregunta}", {"cost_usd": 0.0}
+
+    monkeypatch.setattr(main, "llm_answer", llm_answer)
+    return calls
+
+@pytest.fixture
+def faq(tmp_path):
+    path = tmp_path / "faq.txt"
+    path.write_text("# comentario\n" + "\n".join(FAQ) + "\n", encoding="utf-8")
+    return str(path)
+
+@pytest.fixture
+def warm(monkeypatch, store, faq):
+    monkeypatch.setattr(main, "ANSWER_STORE", None)  # como warmup.py: el plan mira solo `store`
+    main.RESPONSE_CACHE.clear()
+    items = [(q, o) for q, o in warmup.collect(main, [faq]) if o == "faq.txt"]
+    assert len(items) == len(FAQ)
+    return items
+
+def run(store, todo):
+    versions = main.answer_versions()
+    for job, origin in todo:
+        warmup.generate(main, store, job, origin, versions, timeout=5)
+
+def test_warmup_is_incremental_and_resumable(store, warm, llm):
+    todo, skipped = warmup.plan(main, store, warm, force=False)
+    assert len(todo) == len(FAQ) and not skipped
+    run(store, todo[:1])                          # corrida interrumpida
+    todo, skipped = warmup.plan(main, store, warm, force=False)
+    assert len(todo) == len(FAQ) - 1 and skipped == {"fresh": 1}
+    run(store, todo)
+    todo, skipped = warmup.plan(main, store, warm, force=False)
+    assert todo == [] and skipped == {"fresh": len(FAQ)}
+    assert len(llm) == len(FAQ)                   # nada se generó dos veces
+    assert len(warmup.plan(main, store, warm, force=True)[0]) == len(FAQ)
+
+def test_version_change_makes_stored_answers_stale(store, warm, llm, monkeypatch):
+    run(store, warmup.plan(main, store, warm, force=False)[0])
+    monkeypatch.setattr(main, "PROMPT_VERSION", "otra")
+    todo, skipped = warmup.plan(main, store, warm, force=False)
+    assert len(todo) == len(FAQ) and not skipped
+    assert store.purge(main.answer_versions()) == len(FAQ)
+
+def test_policy_change_only_invalidates_answers_that_used_it(store, warm, llm, monkeypatch):
+    todo, _ = warmup.plan(main, store, warm, force=False)
+    run(store, todo)
+    used = {job["pregunta"]: set(job["sources"]) for job, _ in todo}
+    changed = sorted(used[FAQ[0]])[0]
+    hashes = {**main.CORPUS.hashes, changed: "cambiado"}
+    monkeypatch.setattr(main, "answer_versions", lambda: {**hashes, "prompt": main.PROMPT_VERSION})
+    todo, skipped = warmup.plan(main, store, warm, force=False)
+    assert {job["pregunta"] for job, _ in todo} == {q for q, sources in used.items() if changed in sources}
+    assert 0 < len(todo) < len(FAQ) and skipped["fresh"] == len(FAQ) - len(todo)
+
+def test_prompt_version_covers_retrieval_parameters(monkeypatch):
+    base = main.prompt_version()
+    assert base == main.PROMPT_VERSION
+    for name, value in (("RETRIEVAL_TOP_K", main.RETRIEVAL_TOP_K + 1),
+                        ("RETRIEVAL_TOKEN_BUDGET", main.RETRIEVAL_TOKEN_BUDGET // 2),
+                        ("RETRIEVAL_MIN_CONFIDENCE", 0.9),
+                        ("RETRIEVAL_ENABLED", not main.RETRIEVAL_ENABLED)):
+        with monkeypatch.context() as m:
+            m.setattr(main, name, value)
+            assert main.prompt_version() != base, name
+
+def test_responder_serves_the_stored_answer_before_the_llm(store, warm, llm, monkeypatch):
+    q = FAQ[1]
+    run(store, [(job, o) for job, o in warmup.plan(main, store, warm, force=False)[0] if job["pregunta"] == q])
+    llm.clear()
+    monkeypatch.setattr(main, "ANSWER_STORE", store)
+    monkeypatch.setattr(main, "ensure_client", lambda: pytest.fail("no debía llamar al modelo"))
+    r = main.app.test_client().post("/responder", json={"mensaje": q}).get_json()
+    assert r["path"] == "store"
+    assert r["respuesta"].startswith(f"Generada: {q}")
+    assert llm == []
+    # ya quedó en la caché en memoria
+    assert main.app.test_client().post("/responder", json={"mensaje": q}).get_json()["path"] == "cache"
@@ -0,0 +1,61 @@
+import asyncio, json, time
+import pytest
+
+import asgi
+import main
+
+async def request(path: str, payload: dict) -> list[dict]:
+    body = json.dumps(payload).encode()
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(msg):
+        sent.append(msg)
+
+    await asgi.app({"type": "http", "method": "POST", "path": path, "headers": []}, receive, send)
+    return sent
+
+def json_body(sent: list[dict]) -> dict:
+    return json.loads(b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body"))
+
+def test_fixed_answer():
+    out = json_body(asyncio.run(request("/responder", {"mensaje": "me olvide de marcar ayer"})))
+    assert out["path"] == "fixed" and out["domain"] == "BIOMETRIKA"
+
+def test_stream_fixed_answer_is_single_done_event():
+    sent = asyncio.run(request("/responder/stream", {"mensaje": "cuantos dias de vacaciones tengo"}))
+    text = b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body").decode()
+    assert text.startswith("event: done\n") and text.count("event:") == 1
+
+@pytest.mark.parametrize("path", ["/responder", "/responder/stream"])
+def test_pipeline_runs_off_the_event_loop(monkeypatch, path):
+    """resolve_fast síncrono y lento no debe frenar a los demás requests del worker."""
+    real = main.resolve_fast
+
+    def slow_resolve(pregunta, sid, m=None):
+        time.sleep(0.3)
+        return real(pregunta, sid, m)
+
+    monkeypatch.setattr(main, "resolve_fast", slow_resolve)
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        t = asyncio.create_task(ticker())
+        started = time.monotonic()
+        await asyncio.gather(*(request(path, {"mensaje": "me olvide de marcar ayer"}) for _ in range(3)))
+        elapsed = time.monotonic() - started
+        t.cancel()
+        return elapsed, ticks
+
+    elapsed, ticks = asyncio.run(scenario())
+    assert elapsed < 0.8   # los tres en paralelo, no 3 x 0.3 s en serie
+    assert ticks >= 10     # el loop siguió atendiendo mientras tanto
@@ -0,0 +1,78 @@
+import gzip
+import pytest
+from flask import Flask, request
+import assets
+import main
+from assets import LONG_CACHE, REVALIDATE, Asset
+
+BODY = ("<p>" + "OLIVIA responde tus dudas de RRHH. " * 200 + "</p>").encode()
+app = Flask(__name__)
+
+def serve(asset, **headers):
+    with app.test_request_context("/", headers=headers):
+        return asset.response(request)
+
+@pytest.fixture
+def page():
+    return Asset("index.html", BODY, "text/html; charset=utf-8", REVALIDATE)
+
+def test_variants_are_built_once_and_decode_to_the_body(page):
+    assert gzip.decompress(page.variants["gzip"][0]) == BODY
+    if assets.brotli is not None:
+        assert assets.brotli.decompress(page.variants["br"][0]) == BODY
+    etags = [etag for _, etag in page.variants.values()]
+    assert len(set(etags)) == len(etags)  # ETag distinto por codificación
+
+def test_incompressible_body_keeps_only_identity():
+    a = Asset("x", b"ab", "text/plain", REVALIDATE)
+    assert list(a.variants) == ["identity"]
+    r = serve(a, **{"Accept-Encoding": "gzip, br"})
+    assert "Content-Encoding" not in r.headers and r.get_data() == b"ab"
+
+@pytest.mark.parametrize("accept, expected", [
+    ("", "identity"),
+    ("gzip", "gzip"),
+    ("gzip, deflate", "gzip"),
+    ("gzip;q=0", "identity"),
+    ("identity", "identity"),
+])
+def test_gzip_negotiation(page, accept, expected):
+    r = serve(page, **{"Accept-Encoding": accept})
+    assert r.status_code == 200
+    assert r.headers.get("Content-Encoding", "identity") == expected
+    assert r.headers["Vary"] == "Accept-Encoding"
+    assert r.headers["Cache-Control"] == REVALIDATE
+    body, etag = page.variants[expected]
+    assert r.get_data() == body and r.headers["ETag"] == etag
+
+def test_brotli_preferred_when_accepted(page):
+    if assets.brotli is None:
+        pytest.skip("sin el paquete brotli")
+    r = serve(page, **{"Accept-Encoding": "gzip, deflate, br"})
+    assert r.headers["Content-Encoding"] == "br"
+    assert len(r.get_data()) < len(page.variants["gzip"][0])
+    assert serve(page, **{"Accept-Encoding": "gzip, br;q=0"}).headers["Content-Encoding"] == "gzip"
+
+def test_if_none_match_returns_304_for_the_same_variant(page):
+    etag = serve(page, **{"Accept-Encoding": "gzip"}).headers["ETag"]
+    r = serve(page, **{"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert r.status_code == 304 and r.get_data() == b""
+    assert r.headers["ETag"] == etag and "Content-Encoding" not in r.headers
+    assert serve(page, **{"Accept-Encoding": "gzip", "If-None-Match": f"W/{etag}"}).status_code == 304
+    # el ETag de otra codificación no sirve: el cliente no tiene esos bytes
+    assert serve(page, **{"If-None-Match": etag}).status_code == 200
+    assert serve(page, **{"Accept-Encoding": "gzip", "If-None-Match": '"otro"'}).status_code == 200
+
+def test_app_serves_hashed_assets_with_long_cache():
+    client = main.app.test_client()
+    home = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert home.status_code == 200 and home.headers["Content-Encoding"] == "gzip"
+    html = gzip.decompress(home.data).decode()
+    url = main.UI.urls["olivia.css"]
+    assert url in html and main.UI.assets[url.rsplit("/", 1)[1]].digest in url
+    r = client.get(url)
+    assert r.status_code == 200 and r.headers["Cache-Control"] == LONG_CACHE
+    assert r.headers["Content-Type"].startswith("text/css")
+    assert client.get(url, headers={"If-None-Match": r.headers["ETag"]}).status_code == 304
+    assert client.get("/", headers={"If-None-Match": home.headers["ETag"], "Accept-Encoding": "gzip"}).status_code == 304
+    assert client.get("/assets/olivia.000000000000.css").status_code == 404
@@ -0,0 +1,155 @@
+import asyncio, json
+import pytest
+
+import asgi
+import breaker
+import main
+from breaker import CircuitBreaker, CircuitOpenError
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(breaker.time, "monotonic", lambda: now[0])
+    return now
+
+def fail():
+    raise RuntimeError("boom")
+
+def tripped(reset_timeout: float = 0) -> CircuitBreaker:
+    """Breaker que ya pasó a half_open (reset_timeout 0) con la prueba libre."""
+    br = CircuitBreaker(failure_threshold=1, reset_timeout=reset_timeout)
+    br.record_failure()
+    return br
+
+def test_opens_after_threshold_and_rejects(clock):
+    br = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            br.call(fail)
+    assert br.state == "open" and br.trips == 1
+    with pytest.raises(CircuitOpenError):
+        br.call(lambda: 1)
+    assert br.is_open()
+
+def test_success_resets_consecutive_failures():
+    br = CircuitBreaker(failure_threshold=2)
+    with pytest.raises(RuntimeError):
+        br.call(fail)
+    assert br.call(lambda: 1) == 1
+    with pytest.raises(RuntimeError):
+        br.call(fail)
+    assert br.state == "closed"
+
+def test_half_open_single_probe(clock):
+    br = tripped(reset_timeout=30)
+    clock[0] += 30
+    assert br.state == "half_open"
+    assert br.admit() == "probe"
+    assert br.admit() is None          # solo una prueba a la vez
+    br.record_success()
+    assert br.state == "closed" and br.admit() == "call"
+
+def test_failed_probe_reopens(clock):
+    br = tripped(reset_timeout=30)
+    clock[0] += 30
+    with pytest.raises(RuntimeError):
+        br.call(fail)
+    assert br.state == "open" and br.trips == 2
+
+class Disconnect(BaseException):
+    pass
+
+def test_call_interrupted_releases_probe():
+    br = tripped()
+
+    def interrupted():
+        raise Disconnect()
+
+    with pytest.raises(Disconnect):
+        br.call(interrupted)
+    assert br.state == "half_open"
+    assert br.admit() == "probe"      # la prueba quedó libre
+    assert br.total_failures == 1     # y no contó como fallo
+
+def test_acall_cancelled_releases_probe():
+    br = tripped()
+
+    async def scenario():
+        task = asyncio.create_task(br.acall(lambda: asyncio.sleep(1)))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert br.admit() == "probe"
+
+def test_abandon_only_releases_the_probe():
+    br = tripped()
+    assert br.admit() == "probe"
+    br.abandon("call")                 # una llamada de cuando estaba cerrado no libera la prueba
+    assert br.admit() is None
+    br.abandon("probe")
+    assert br.admit() == "probe"
+
+# ---- desconexión del cliente a mitad del stream, con la prueba tomada ----
+@pytest.fixture
+def half_open(monkeypatch):
+    br = tripped()
+    monkeypatch.setattr(main, "BREAKER", br)
+    monkeypatch.setattr(main, "ensure_client", lambda: object())
+    return br
+
+def test_wsgi_stream_disconnect_during_probe(monkeypatch, half_open):
+    def llm_stream(*args, **kw):
+        yield "Hola"
+        yield ", sigo"
+        yield " escribiendo"
+
+    monkeypatch.setattr(main, "llm_stream", llm_stream)
+    client = main.app.test_client()
+    resp = client.post("/responder/stream", json={"mensaje": "como se calcula el decimo tercer sueldo"},
+                       buffered=False)
+    chunks = iter(resp.response)
+    assert next(chunks).startswith(b"event: delta")   # el stream salió: la prueba está tomada
+    assert half_open.admit() is None
+    resp.close()                                       # el cliente se desconecta
+    assert half_open.state == "half_open"
+    assert half_open.admit() == "probe"
+    assert main.ADMISSION.info()["in_flight"] == 0
+
+def test_asgi_stream_disconnect_during_probe(monkeypatch, half_open):
+    async def llm_stream(*args, **kw):
+        yield "Hola"
+        await asyncio.sleep(5)
+        yield "nunca"
+
+    async def get_async_client():
+        return object()
+
+    monkeypatch.setattr(asgi, "llm_stream", llm_stream)
+    monkeypatch.setattr(asgi, "get_async_client", get_async_client)
+
+    async def scenario():
+        body = json.dumps({"mensaje": "como se calcula el decimo tercer sueldo"}).encode()
+        first_delta = asyncio.Event()
+
+        async def receive():
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(msg):
+            if b"event: delta" in msg.get("body", b""):
+                first_delta.set()
+
+        task = asyncio.create_task(asgi.app({"type": "http", "method": "POST", "path": "/responder/stream",
+                                             "headers": []}, receive, send))
+        await asyncio.wait_for(first_delta.wait(), 2)
+        assert half_open.admit() is None
+        task.cancel()                                  # el servidor cancela el handler al desconectarse
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert half_open.state == "half_open"
+    assert half_open.admit() == "probe"
+    assert main.ADMISSION.info()["in_flight"] == 0
@@ -0,0 +1,71 @@
+import pytest
+import cache
+from cache import ResponseCache
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    return now
+
+def test_hit_and_miss():
+    c = ResponseCache()
+    assert c.get("vacaciones", "VACACIONES", "v1") is None
+    c.set("vacaciones", "VACACIONES", "v1", "15 días")
+    assert c.get("vacaciones", "VACACIONES", "v1") == "15 días"
+    info = c.info()
+    assert (info["hits"], info["misses"]) == (1, 1)
+
+def test_key_includes_domain_and_version():
+    c = ResponseCache()
+    c.set("vacaciones", "VACACIONES", "v1", "15 días")
+    assert c.get("vacaciones", "PERMISOS", "v1") is None
+    assert c.get("vacaciones", "VACACIONES", "v2") is None
+
+def test_ttl_expires(clock):
+    c = ResponseCache(ttl=10)
+    c.set("q", "D", "v", "a")
+    clock[0] += 9.9
+    assert c.get("q", "D", "v") == "a"
+    clock[0] += 0.2
+    assert c.get("q", "D", "v") is None
+    assert c.info()["expirations"] == 1
+    assert c.info()["size"] == 0
+
+def test_lru_evicts_least_recently_used():
+    c = ResponseCache(max_entries=2)
+    c.set("a", "D", "v", 1)
+    c.set("b", "D", "v", 2)
+    assert c.get("a", "D", "v") == 1  # "a" pasa a ser la más reciente
+    c.set("c", "D", "v", 3)
+    assert c.get("b", "D", "v") is None
+    assert c.get("a", "D", "v") == 1
+    assert c.get("c", "D", "v") == 3
+    assert c.info()["evictions"] == 1
+
+def test_overwrite_does_not_evict():
+    c = ResponseCache(max_entries=2)
+    c.set("a", "D", "v", 1)
+    c.set("b", "D", "v", 2)
+    c.set("a", "D", "v", 10)
+    assert c.info()["evictions"] == 0
+    assert c.get("a", "D", "v") == 10 and c.get("b", "D", "v") == 2
+
+def test_fuzzy_hit_same_scope_only():
+    c = ResponseCache(fuzzy_score=90)
+    c.set("cuantos dias de vacaciones tengo", "VACACIONES", "v", "15")
+    assert c.get("cuantos dias de vacaciones tengo?", "VACACIONES", "v") == "15"
+    assert c.get("cuantos dias de vacaciones tengo?", "PERMISOS", "v") is None
+    assert c.info()["fuzzy_hits"] == 1
+
+def test_fuzzy_ignores_expired(clock):
+    c = ResponseCache(ttl=5, fuzzy_score=90)
+    c.set("cuantos dias de vacaciones tengo", "VACACIONES", "v", "15")
+    clock[0] += 6
+    assert c.get("cuantos dias de vacaciones tengo?", "VACACIONES", "v") is None
+
+def test_clear():
+    c = ResponseCache()
+    c.set("a", "D", "v", 1)
+    c.clear()
+    assert c.get("a", "D", "v") is None and c.info()["size"] == 0
@@ -0,0 +1,50 @@
+import os
+import pytest
+import classifier
+from classifier import DomainClassifier, load_or_train
+
+import main
+
+with open(os.path.join("bench", "queries.txt"), encoding="utf-8") as f:
+    QUERIES = [l.rstrip("\n") for l in f if l.strip() and not l.startswith("#")]
+
+@pytest.fixture(scope="module")
+def clf():
+    return DomainClassifier.from_texts(main.CORPUS.texts(), main.DOMAINS, version="test")
+
+def same(a, b):
+    assert a.domain == b.domain
+    assert a.score == pytest.approx(b.score, abs=1e-9)
+    assert a.margin == pytest.approx(b.margin, abs=1e-9)
+
+@pytest.mark.parametrize("backend", ["numpy", "python"])
+def test_classify_many_same_as_classify(monkeypatch, clf, backend):
+    if backend == "numpy":
+        pytest.importorskip("numpy")
+        batch_clf = clf
+    else:
+        monkeypatch.setattr(classifier, "np", None)
+        batch_clf = DomainClassifier.from_state(clf.state())
+    qns = [main.MATCHER.normalize(q) for q in QUERIES] + ["", "zzz"]
+    for a, b in zip(batch_clf.classify_many(qns), (clf.classify(q) for q in qns)):
+        same(a, b)
+
+def test_obvious_domains(clf):
+    assert clf.classify("cuantos dias de vacaciones me tocan").domain == "VACACIONES"
+    assert clf.classify("no puedo marcar en d2movil").domain == "BIOMETRIKA"
+
+def test_matcher_batch_with_classifier_same_as_match():
+    batch = main.MATCHER.match_many(QUERIES)
+    for a, b in zip(batch, (main.MATCHER.match(q) for q in QUERIES)):
+        assert (a.domain, a.intent) == (b.domain, b.intent)
+        assert a.domain_score == pytest.approx(b.domain_score, abs=1e-6)
+
+def test_save_load_and_version_check(tmp_path, clf):
+    path = str(tmp_path / "model.json.gz")
+    clf.save(path)
+    loaded = load_or_train(path, main.CORPUS.texts(), main.DOMAINS, "test")
+    for q in QUERIES[:10]:
+        same(loaded.classify(q), clf.classify(q))
+    retrained = load_or_train(path, main.CORPUS.texts(), main.DOMAINS, "otra")
+    assert retrained.version == "otra"
+    assert DomainClassifier.load(path).version == "otra"
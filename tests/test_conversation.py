@@ -0,0 +1,136 @@
+import itertools
+from types import SimpleNamespace as NS
+import pytest
+import main
+from conversation import ConversationMemory, extractive_summary, plain
+from sessions import MemorySessionStore
+
+def memory(**kw) -> ConversationMemory:
+    return ConversationMemory(MemorySessionStore(), **kw)
+
+def test_plain_strips_html_and_cuts():
+    assert plain("<b>Hola</b><br>&amp; chau") == "Hola & chau"
+    assert plain("x" * 50, max_chars=10) == "x" * 9 + "…"
+
+def test_ring_buffer_keeps_the_last_turns_and_summarizes_the_rest():
+    mem = memory(max_turns=2, turn_tokens=10_000, summary_tokens=10_000)
+    for i in range(4):
+        mem.add("s", f"pregunta {i}", f"<p>respuesta {i}. Detalle.</p>", "VACACIONES")
+    m = mem.get("s")
+    assert [t["q"] for t in m["turns"]] == ["pregunta 2", "pregunta 3"]
+    assert m["summary"].splitlines() == ["- Preguntó: pregunta 0 -> respuesta 0.",
+                                         "- Preguntó: pregunta 1 -> respuesta 1."]
+    assert m["domain"] == "VACACIONES" and mem.compactions == 2
+
+def test_turn_token_budget_compacts_but_keeps_the_latest_turn():
+    mem = memory(max_turns=10, turn_tokens=30)
+    mem.add("s", "a" * 80, "b" * 80, "PERMISOS")   # 40 tokens: solo, se queda
+    assert len(mem.get("s")["turns"]) == 1
+    mem.add("s", "corta", "ok", "PERMISOS")
+    m = mem.get("s")
+    assert [t["q"] for t in m["turns"]] == ["corta"]
+    assert m["summary"].startswith("- Preguntó: " + "a" * 20)
+
+def test_summary_has_its_own_cap_and_keeps_the_newest_lines():
+    lines = [{"q": f"pregunta número {i}", "a": f"respuesta {i}."} for i in range(30)]
+    s = extractive_summary("", lines, max_tokens=30)
+    assert s.splitlines()[-1] == "- Preguntó: pregunta número 29 -> respuesta 29."
+    assert len(s) // 4 <= 30 + len(s.splitlines())
+
+def test_messages_and_fingerprint():
+    mem = memory()
+    assert mem.messages(None) == [] and mem.fingerprint(None) == ""
+    mem.add("s", "¿cuántos días?", "15 días.", "VACACIONES")
+    m = mem.get("s")
+    assert mem.messages(m) == [{"role": "user", "content": "¿cuántos días?"},
+                               {"role": "assistant", "content": "15 días."}]
+    fp = mem.fingerprint(m)
+    mem.add("s", "¿y feriados?", "No cuentan.", "VACACIONES")
+    assert mem.fingerprint(mem.get("s")) != fp
+    m = {**mem.get("s"), "summary": "- antes"}
+    assert mem.messages(m)[0] == {"role": "system", "content": "[RESUMEN DE LA CONVERSACIÓN]\n- antes"}
+
+def test_no_sid_no_memory():
+    mem = memory()
+    mem.add("", "hola", "hola", "")
+    assert mem.get("") is None and len(mem.store) == 0
+
+@pytest.mark.parametrize("q, expected", [
+    ("¿y si es por paternidad?", True),
+    ("pero si estoy enfermo", True),
+    ("¿Eso aplica a practicantes?", True),
+    ("en ese caso, ¿qué hago?", True),
+    ("¿Qué pasa si no marco?", True),
+    ("¿cuántos días de vacaciones tengo?", False),
+    ("yo necesito un permiso", False),      # "y" solo cuenta como palabra suelta al inicio
+    ("eso", True),
+])
+def test_is_followup(q, expected):
+    assert main.is_followup(q) is expected
+
+# ---- /responder con sid: qué ve el modelo ----
+
+_sids = itertools.count()
+
+@pytest.fixture
+def llm(monkeypatch):
+    """Cliente OpenAI falso que registra los parámetros de cada llamada."""
+    calls = []
+
+    class Completions:
+        def create(self, **kw):
+            calls.append(kw)
+            return NS(choices=[NS(message=NS(content="Respuesta del modelo."))], usage=None)
+
+    fake = NS(chat=NS(completions=Completions()))
+    monkeypatch.setattr(main, "client", fake)
+    monkeypatch.setattr(main, "ensure_client", lambda: fake)
+    main.RESPONSE_CACHE.clear()
+    return calls
+
+def ask(client, q, sid):
+    return client.post("/responder", json={"mensaje": q, "sid": sid}).get_json()
+
+def test_followup_sends_history_and_inherits_the_domain(llm):
+    c, sid = main.app.test_client(), f"conv-{next(_sids)}"
+    first = ask(c, "¿puedo fraccionar mis vacaciones en varios periodos?", sid)
+    assert first["domain"] == "VACACIONES"
+    r = ask(c, "¿y eso aplica a practicantes?", sid)
+    assert r["path"] == "llm" and r["domain"] == "VACACIONES"
+    (call,) = llm
+    msgs = call["messages"]
+    assert [m["role"] for m in msgs] == ["system", "user", "assistant", "user"]
+    assert msgs[0]["content"].startswith(main.PROMPT_HEAD)       # el contexto va después del prefijo
+    assert msgs[1]["content"] == "¿puedo fraccionar mis vacaciones en varios periodos?"
+    assert msgs[2]["content"] == plain(str(first["respuesta"]), main.MEMORY.answer_chars)
+    assert msgs[3]["content"] == "[DOMINIO=VACACIONES] Pregunta: ¿y eso aplica a practicantes?"
+
+def test_not_a_followup_sends_no_history(llm):
+    c, sid = main.app.test_client(), f"conv-{next(_sids)}"
+    ask(c, "¿puedo fraccionar mis vacaciones en varios periodos?", sid)
+    ask(c, "me gusta mucho el fútbol de los domingos", sid)
+    (call,) = llm
+    assert [m["role"] for m in call["messages"]] == ["system", "user"]
+
+def test_history_is_bounded_on_long_chats():
+    sid = f"conv-{next(_sids)}"
+    for i in range(12):
+        main.MEMORY.add(sid, f"¿cuántos días de vacaciones tengo en el caso {i}?", f"En el caso {i}, 15 días.", "VACACIONES")
+    done, job = main.resolve_fast("¿y eso aplica a mi jefe?", sid)
+    assert done is None
+    history = job["history"]
+    assert history[0]["role"] == "system" and history[0]["content"].startswith("[RESUMEN DE LA CONVERSACIÓN]")
+    assert len(history) - 1 == 2 * main.MEMORY.max_turns
+    assert history[-2]["content"] == "¿cuántos días de vacaciones tengo en el caso 11?"
+    msgs = main.llm_request(job["pregunta"], job["domain"], job["sys_prompt"], history)["messages"]
+    assert msgs[0]["content"] == job["sys_prompt"] and msgs[1:-1] == history
+    assert job["prompt_tokens"] == main.count_messages(msgs)
+
+def test_followups_do_not_share_cache_across_conversations(llm):
+    c = main.app.test_client()
+    a, b = f"conv-{next(_sids)}", f"conv-{next(_sids)}"
+    ask(c, "¿puedo fraccionar mis vacaciones en varios periodos?", a)
+    ask(c, "¿cómo justifico un atraso por cita médica?", b)
+    for sid in (a, b):
+        assert ask(c, "¿y eso aplica a practicantes?", sid)["path"] == "llm"
+    assert len(llm) >= 2
@@ -0,0 +1,54 @@
+import logging, os, shutil
+import pytest
+from corpus import POLICY_FILES, PolicyCorpus
+
+@pytest.fixture
+def base(tmp_path):
+    for name in POLICY_FILES.values():
+        shutil.copy(os.path.join("policies", name), tmp_path / name)
+    return tmp_path
+
+def make(base):
+    return PolicyCorpus(str(base), prompt_builder=lambda texts, d: f"{d}:{len(texts[d])}", check_interval=0)
+
+def touch(base, key, extra):
+    path = base / POLICY_FILES[key]
+    path.write_text(path.read_text(encoding="utf-8") + extra, encoding="utf-8")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+def test_unchanged_files_do_not_reload(base):
+    c = make(base)
+    assert c.reload() is False
+    assert c.reloads == 0
+
+def test_mtime_change_swaps_snapshot_and_runs_listeners(base):
+    c = make(base)
+    seen = []
+    c.on_reload(lambda corpus: seen.append(corpus.version))
+    v1, h1 = c.version, dict(c.hashes)
+    p1 = c.prompt("vacaciones")
+    touch(base, "vacaciones", "\nNueva regla.\n")
+    v2 = c.version  # check_interval=0: el acceso detecta el cambio
+    assert v2 != v1
+    assert seen == [v2]
+    assert c.hashes["vacaciones"] != h1["vacaciones"]
+    assert c.hashes["compras"] == h1["compras"]
+    assert c.prompt("vacaciones") != p1
+    assert c.reloads == 1
+
+def test_failing_listener_is_logged_and_others_still_run(base, caplog):
+    c = make(base)
+    def broken(corpus):
+        raise RuntimeError("índice roto")
+    seen = []
+    c.on_reload(broken)
+    c.on_reload(lambda corpus: seen.append(corpus.version))
+    with caplog.at_level(logging.ERROR, logger="corpus"):
+        assert c.reload(force=True) is True
+    assert seen == [c.version]
+    assert c.listener_errors == 1
+    assert c.info()["listener_errors"] == 1
+    rec = [r for r in caplog.records if r.name == "corpus"]
+    assert len(rec) == 1 and "broken" in rec[0].getMessage()
+    assert rec[0].exc_info and "índice roto" in str(rec[0].exc_info[1])
@@ -0,0 +1,74 @@
+import pytest
+from flows import Flow, FlowEngine
+from sessions import MemorySessionStore
+
+import main
+
+def link(title: str) -> str:
+    return f"[{title}]"
+
+@pytest.fixture
+def engine():
+    return FlowEngine.load("flows", MemorySessionStore(), link)
+
+def test_trigger_and_start(engine):
+    flow = engine.trigger("necesito info de UNIFORMES")
+    assert flow is not None and flow.name == "uniformes"
+    html = engine.start("s1", flow)
+    assert "¿Dime en dónde trabajas?" in html
+    assert engine.store.get("s1") == {"flow": "uniformes", "state": "marca"}
+    assert engine.trigger("cuantos dias de vacaciones tengo") is None
+
+def test_walk_to_a_link(engine):
+    engine.start("s1", engine.flows["uniformes"])
+    _, html = engine.step("s1", "OLA")
+    assert "Selecciona en qué área trabajas:" in html
+    _, html = engine.step("s1", "comercial")
+    assert "¿Cuál es tu cargo?" in html
+    flow, html = engine.step("s1", "asesor comercial")
+    assert flow.path == "uniform"
+    assert "[Política de uniformes - Asesor Comercial]" in html
+    assert engine.store.get("s1")["state"] == "cargo"
+
+def test_any_transition_and_miss(engine):
+    engine.start("s1", engine.flows["uniformes"])
+    _, html = engine.step("s1", "metrored")            # válida en cualquier estado
+    assert "[Política de uniformes - Metrored]" in html
+    _, html = engine.step("s1", "no sé")
+    assert "¿Dime en dónde trabajas?" in html          # else: repite el menú
+    assert engine.store.get("s1")["state"] == "marca"
+
+def test_fuzzy_only_among_values_the_state_accepts(engine):
+    flow = engine.flows["uniformes"]
+    area, cargo = flow.states["area"], flow.states["cargo"]
+    assert flow.match("optometraa", cargo) == "Optómetra"   # typo: fuzzy
+    assert flow.match("optometraa", area) is None           # el área no acepta cargos
+    assert flow.match("Optómetra", area) == "Optómetra"     # exacto: siempre se reconoce
+
+def test_no_active_flow(engine):
+    assert engine.step("nadie", "OLA") is None
+
+def test_same_replies_as_the_app():
+    """Los flujos que carga main responden con los enlaces reales de accesos.txt."""
+    sid = "test-flows-app"
+    client = main.app.test_client()
+    r = client.post("/responder", json={"mensaje": "uniformes", "sid": sid}).get_json()
+    assert r["path"] == "uniform" and r["flow"] == "uniformes"
+    r = client.post("/responder", json={"mensaje": "aura skin", "sid": sid}).get_json()
+    assert r["path"] == "uniform" and "/go/" in r["respuesta"]
+
+BASE = {
+    "name": "t", "options": {"A": ["a"]}, "menus": {"m": {"hint": "h", "chips": ["A"]}},
+    "start": "s", "states": {"s": {"on": {"A": {"goto": "s"}}, "else": {"menus": ["m"]}}},
+}
+
+@pytest.mark.parametrize("patch,error", [
+    ({"states": {"s": {"on": {}}}}, "falta 'else'"),
+    ({"states": {"s": {"on": {"A": {"goto": "x"}}, "else": {}}}}, "estado desconocido"),
+    ({"states": {"s": {"on": {"B": {}}, "else": {}}}}, "valor sin opción"),
+    ({"states": {"s": {"else": {"menus": ["nope"]}}}}, "menú desconocido"),
+    ({"start": "x"}, "estado inicial desconocido"),
+])
+def test_invalid_specs(patch, error):
+    with pytest.raises(ValueError, match=error):
+        Flow({**BASE, **patch})
@@ -0,0 +1,77 @@
+"""
+Regresión del RuleMatcher (una sola pasada) contra la cascada original de
+main.py (fuzzy_any por intención en orden + route_domain por dominio) sobre las
+consultas de bench/queries.txt. tests/matcher_expected.tsv fija intención y
+dominio esperados por consulta; si cambian las reglas, regenerarlo a conciencia.
+"""
+import os
+import pytest
+from rapidfuzz import fuzz
+from matcher import RuleMatcher
+from utils import _n
+
+import main
+
+def read_expected() -> list[tuple[str, str | None, str]]:
+    path = os.path.join(os.path.dirname(__file__), "matcher_expected.tsv")
+    with open(path, encoding="utf-8") as f:
+        rows = [l.rstrip("\n").split("\t") for l in f if l.strip() and not l.startswith("#")]
+    return [(q, None if intent == "-" else intent, domain) for q, intent, domain in rows]
+
+EXPECTED = read_expected()
+
+# ---- cascada original (baseline), como referencia ----
+def cascade_intent(q: str) -> str | None:
+    qn = _n(q)
+    for rule in main.INTENT_RULES:
+        if any(fuzz.partial_ratio(qn, _n(t)) >= rule.get("min_score", 85) for t in rule["terms"]):
+            return rule["id"]
+        groups = rule.get("all_of")
+        if groups and all(any(s in qn for s in g) for g in groups):
+            return rule["id"]
+    return None
+
+def cascade_domain(q: str) -> str:
+    qn = _n(q)
+    best, score = "PERMISOS", 0
+    for dom, terms in main.DOMAINS.items():
+        s = max((fuzz.partial_ratio(qn, _n(t)) for t in terms), default=0)
+        if s > score:
+            best, score = dom, s
+    return best
+
+@pytest.fixture(scope="module")
+def terms_only():
+    return RuleMatcher(main.INTENT_RULES, main.DOMAINS, default_domain="PERMISOS")
+
+def test_expected_covers_bench_queries():
+    with open(os.path.join("bench", "queries.txt"), encoding="utf-8") as f:
+        queries = [l.rstrip("\n") for l in f if l.strip() and not l.startswith("#")]
+    assert [q for q, _, _ in EXPECTED] == queries
+
+@pytest.mark.parametrize("query,intent,domain", EXPECTED)
+def test_expected(terms_only, query, intent, domain):
+    m = terms_only.match(query)
+    assert (m.intent["id"] if m.intent else None, m.domain) == (intent, domain)
+
+@pytest.mark.parametrize("query,intent,domain", EXPECTED)
+def test_same_as_cascade(terms_only, query, intent, domain):
+    m = terms_only.match(query)
+    assert (m.intent["id"] if m.intent else None) == cascade_intent(query)
+    assert m.domain == cascade_domain(query)
+
+def test_classifier_does_not_change_intents():
+    """El clasificador de dominio (MATCHER de main) solo decide el dominio."""
+    got = [main.MATCHER.match(q).intent for q, _, _ in EXPECTED]
+    assert [i["id"] if i else None for i in got] == [intent for _, intent, _ in EXPECTED]
+
+@pytest.mark.parametrize("backend", ["numpy", "python"])
+def test_match_many_same_as_match(monkeypatch, terms_only, backend):
+    """Lotes: process.cdist (numpy) o una fila por consulta, mismo resultado que match()."""
+    import matcher
+    if backend == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(matcher, "np", None)
+    queries = [q for q, _, _ in EXPECTED]
+    assert terms_only.match_many(queries) == [terms_only.match(q) for q in queries]
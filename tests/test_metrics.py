@@ -0,0 +1,108 @@
+import json, os, subprocess, sys
+import pytest
+from metrics import LATENCY_BUCKETS, Metrics
+
+def dead_pid() -> int:
+    p = subprocess.Popen([sys.executable, "-c", "pass"])
+    p.wait()
+    return p.pid
+
+def values(text: str) -> dict:
+    out = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            k, v = line.rsplit(" ", 1)
+            out[k] = float(v)
+    return out
+
+def test_counters_and_histograms_render():
+    m = Metrics("t")
+    m.inc("answers_total", path="fixed")
+    m.inc("answers_total", 2, path="fixed")
+    m.observe("stage_seconds", 0.003, stage="match")
+    v = values(m.render())
+    assert v['t_answers_total{path="fixed"}'] == 3
+    assert v['t_stage_seconds_count{stage="match"}'] == 1
+    assert v['t_stage_seconds_bucket{stage="match",le="0.005"}'] == 1
+    assert v['t_stage_seconds_bucket{stage="match",le="0.0025"}'] == 0
+
+def test_collector_rows():
+    m = Metrics("t")
+    m.collector(lambda: [("cache_entries", "gauge", "entradas", {}, 7),
+                         ("cache_hits_total", "counter", "aciertos", {"kind": "exact"}, 4)])
+    v = values(m.render())
+    assert v["t_cache_entries"] == 7 and v['t_cache_hits_total{kind="exact"}'] == 4
+
+def test_quantile_inside_bucket():
+    h = [0] * (len(LATENCY_BUCKETS) + 2)
+    h[LATENCY_BUCKETS.index(0.01)] = 10
+    assert LATENCY_BUCKETS[LATENCY_BUCKETS.index(0.01) - 1] < Metrics.quantile(h, 0.5) <= 0.01
+
+@pytest.fixture
+def workers(tmp_path):
+    """Este proceso como worker vivo + el snapshot que dejó un worker ya muerto."""
+    m = Metrics("t")
+    m.dir = str(tmp_path)
+    m.inc("answers_total", 5, path="llm")
+    m.collector(lambda: [("llm_in_flight", "gauge", "en vuelo", {}, 1)])
+
+    other = Metrics("t")
+    other.inc("answers_total", 3, path="llm")
+    other.observe("request_seconds", 0.2, path="llm")
+    other.collector(lambda: [("llm_in_flight", "gauge", "en vuelo", {}, 4)])
+    snap = other.snapshot()
+    with open(tmp_path / f"{dead_pid()}.json", "w") as f:
+        json.dump(snap, f)
+    return m, tmp_path
+
+def test_dead_worker_counters_are_kept(workers):
+    m, path = workers
+    v = values(m.render())
+    assert v['t_answers_total{path="llm"}'] == 8          # 5 propios + 3 del muerto, no baja
+    assert v['t_request_seconds_count{path="llm"}'] == 1
+    assert v["t_llm_in_flight"] == 1                      # el gauge del muerto no cuenta
+    files = sorted(os.listdir(path))
+    assert "retired.json" in files and f"{os.getpid()}.json" in files
+    assert not [f for f in files if f[:-5].isdigit() and f != f"{os.getpid()}.json"]
+
+def test_retired_is_stable_and_accumulates(workers):
+    m, path = workers
+    first = values(m.render())
+    assert values(m.render()) == first                    # plegar no cuenta dos veces
+    again = Metrics("t")
+    again.inc("answers_total", 2, path="llm")
+    with open(path / f"{dead_pid()}.json", "w") as f:
+        json.dump(again.snapshot(), f)
+    assert values(m.render())['t_answers_total{path="llm"}'] == 10
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requiere fork")
+def test_preload_master_is_not_a_worker(tmp_path):
+    """Como gunicorn --preload: el padre importa y cuenta, después hace fork del worker."""
+    m = Metrics("t").enable_multiprocess(str(tmp_path), interval=3600)
+    m.inc("answers_total", 7, path="fixed")  # arranque del master
+    m.flush()
+    assert os.path.exists(tmp_path / f"{os.getpid()}.json")
+    r, w = os.pipe()
+    go_r, go_w = os.pipe()
+    pid = os.fork()
+    if pid == 0:  # worker
+        try:
+            os.close(r)
+            os.read(go_r, 1)  # el padre ya corrió sus hooks de fork
+            m.inc("answers_total", path="llm")
+            os.write(w, m.render().encode())
+        finally:
+            os._exit(0)
+    os.close(w)
+    os.write(go_w, b"x")
+    os.close(go_w)
+    os.close(go_r)
+    with os.fdopen(r) as f:
+        text = f.read()
+    os.waitpid(pid, 0)
+    v = values(text)
+    assert v['t_answers_total{path="llm"}'] == 1
+    assert 't_answers_total{path="fixed"}' not in v      # ni heredado ni del archivo del master
+    assert not os.path.exists(tmp_path / f"{os.getpid()}.json")
+    m.flush()
+    assert not os.path.exists(tmp_path / f"{os.getpid()}.json")
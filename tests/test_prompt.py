@@ -0,0 +1,78 @@
+import pytest
+import main
+import tokens
+from tokens import Pricing, cached_tokens, count_messages, count_tokens, truncate_tokens, usage_report
+
+@pytest.fixture
+def approx(monkeypatch):
+    """Conteo por estimación (~4 caracteres por token), como en producción sin tiktoken."""
+    monkeypatch.setattr(tokens, "encoding", lambda: None)
+    count_tokens.cache_clear()
+    yield
+    count_tokens.cache_clear()
+
+def test_approx_count_and_truncate(approx):
+    assert count_tokens("") == 0
+    assert count_tokens("abc") == 1
+    assert count_tokens("a" * 40) == 10
+    assert truncate_tokens("a" * 40, 3) == "a" * 12
+    assert truncate_tokens("hola", 0) == ""
+    assert truncate_tokens("hola", 5) == "hola"
+
+def test_count_messages_adds_format_overhead(approx):
+    msgs = [{"role": "system", "content": "a" * 40}, {"role": "user", "content": None}]
+    assert count_messages(msgs) == (3 + 10) + (3 + 0) + 3
+
+def test_pricing_and_usage_report():
+    p = Pricing(0.15, 0.075, 0.60)
+    assert p.cost(1_000_000, 0, 0) == pytest.approx(0.15)
+    assert p.cost(1_000_000, 1_000_000, 0) == pytest.approx(0.075)
+    assert p.cost(2_000, 1_000, 100) == pytest.approx((1_000 * 0.15 + 1_000 * 0.075 + 100 * 0.60) / 1e6)
+
+    class Details:
+        cached_tokens = 1024
+    class Usage:
+        prompt_tokens, completion_tokens, prompt_tokens_details = 2000, 50, Details()
+    assert cached_tokens(Usage()) == 1024
+    assert cached_tokens(type("U", (), {"prompt_tokens_details": {"cached_tokens": 7}})()) == 7
+    assert cached_tokens(object()) == 0
+    assert usage_report(Usage(), p) == {"prompt_tokens": 2000, "cached_tokens": 1024, "completion_tokens": 50,
+                                        "cost_usd": round(p.cost(2000, 1024, 50), 6)}
+
+def test_prompt_starts_with_the_fixed_rules_and_ends_with_the_domain():
+    for q, d in (("¿cuántos días de vacaciones tengo?", "VACACIONES"), ("¿cómo pido un permiso?", "PERMISOS")):
+        prompt, _ = main.build_system_prompt(q, d)
+        assert prompt.startswith(main.PROMPT_HEAD + "\n\n")
+        assert prompt.endswith(f"\n\nDOMINIO ACTUAL: {d}")
+
+def test_full_corpus_prompt_is_shared_by_all_domains():
+    bodies = {main.CORPUS.prompt(d).rsplit("\n\nDOMINIO ACTUAL:", 1)[0] for d in main.DOMAINS}
+    assert len(bodies) == 1
+
+def test_passages_are_rendered_in_corpus_order():
+    r = main.PASSAGE_INDEX.retrieve("vacaciones permiso anticipación", top_k=4, token_budget=10_000)
+    ps = r["passages"]
+    assert len(ps) > 1
+    assert main.system_prompt_from_passages(ps, "X") == main.system_prompt_from_passages(ps[::-1], "X")
+
+def test_guard_keeps_prompts_under_the_limit(monkeypatch):
+    full = main.CORPUS.prompt("PERMISOS")
+    assert main.guard_prompt("permiso", "PERMISOS", full, None) == (full, None)
+    before = main.METRICS.snapshot()["counters"].get("olivia_prompt_trimmed_total", {}).get("", 0)
+    monkeypatch.setattr(main, "PROMPT_MAX_TOKENS", count_tokens(main.PROMPT_HEAD) + 400)
+    prompt, r = main.guard_prompt("¿cómo pido un permiso?", "PERMISOS", full, None)
+    assert count_tokens(prompt) <= main.PROMPT_MAX_TOKENS
+    assert r["trimmed"] is True and "truncated" not in r
+    assert "EXTRACTOS RELEVANTES" in prompt and prompt.endswith("DOMINIO ACTUAL: PERMISOS")
+    after = main.METRICS.snapshot()["counters"]["olivia_prompt_trimmed_total"][""]
+    assert after == before + 1
+
+def test_guard_cuts_the_text_when_no_passage_fits(monkeypatch):
+    monkeypatch.setattr(main, "PASSAGE_INDEX", None)
+    monkeypatch.setattr(main, "PROMPT_MAX_TOKENS", count_tokens(main._prompt("PERMISOS", "")) + 50)
+    full = main.CORPUS.prompt("PERMISOS")
+    prompt, r = main.guard_prompt("permiso", "PERMISOS", full, None)
+    assert r == {"trimmed": True, "truncated": True}
+    assert count_tokens(prompt) <= main.PROMPT_MAX_TOKENS + 1
+    assert prompt.startswith(main.PROMPT_HEAD) and prompt.endswith("DOMINIO ACTUAL: PERMISOS")
+    assert main.prompt_sources(r) == list(main.POLICY_FILES)  # recortado: depende de todo el corpus
@@ -0,0 +1,36 @@
+import os
+import pytest
+from qa_bank import QABank
+from utils import read_txt
+
+@pytest.fixture(scope="module")
+def bank():
+    return QABank.from_text(read_txt(os.path.join("policies", "banco_preguntas.txt")))
+
+@pytest.mark.parametrize("query", [
+    "que es d2movilplus",
+    "se pueden dividir las vacaciones?",
+    "cuanto dura la lactancia",
+])
+def test_direct_match(bank, query):
+    hit = bank.match(query)
+    assert hit is not None
+    assert hit["coverage"] >= bank.min_coverage
+    assert hit["query_coverage"] >= bank.min_query_coverage
+
+@pytest.mark.parametrize("query", [
+    # la pregunta curada está contenida en la consulta (token_set_ratio = 100), pero
+    # la consulta pide algo más: tiene que ir al modelo
+    "que es d2movilplus y como recupero mi clave",
+    "Buenas tardes, el mes pasado subí un permiso médico a D2MovilPlus con el certificado "
+    "y no me lo aprueban, en el rol me salió un descuento, ¿a quién le reclamo?",
+])
+def test_compound_question_falls_through(bank, query):
+    assert bank.match(query) is None
+
+def test_one_word_does_not_match(bank):
+    assert bank.match("vacaciones") is None
+
+def test_state_roundtrip(bank):
+    clone = QABank.from_state(bank.state())
+    assert clone.match("que es d2movilplus")["id"] == bank.match("que es d2movilplus")["id"]
@@ -0,0 +1,94 @@
+import pytest
+from retrieval import PassageIndex, approx_tokens, chunk_text, clip_text, render_passages, tokenize
+
+BANCO = """BANCO DE PREGUNTAS
+
+PERMISOS BIOMETRIKA
+
+¿Cómo marco en Biometrika?
+Desde la app, con la cámara.
+    Si falla, avisa a tu jefe.
+
+PRESTAMOS BGR
+
+¿Cómo pido un préstamo?
+En la agencia del BGR con tu rol de pagos.
+"""
+
+TEXTS = {
+    "vacaciones": "Tienes 15 días de vacaciones al año.\n\nLas vacaciones se piden con 30 días de anticipación.",
+    "compras": "Las compras de empleados tienen un cupo mensual.\n\nEl descuento de empleados es del 10 por ciento.",
+    "banco": BANCO,
+}
+
+def test_tokenize_drops_stopwords_and_stems_plurals():
+    assert tokenize("¿Cuántos días de VACACIONES tengo?") == ["cuanto", "dia", "vacacion"]
+
+def test_chunks_follow_sections_and_indented_continuations():
+    chunks = chunk_text("banco", BANCO)
+    assert [c["section"] for c in chunks] == ["PERMISOS BIOMETRIKA", "PRESTAMOS BGR"]
+    assert [c["domain"] for c in chunks] == ["BIOMETRIKA", "NOMINA"]
+    assert chunks[0]["text"].endswith("avisa a tu jefe.")
+    assert chunk_text("vacaciones", TEXTS["vacaciones"])[0]["domain"] == "VACACIONES"
+
+def test_bm25_ranks_the_passage_with_the_query_terms_first():
+    idx = PassageIndex.from_texts(TEXTS)
+    (score, best), *_ = idx.search("anticipación para pedir vacaciones")
+    assert "anticipación" in idx.chunks[best]["text"]
+    assert score > 0
+    assert idx.search("palabra inexistente") == []
+
+def test_domain_boost_breaks_ties_toward_the_routed_domain():
+    idx = PassageIndex.from_texts(TEXTS)
+    plain = dict((i, s) for s, i in idx.search("empleados"))
+    boosted = dict((i, s) for s, i in idx.search("empleados", domain="COMPRAS"))
+    for i, s in plain.items():
+        factor = 1.5 if idx.chunks[i]["domain"] == "COMPRAS" else 1.0
+        assert boosted[i] == pytest.approx(s * factor)
+
+def test_budget_skips_passages_that_do_not_fit():
+    idx = PassageIndex.from_texts(TEXTS)
+    full = idx.retrieve("empleados compras descuento cupo", top_k=10, token_budget=10_000)
+    assert len(full["passages"]) >= 2
+    first = full["passages"][0]["tokens"]
+    r = idx.retrieve("empleados compras descuento cupo", top_k=10, token_budget=first)
+    assert [p["id"] for p in r["passages"]] == [full["passages"][0]["id"]]
+    assert r["tokens"] == first
+
+def test_first_passage_is_clipped_to_the_budget():
+    long = " ".join(["La política de vacaciones aplica a todo el personal."] * 40)
+    idx = PassageIndex.from_texts({"vacaciones": long})
+    assert idx.chunks[0]["tokens"] > 50
+    r = idx.retrieve("vacaciones personal", token_budget=50)
+    (p,) = r["passages"]
+    assert p["truncated"] is True
+    assert r["tokens"] == p["tokens"] <= 50
+    assert long.startswith(p["text"]) and not p["text"].endswith(" ")
+    assert idx.chunks[0]["tokens"] > 50  # el índice no se modifica
+    assert idx.retrieve("vacaciones", token_budget=0)["passages"] == []
+
+def test_clip_text_respects_the_estimate():
+    text = "uno dos tres cuatro cinco seis siete ocho"
+    assert clip_text(text, 100) == text
+    assert approx_tokens(clip_text(text, 3)) <= 3
+    assert clip_text(text, 3) == "uno dos"
+
+def test_low_confidence_asks_for_the_full_corpus():
+    idx = PassageIndex.from_texts(TEXTS)
+    assert idx.retrieve("vacaciones anticipación")["fallback"] is False
+    # términos repartidos en pasajes distintos: el mejor cubre poco de la pregunta
+    r = idx.retrieve("cupo anticipación préstamo biometrika")
+    assert r["passages"] and r["confidence"] < 0.5 and r["fallback"] is True
+    assert idx.retrieve("nada que ver")["fallback"] is True
+
+def test_state_round_trip_gives_the_same_results():
+    idx = PassageIndex.from_texts(TEXTS, version="v1")
+    copy = PassageIndex.from_state(idx.state())
+    assert copy.version == "v1"
+    assert copy.retrieve("préstamo bgr") == idx.retrieve("préstamo bgr")
+
+def test_render_groups_by_source_with_section_labels():
+    idx = PassageIndex.from_texts(TEXTS)
+    out = render_passages(idx.retrieve("préstamo biometrika", top_k=10, min_confidence=0)["passages"])
+    assert out.startswith("BANCO DE PREGUNTAS DO:\n")
+    assert "[PRESTAMOS BGR] ¿Cómo pido un préstamo?" in out
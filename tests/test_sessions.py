@@ -0,0 +1,234 @@
+import json, os, subprocess, sys, threading, time
+import pytest
+import sessions
+from sessions import (MemorySessionStore, RedisSessionStore, SessionStore, SqliteSessionStore,
+                      open_session_store)
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(sessions.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(sessions.time, "time", lambda: now[0])
+    return now
+
+class FakeRedis:
+    """Lo mínimo de redis-py que usa RedisSessionStore, con el mismo reloj que el test."""
+    def __init__(self, clock):
+        self.clock = clock
+        self.kv = {}    # key -> (expires_at, value)
+        self.zsets = {}
+
+    def _live(self, key):
+        item = self.kv.get(key)
+        if item and item[0] <= self.clock[0]:
+            del self.kv[key]
+            return None
+        return item
+
+    def get(self, key):
+        item = self._live(key)
+        return item[1].encode() if item else None
+
+    def setex(self, key, ttl, value):
+        self.kv[key] = (self.clock[0] + ttl, value)
+
+    def delete(self, *keys):
+        return sum(self.kv.pop(k, None) is not None for k in keys)
+
+    def zadd(self, name, mapping):
+        self.zsets.setdefault(name, {}).update(mapping)
+
+    def zrem(self, name, *members):
+        z = self.zsets.get(name, {})
+        return sum(z.pop(m, None) is not None for m in members)
+
+    def zcard(self, name):
+        return len(self.zsets.get(name, {}))
+
+    def zcount(self, name, lo, hi):
+        return sum(1 for s in self.zsets.get(name, {}).values() if s >= lo)
+
+    def zremrangebyscore(self, name, lo, hi):
+        z = self.zsets.get(name, {})
+        dead = [m for m, s in z.items() if s <= hi]
+        for m in dead:
+            del z[m]
+        return len(dead)
+
+    def zrange(self, name, start, end):
+        ordered = sorted(self.zsets.get(name, {}).items(), key=lambda kv: kv[1])
+        return [m.encode() for m, _ in ordered[start:end + 1]]
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def info(self, section):
+        return {"used_memory": 1234}
+
+class FakePipeline:
+    def __init__(self, r):
+        self.r, self.calls = r, []
+
+    def __getattr__(self, name):
+        return lambda *a, **kw: self.calls.append((name, a, kw))
+
+    def execute(self):
+        return [getattr(self.r, name)(*a, **kw) for name, a, kw in self.calls]
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def make_store(request, clock, tmp_path):
+    def make(ttl=60, max_entries=100, namespace="sid"):
+        if request.param == "memory":
+            return MemorySessionStore(ttl, max_entries)
+        if request.param == "sqlite":
+            table = "sessions" if namespace == "sid" else f"sessions_{namespace}"
+            return SqliteSessionStore(str(tmp_path / "s.db"), ttl, max_entries, table=table)
+        if not hasattr(request, "_fake_redis"):
+            request._fake_redis = FakeRedis(clock)
+        return RedisSessionStore("redis://fake", ttl, max_entries, prefix=f"olivia:{namespace}:",
+                                 client=request._fake_redis)
+    return make
+
+def test_interface_is_abstract():
+    with pytest.raises(TypeError):
+        SessionStore()
+
+def test_get_set_delete(make_store):
+    s = make_store()
+    assert s.get("a") is None
+    s.set("a", {"flow": "uniformes", "state": "marca"})
+    assert s.get("a") == {"flow": "uniformes", "state": "marca"}
+    assert len(s) == 1
+    s.delete("a")
+    assert s.get("a") is None
+    assert len(s) == 0
+
+def test_get_returns_a_copy(make_store):
+    s = make_store()
+    value = {"turns": [{"q": "hola"}]}
+    s.set("a", value)
+    value["turns"].append({"q": "cambiado después del set"})
+    got = s.get("a")
+    got["turns"].append({"q": "cambiado después del get"})
+    assert s.get("a") == {"turns": [{"q": "hola"}]}
+
+def test_ttl_is_sliding(make_store, clock):
+    s = make_store(ttl=60)
+    s.set("a", {"n": 1})
+    clock[0] += 50
+    assert s.get("a") == {"n": 1}
+    s.set("a", {"n": 2})  # renueva la vida
+    clock[0] += 50
+    assert s.get("a") == {"n": 2}
+    clock[0] += 11
+    assert s.get("a") is None
+
+def test_sweep_deletes_expired_and_applies_cap(make_store, clock):
+    s = make_store(ttl=60, max_entries=3)
+    for i in range(3):
+        s.set(f"old{i}", {"i": i})
+    clock[0] += 61
+    for i in range(5):
+        s.set(f"new{i}", {"i": i})
+        clock[0] += 1
+    s.sweep()
+    assert len(s) == 3
+    assert s.expired + s.evicted == 5  # memory aplica el tope ya en set(); los demás en sweep()
+    assert [s.get(f"new{i}") for i in range(5)] == [None, None, {"i": 2}, {"i": 3}, {"i": 4}]
+    info = s.info()
+    assert info["entries"] == 3 and info["max_entries"] == 3
+
+def test_namespaces_do_not_mix(make_store):
+    a, b = make_store(), make_store(namespace="mem")
+    a.set("x", {"from": "a"})
+    b.set("x", {"from": "b"})
+    assert a.get("x") == {"from": "a"}
+    assert b.get("x") == {"from": "b"}
+    assert (len(a), len(b)) == (1, 1)
+
+def test_sqlite_rows_are_deleted_by_sweep(tmp_path, clock):
+    s = SqliteSessionStore(str(tmp_path / "s.db"), ttl=10, max_entries=100)
+    s.set("a", {})
+    clock[0] += 11
+    assert s.get("a") is None
+    rows = s._conn().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+    assert rows == 1  # vencida pero todavía en la tabla
+    assert s.sweep() == 1
+    assert s._conn().execute("SELECT COUNT(*) FROM sessions").fetchone()[0] == 0
+
+def test_sqlite_is_shared_between_processes(tmp_path):
+    path = tmp_path / "shared.db"
+    s = open_session_store(f"sqlite:///{path}", ttl=60)
+    s.set("sid-1", {"flow": "uniformes", "state": "talla"})
+    code = (
+        "import sys, sessions\n"
+        f"s = sessions.SqliteSessionStore({str(path)!r}, ttl=60)\n"
+        "v = s.get('sid-1'); v['state'] = 'fin'; s.set('sid-1', v); s.set('sid-2', {'n': 2})\n"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", code], cwd=root, check=True)
+    assert s.get("sid-1") == {"flow": "uniformes", "state": "fin"}
+    assert s.get("sid-2") == {"n": 2}
+    assert len(s) == 2
+
+def test_redis_len_does_not_scan(clock):
+    r = FakeRedis(clock)
+    r.scan_iter = None  # cualquier SCAN rompería el test
+    s = RedisSessionStore("redis://fake", ttl=60, client=r)
+    s.set("a", {})
+    s.set("b", {})
+    assert len(s) == 2
+    clock[0] += 61
+    assert len(s) == 0  # vencidos no cuentan aunque el índice aún no se barrió
+    assert s.info()["memory_bytes"] == 1234
+
+def test_open_session_store_backends(tmp_path):
+    assert open_session_store("memory").backend == "memory"
+    s = open_session_store(f"sqlite:///{tmp_path}/sub/s.db", namespace="mem")
+    assert s.backend == "sqlite" and s.table == "sessions_mem"
+
+def in_fork(fn):
+    """Corre fn() en un hijo de os.fork (como un worker de gunicorn --preload) y devuelve su resultado."""
+    r, w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(r)
+            os.write(w, json.dumps(fn()).encode())
+        finally:
+            os._exit(0)
+    os.close(w)
+    with os.fdopen(r) as f:
+        out = f.read()
+    os.waitpid(pid, 0)
+    return json.loads(out)
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requiere fork")
+def test_sweeper_and_connection_after_fork(tmp_path):
+    s = open_session_store(f"sqlite:///{tmp_path}/s.db", ttl=0.3, max_entries=2, sweep_interval=0.05)
+    parent_conn = s._conn()
+    s.set("del-master", {"n": 0})
+
+    def worker():
+        time.sleep(0.1)  # el hilo del master ya se detuvo
+        conn = s._conn()
+        s.set("old", {})
+        time.sleep(0.4)
+        for i in range(3):
+            s.set(f"new{i}", {"i": i})
+        deadline = time.monotonic() + 3
+        while time.monotonic() < deadline and not (s.expired and s.evicted):
+            time.sleep(0.02)
+        rows = conn.execute("SELECT sid FROM sessions ORDER BY sid").fetchall()
+        return {"own_conn": conn is not parent_conn, "expired": s.expired, "evicted": s.evicted,
+                "rows": [r[0] for r in rows],
+                "sweepers": [t.name for t in threading.enumerate() if t.name == "sessions-sqlite-sweeper"]}
+
+    out = in_fork(worker)
+    assert out["own_conn"] is True
+    assert out["expired"] >= 2                 # "old" y la del master, borradas por el barrido del hijo
+    assert out["evicted"] == 1                 # tope de 2 aplicado
+    assert out["rows"] == ["new1", "new2"]
+    assert out["sweepers"]
+    assert s._conn() is parent_conn            # el padre sigue con la suya
+    assert s.expired == 0                      # y ya no barre
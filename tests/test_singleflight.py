@@ -0,0 +1,101 @@
+import asyncio, threading, time
+import pytest
+from singleflight import AsyncSingleFlight, SingleFlight
+
+def test_concurrent_calls_share_one_execution():
+    sf, calls, results = SingleFlight(), [], []
+    release = threading.Event()
+
+    def fn():
+        calls.append(1)
+        release.wait(2)
+        return "ok"
+
+    threads = [threading.Thread(target=lambda: results.append(sf.do("k", fn, timeout=2))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    while sf.leaders + sf.coalesced < 5:
+        time.sleep(0.005)
+    release.set()
+    for t in threads:
+        t.join()
+    assert calls == [1] and results == ["ok"] * 5
+    assert (sf.leaders, sf.coalesced) == (1, 4)
+    assert sf.info()["in_flight"] == 0
+
+def test_error_is_shared_and_key_released():
+    sf = SingleFlight()
+    with pytest.raises(ValueError):
+        sf.do("k", lambda: (_ for _ in ()).throw(ValueError("x")))
+    assert sf.do("k", lambda: 1) == 1  # la clave quedó libre
+
+def test_follower_timeout():
+    sf, release = SingleFlight(), threading.Event()
+    leader = threading.Thread(target=lambda: sf.do("k", lambda: release.wait(2)))
+    leader.start()
+    while not sf.leaders:
+        time.sleep(0.005)
+    with pytest.raises(TimeoutError):
+        sf.do("k", lambda: None, timeout=0.05)
+    release.set()
+    leader.join()
+    assert sf.timeouts == 1
+
+def test_different_keys_do_not_coalesce():
+    sf = SingleFlight()
+    assert sf.do("a", lambda: 1) == 1 and sf.do("b", lambda: 2) == 2
+    assert sf.coalesced == 0
+
+def test_async_coalesces():
+    async def scenario():
+        sf, calls = AsyncSingleFlight(), []
+
+        async def fn():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "ok"
+
+        out = await asyncio.gather(*(sf.do("k", fn) for _ in range(4)))
+        return out, calls, sf
+
+    out, calls, sf = asyncio.run(scenario())
+    assert out == ["ok"] * 4 and calls == [1]
+    assert (sf.leaders, sf.coalesced) == (1, 3)
+
+def test_async_leader_cancelled_does_not_cancel_followers():
+    async def scenario():
+        sf = AsyncSingleFlight()
+
+        async def fn():
+            await asyncio.sleep(1)
+
+        leader = asyncio.create_task(sf.do("k", fn))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(sf.do("k", fn, timeout=1))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        with pytest.raises(RuntimeError):
+            await follower
+        return sf
+
+    sf = asyncio.run(scenario())
+    assert sf.info()["in_flight"] == 0
+
+def test_async_follower_timeout():
+    async def scenario():
+        sf = AsyncSingleFlight()
+
+        async def fn():
+            await asyncio.sleep(0.2)
+            return 1
+
+        leader = asyncio.create_task(sf.do("k", fn))
+        await asyncio.sleep(0)
+        with pytest.raises(TimeoutError):
+            await sf.do("k", fn, timeout=0.02)
+        assert await leader == 1
+        return sf
+
+    assert asyncio.run(scenario()).timeouts == 1
@@ -0,0 +1,67 @@
+import json
+import pytest
+from speller import Speller
+
+import main
+
+@pytest.fixture(scope="module")
+def sp():
+    return Speller.from_texts(list(main.CORPUS.texts().values()), main.spelling_terms())
+
+@pytest.mark.parametrize("text,expected", [
+    ("quiero pedir bacaciones", "quiero pedir vacaciones"),
+    ("se me paso la marcasion", "se me paso la marcacion"),
+    ("d2 mobil no abre", "d2 movil no abre"),
+    ("permisso por calamidad", "permiso por calamidad"),
+    ("materniadd cuantos dias", "maternidad cuantos dias"),
+    ("mi usuario esta bloquado", "mi usuario esta bloqueado"),
+])
+def test_corrects_towards_curated_terms(sp, text, expected):
+    fixed, changes = sp.correct(text)
+    assert fixed == expected and len(changes) == 1
+
+@pytest.mark.parametrize("text", [
+    "no marque la salida, tengo que llegar temprano",   # palabras del corpus: no se tocan
+    "quiero saber si me tocan",
+    "el celular se apago",                              # 5 letras: solo sustituciones
+    "estoy segura que me descontaron",                  # género de "seguro"
+    "Buenas tardes, soy asesora comercial",             # plural / femenino de un término
+    "rol 2024 ok",                                      # cortas y números
+])
+def test_leaves_known_words_and_variants(sp, text):
+    assert sp.correct(text) == (text, [])
+
+def test_keeps_the_rest_of_the_text(sp):
+    fixed, changes = sp.correct("¿Bacaciones? 15 días, por favor.")
+    assert fixed == "¿vacaciones? 15 días, por favor."
+    assert changes == [("Bacaciones", "vacaciones")]
+
+def test_counts_corrected_queries(sp):
+    before = sp.info()
+    sp.correct("bacaciones")
+    sp.correct("vacaciones")
+    after = sp.info()
+    assert after["queries"] - before["queries"] == 2
+    assert after["corrected"] - before["corrected"] == 1
+
+def test_pipeline_uses_corrected_query():
+    client = main.app.test_client()
+    r = client.post("/responder", json={"mensaje": "quiero pedir bacaciones"}).get_json()
+    assert r["path"] == "fixed" and r["domain"] == "VACACIONES"
+    assert r["spelling"] == {"original": "quiero pedir bacaciones", "query": "quiero pedir vacaciones",
+                             "changes": [["bacaciones", "vacaciones"]]}
+    r = client.post("/responder", json={"mensaje": "cuantos dias de vacaciones tengo"}).get_json()
+    assert "spelling" not in r
+
+def test_batch_reports_spelling():
+    client = main.app.test_client()
+    r = client.post("/responder/batch", json={"preguntas": ["materniadd cuantos dias"]})
+    first = json.loads(r.data.decode().splitlines()[0])
+    assert first["path"] == "fixed" and first["spelling"]["query"] == "maternidad cuantos dias"
+
+def test_metrics_are_counters():
+    main.spell("bacaciones")
+    text = main.app.test_client().get("/metrics").data.decode()
+    assert "# TYPE olivia_spelling_checked_total counter" in text
+    assert "# TYPE olivia_spelling_corrected_total counter" in text
+    assert "spelling_corrected_ratio" not in text
@@ -0,0 +1,81 @@
+"""
+Conteo de tokens y costo estimado de las llamadas al modelo.
+
+count_tokens usa tiktoken (o200k_base, el tokenizador de gpt-4o/gpt-4o-mini)
+si está instalado y su tabla se puede cargar; si no, la estimación de ~4
+caracteres por token. tiktoken no va en requirements.txt: en producción los
+presupuestos de tokens son aproximados (el conteo real llega en `usage`).
+Los prompts de sistema se repiten mucho (uno por dominio), así que el
+conteo se memoiza por texto.
+"""
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+ENCODING = "o200k_base"
+MESSAGE_OVERHEAD = 3  # tokens de formato por mensaje (y 3 más para el inicio de la respuesta)
+
+_enc = None
+_enc_failed = False
+
+def encoding():
+    global _enc, _enc_failed
+    if _enc is None and tiktoken is not None and not _enc_failed:
+        try:
+            _enc = tiktoken.get_encoding(ENCODING)
+        except Exception:
+            _enc_failed = True  # sin red para bajar la tabla BPE: queda la estimación
+    return _enc
+
+def backend() -> str:
+    return f"tiktoken:{ENCODING}" if encoding() is not None else "approx:4chars"
+
+@lru_cache(maxsize=256)
+def count_tokens(text: str) -> int:
+    enc = encoding()
+    if enc is not None:
+        return len(enc.encode(text, disallowed_special=()))
+    return max(1, len(text) // 4) if text else 0
+
+def count_messages(messages: list[dict]) -> int:
+    return sum(MESSAGE_OVERHEAD + count_tokens(m.get("content") or "") for m in messages) + MESSAGE_OVERHEAD
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Corta `text` a lo sumo en `max_tokens` tokens."""
+    if max_tokens <= 0:
+        return ""
+    enc = encoding()
+    if enc is not None:
+        ids = enc.encode(text, disallowed_special=())
+        return text if len(ids) <= max_tokens else enc.decode(ids[:max_tokens])
+    return text[: max_tokens * 4]
+
+class Pricing:
+    """USD por millón de tokens (entrada, entrada cacheada por el proveedor, salida)."""
+    def __init__(self, input_: float, cached: float, output: float):
+        self.input, self.cached, self.output = input_, cached, output
+
+    def cost(self, prompt_tokens: int, cached_tokens: int, completion_tokens: int) -> float:
+        fresh = max(0, prompt_tokens - cached_tokens)
+        return (fresh * self.input + cached_tokens * self.cached + completion_tokens * self.output) / 1_000_000
+
+def cached_tokens(usage) -> int:
+    """usage.prompt_tokens_details.cached_tokens (objeto o dict según la versión del SDK)."""
+    details = getattr(usage, "prompt_tokens_details", None)
+    if isinstance(details, dict):
+        return details.get("cached_tokens") or 0
+    return getattr(details, "cached_tokens", 0) or 0
+
+def usage_report(usage, pricing: Pricing) -> dict:
+    prompt = getattr(usage, "prompt_tokens", 0) or 0
+    cached = cached_tokens(usage)
+    completion = getattr(usage, "completion_tokens", 0) or 0
+    return {
+        "prompt_tokens": prompt,
+        "cached_tokens": cached,
+        "completion_tokens": completion,
+        "cost_usd": round(pricing.cost(prompt, cached, completion), 6),
+    }
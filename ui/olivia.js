@@ -0,0 +1,75 @@
+const form = document.getElementById('chatForm');
+const inputField = document.getElementById('mensaje');
+const chatMessages = document.getElementById('chatMessages');
+
+// SID persistente
+const SID_KEY = 'olivia_sid';
+let SID = localStorage.getItem(SID_KEY);
+if(!SID){ SID = (crypto.randomUUID && crypto.randomUUID()) || String(Date.now()); localStorage.setItem(SID_KEY, SID); }
+
+async function sendToBot(text){
+  const userBubble = document.createElement('div');
+  userBubble.className = 'bubble usuario';
+  userBubble.textContent = text;
+  chatMessages.appendChild(userBubble);
+  chatMessages.scrollTop = chatMessages.scrollHeight;
+
+  const loader = document.createElement('div');
+  loader.className = 'bubble olivia';
+  loader.textContent = 'Escribiendo...';
+  chatMessages.appendChild(loader);
+  chatMessages.scrollTop = chatMessages.scrollHeight;
+
+  try {
+    const res = await fetch('/responder/stream', {
+      method: 'POST',
+      headers: {'Content-Type':'application/json'},
+      body: JSON.stringify({mensaje: text, sid: SID})
+    });
+    // SSE sobre fetch: 'delta' va agregando texto, 'done' trae el HTML final
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buf = '', streamed = '', finished = false;
+    while (!finished) {
+      const {value, done} = await reader.read();
+      if (done) break;
+      buf += decoder.decode(value, {stream: true});
+      let cut;
+      while ((cut = buf.indexOf('\n\n')) >= 0) {
+        const raw = buf.slice(0, cut); buf = buf.slice(cut + 2);
+        const ev = (raw.match(/^event: (.*)$/m) || [])[1];
+        const payload = (raw.match(/^data: (.*)$/m) || [])[1];
+        if (!payload) continue;
+        const data = JSON.parse(payload);
+        if (ev === 'delta') {
+          streamed += data.t;
+          loader.textContent = streamed;
+        } else if (ev === 'done') {
+          loader.innerHTML = data.respuesta || 'Error interno';
+          finished = true;
+        }
+        chatMessages.scrollTop = chatMessages.scrollHeight;
+      }
+    }
+    if (!finished) loader.textContent = streamed || 'Error interno';
+  } catch {
+    loader.textContent = 'Error de conexión';
+  }
+  chatMessages.scrollTop = chatMessages.scrollHeight;
+}
+
+form.addEventListener('submit', (e) => {
+  e.preventDefault();
+  const mensaje = inputField.value.trim();
+  if (!mensaje) return;
+  inputField.value = '';
+  sendToBot(mensaje);
+});
+
+// Click en chips
+chatMessages.addEventListener('click', (e)=>{
+  const chip = e.target.closest('[data-chip]');
+  if(!chip) return;
+  const value = chip.getAttribute('data-chip');
+  sendToBot(value);
+});
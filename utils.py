@@ -0,0 +1,30 @@
+import re
+from unidecode import unidecode
+
+# --------------- Utilidades -------------
+def _n(s: str) -> str:
+    return unidecode((s or "").lower())
+
+_CLEAN = re.compile(r"[^a-z0-9 ]+")
+
+def normalize_q(text: str) -> str:
+    """minúsculas, sin tildes ni signos: '¿Qué es D2MovilPlus?' -> 'que es d2movilplus'"""
+    return " ".join(_CLEAN.sub(" ", _n(text)).split())
+
+def read_txt(path: str) -> str:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except Exception:
+        return ""
+
+def sanitize(text: str) -> str:
+    text = (text or "").replace("\r", " ").replace("\n", " ").strip()
+    return re.sub(r"\s+", " ", text)
+
+def slugify(label: str) -> str:
+    """convierte 'Política de uniformes - Administrativos' -> 'politica_de_uniformes_administrativos'"""
+    s = unidecode(label or "").strip().lower()
+    s = re.sub(r"[^a-z0-9]+", "_", s)
+    s = re.sub(r"_+", "_", s).strip("_")
+    return s
@@ -0,0 +1,113 @@
+"""
+Warm-up de respuestas: pregenera con el modelo las respuestas del banco de
+preguntas y de una lista de FAQ y las guarda en el almacén persistente
+(ANSWER_STORE) para que /responder las sirva sin llamar a OpenAI.
+
+    python warmup.py                          # preguntas de banco_preguntas.txt
+    python warmup.py --faq faq.txt            # + una pregunta por línea (# comenta)
+    python warmup.py --concurrency 4 --dry-run
+    python warmup.py --force                  # regenerar todo
+
+Cada pregunta pasa por el mismo pipeline que un request (resolve_fast: reglas,
+banco, dominio, prompt con pasajes); las que ya se resuelven sin IA no se
+generan. Cada respuesta queda con la versión de cada archivo de policies/ que
+entró a su prompt: una corrida nueva solo genera las que faltan o tienen alguna
+fuente cambiada, y como cada respuesta se guarda apenas llega, una corrida
+interrumpida se retoma con solo volver a lanzarla. Al final se borran las
+respuestas desactualizadas que quedaron sin regenerar.
+"""
+import argparse, json, os, sys, time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+def read_faq(path: str) -> list[str]:
+    with open(path, encoding="utf-8") as f:
+        return [l.strip() for l in f if l.strip() and not l.lstrip().startswith("#")]
+
+def collect(main, faq_paths: list[str]) -> list[tuple[str, str]]:
+    """[(pregunta, origen)] sin repetidas (por pregunta normalizada)."""
+    items = [(e["question"], "banco") for e in main.qa_bank().entries]
+    for path in faq_paths:
+        items += [(q, os.path.basename(path)) for q in read_faq(path)]
+    seen, out = set(), []
+    for q, origin in items:
+        q = main.sanitize(q)
+        qn = main.normalize_q(q)
+        if qn and qn not in seen:
+            seen.add(qn)
+            out.append((q, origin))
+    return out
+
+def plan(main, store, items, force: bool) -> tuple[list, Counter]:
+    """Jobs a generar + conteo de lo que no hace falta (por camino o 'fresh')."""
+    versions = main.answer_versions()
+    todo, skipped = [], Counter()
+    for q, origin in items:
+        done, job = main.resolve_fast(q, "")
+        if done:
+            skipped[done["path"]] += 1
+        elif not force and store.get(job["qn"], job["domain"], versions) is not None:
+            skipped["fresh"] += 1
+        else:
+            todo.append((job, origin))
+    return todo, skipped
+
+def generate(main, store, job: dict, origin: str, versions: dict, timeout: float) -> dict:
+    answer, usage = main.llm_answer(job["pregunta"], job["domain"], job["sys_prompt"], timeout=timeout)
+    sources = {s: versions[s] for s in (*job["sources"], "prompt")}
+    store.put(job["qn"], job["domain"], answer, sources, question=job["pregunta"], origin=origin)
+    return usage
+
+def main_cli():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--faq", action="append", default=[], metavar="ARCHIVO", help="preguntas frecuentes, una por línea")
+    ap.add_argument("--store", help="ruta del almacén (default: ANSWER_STORE o answers.db)")
+    ap.add_argument("--concurrency", type=int, default=4, help="llamadas al modelo en paralelo")
+    ap.add_argument("--timeout", type=float, default=30, help="segundos por llamada")
+    ap.add_argument("--force", action="store_true", help="regenerar también las respuestas vigentes")
+    ap.add_argument("--dry-run", action="store_true", help="solo mostrar qué se generaría")
+    args = ap.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.environ["LLM_WARMUP"] = "0"  # el cliente se crea abajo, solo si hay algo que generar
+    import main
+    from answer_store import AnswerStore
+
+    store = AnswerStore(args.store or main.ANSWER_STORE_PATH or "answers.db")
+    main.ANSWER_STORE = None  # el plan decide con `store`, no con lo que serviría /responder
+    items = collect(main, args.faq)
+    versions = main.answer_versions()
+    todo, skipped = plan(main, store, items, args.force)
+    print(f"{len(items)} preguntas: {len(todo)} a generar, sin IA o vigentes {dict(skipped)}")
+    if args.dry_run or not todo:
+        for job, origin in todo:
+            print(f"  [{origin}] {job['domain']}: {job['pregunta']}")
+        return
+    if main.ensure_client() is None:
+        sys.exit(f"sin cliente OpenAI: {main.OPENAI_INIT_ERROR or 'falta OPENAI_API_KEY'}")
+
+    started, failed, cost = time.monotonic(), 0, 0.0
+    with ThreadPoolExecutor(max_workers=max(1, args.concurrency), thread_name_prefix="warmup") as pool:
+        futures = {pool.submit(generate, main, store, job, origin, versions, args.timeout): job for job, origin in todo}
+        for i, fut in enumerate(as_completed(futures), 1):
+            job = futures[fut]
+            try:
+                cost += fut.result().get("cost_usd", 0.0)
+                status = "ok"
+            except Exception as e:
+                failed += 1
+                status = f"error: {type(e).__name__}"
+            print(f"[{i}/{len(todo)}] {status} {job['domain']}: {job['pregunta'][:70]}")
+    purged = store.purge(versions)
+    print(json.dumps({
+        "generated": len(todo) - failed,
+        "failed": failed,
+        "purged_stale": purged,
+        "entries": len(store),
+        "cost_usd": round(cost, 6),
+        "seconds": round(time.monotonic() - started, 1),
+    }))
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main_cli()